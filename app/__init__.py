@@ -3,6 +3,9 @@ from flask_restx import Api
 from app.distribution.web.server.routes.auth import auth_ns
 from app.distribution.web.server.routes.data import data_ns
 from app.distribution.web.server.routes.scraper import scraper_ns
+from app.distribution.web.server.routes.metrics import metrics_ns
+from app.infraestructura.drivers.driver_pool import driver_pool
+from app.config import driver_pool_prewarm
 from flask_cors import CORS
 
 
@@ -15,5 +18,10 @@ def create_app():
     api.add_namespace(auth_ns, path='/api/login')
     api.add_namespace(data_ns, path='/api/data')
     api.add_namespace(scraper_ns, path='/api/scraper')
+    api.add_namespace(metrics_ns, path='/api/metrics')
+
+    if driver_pool_prewarm:
+        # Starts the browsers of the scraper in the background, so the first searches do not wait for Chrome
+        driver_pool.prewarm(driver_pool_prewarm)
 
     return app
@@ -0,0 +1,153 @@
+from app.config import api_url
+from app.utils.utils import Utils
+from app.infraestructura.cache.response_cache import response_cache
+from app.infraestructura.drivers.async_http import AsyncHttpEngine
+import asyncio
+
+
+class AsyncFetchServices:
+    """
+    Asyncio version of `FetchServices`, with the same requests and the same results.
+
+    Every call runs on the event loop of `AsyncHttpEngine` and uses its shared client, so all the scrapes running at
+    once share a single concurrency budget instead of each result page creating its own thread pool.
+    """
+
+    def __init__(self, url=None, client=None, cache=None):
+        self.url = url or api_url
+        self.client = client
+        self.response_cache = cache or response_cache
+
+    def _client(self):
+        return self.client or AsyncHttpEngine.get_client()
+
+    async def _get_json(self, endpoint, case_id, url, parse):
+        """
+        Sends a GET request and returns its status code and its JSON body formatted by `parse`, see
+        `FetchServices._get_json`: a body is only stored in the response cache once `parse` accepted it. The cache
+        blocks on SQLite, so it is called in the default executor of the loop instead of on the loop thread, where a
+        locked database would stall every call in flight.
+
+        Args:
+            endpoint (str): The name of the endpoint, used as part of the cache key.
+            case_id (str): The ID of the judicial case.
+            url (str): The URL of the request.
+            parse (callable): Formats the JSON body, raises if the body is not valid.
+
+        Returns:
+            tuple: The status code and the formatted body, None if the request was not successful.
+        """
+        loop = asyncio.get_running_loop()
+        cached = self.response_cache.enabled
+        if cached:
+            data = await loop.run_in_executor(None, self.response_cache.get, endpoint, case_id)
+            if data is not None:
+                return 200, parse(data)
+        response = await self._client().request('GET', url)
+        if response.status_code != 200:
+            return response.status_code, None
+        data = response.json()
+        result = parse(data)
+        if cached:
+            await loop.run_in_executor(None, self.response_cache.set, endpoint, case_id, data)
+        return 200, result
+
+    async def fetch_actuaciones_judiciales(self, payload):
+        """
+        Fetches judicial acts based on the given payload.
+
+        Args:
+            payload (dict): The payload containing the necessary information for the request.
+
+        Returns:
+            dict: The same result as `FetchServices.fetch_actuaciones_judiciales`: `{idJudicatura: format_data}` if the
+            request is successful, or a dictionary with the 'error' and the 'status_code' otherwise.
+        """
+        try:
+            format_payload = Utils.format_data_payload(payload)
+            url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/actuacionesJudiciales"
+            response = await self._client().request('POST', url, json_body=format_payload)
+            if response.status_code == 200:
+                data = response.json()
+                format_data = Utils.format_data_actuaciones_judiciales(data)
+                return {payload['idJudicatura']: format_data}
+            else:
+                return {'error': 'Failed to fetch case data', 'status_code': response.status_code}
+        except Exception as e:
+            return {'error': str(e) or type(e).__name__}
+
+    async def fetch_incidente_judicatura(self, case_id):
+        """
+        Fetches incident data for a given judicial court case.
+
+        Args:
+            case_id (str): The ID of the judicial court case.
+
+        Returns:
+            list or dict: The same result as `FetchServices.fetch_incidente_judicatura`: the formatted incident data if
+            the request is successful, or a dictionary with the 'error' and the 'status_code' otherwise.
+        """
+        try:
+            url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-CLEX-SERVICE/api/consulta-causas-clex/informacion/getIncidenteJudicatura/{case_id}"
+            status_code, format_data = await self._get_json(
+                'getIncidenteJudicatura', case_id, url, Utils.format_data_sub_process)
+            if status_code == 200:
+                return format_data
+            else:
+                return {'error': 'Failed to fetch incident data', 'status_code': status_code}
+        except Exception as e:
+            return {'error': str(e) or type(e).__name__}
+
+    async def fetch_case_info(self, case_id):
+        """
+        Fetches the general information of a judicial case, without its incidents.
+
+        Args:
+            case_id (str): The ID of the judicial case.
+
+        Returns:
+            dict: The same result as `FetchServices.fetch_case_info`.
+        """
+        try:
+            url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/getInformacionJuicio/{case_id}"
+            status_code, data = await self._get_json('getInformacionJuicio', case_id, url, Utils.format_case_info)
+            if status_code == 200:
+                return data
+            else:
+                return {'error': f'Failed to fetch data for case {case_id}', 'status_code': status_code}
+        except Exception as e:
+            return {'error': str(e) or type(e).__name__}
+
+    async def fetch_case_details(self, case_id):
+        """
+        Fetches details of a judicial case based on its ID.
+
+        Args:
+            case_id (str): The ID of the judicial case.
+
+        Returns:
+            dict: The same result as `FetchServices.fetch_case_details`: 'nombreTipoAccion', 'nombreMateria' and
+            'subProcess' if the request is successful, or a dictionary with the 'error' and the 'status_code'
+            otherwise.
+        """
+        extracted_data = await self.fetch_case_info(case_id)
+        if 'error' not in extracted_data:
+            extracted_data['subProcess'] = await self.fetch_incidente_judicatura(case_id)
+        return extracted_data
+
+    async def _gather(self, fetch, items):
+        return await asyncio.gather(*(fetch(item) for item in items))
+
+    def fetch_all(self, fetch, items, timeout=None):
+        """
+        Runs a fetch method for every item on the engine loop and waits for all the results from the calling thread.
+
+        Args:
+            fetch (coroutine function): One of the fetch methods of this class.
+            items (list): The argument of each call.
+            timeout (float, optional): Seconds to wait; on timeout the pending calls are cancelled.
+
+        Returns:
+            list: The results, in the order of the items.
+        """
+        return AsyncHttpEngine.run(self._gather(fetch, items), timeout)
@@ -0,0 +1,98 @@
+from app.utils.utils import Utils
+import threading
+
+
+class SearchCheckpoint:
+    """
+    Keeps the checkpoint of a search up to date while `ScraperService.scrape_process` runs, see
+    `CheckpointRepository`.
+
+    The cases of a result page are registered with `page_listed` and reported with `stored` once written, which can
+    happen out of order and from the writer thread of the pipeline. The last completed page only moves forward when
+    every page up to it has all its cases stored, so resuming from it never skips a case that was not stored. A case
+    whose fetch failed (see `Utils.is_case_fetched`) is not recorded and leaves its page incomplete, so a resumed run
+    fetches it again.
+
+    Args:
+        repository (CheckpointRepository): The checkpoint database.
+        process_type (str): The type of the process, "ofendido" or "demandado".
+        process_id (str): The search ID.
+    """
+
+    def __init__(self, repository, process_type, process_id):
+        self.repository = repository
+        self.process_type = process_type
+        self.process_id = process_id
+        self.lock = threading.Lock()
+        state = repository.load(process_type, process_id)
+        self.last_page = state['last_page']
+        self.done = state['done']
+        self.cases = state['cases']
+        self.resumed = bool(self.last_page or self.done or self.cases)
+        self.pending = {}
+        self.case_pages = {}
+
+    def page_listed(self, page, case_ids):
+        """
+        Registers the cases of a result page that will be stored. A page without such cases is complete at once.
+
+        Args:
+            page (int): The number of the result page.
+            case_ids (list): The `idJuicio` of the cases of the page to fetch and store.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if page <= self.last_page:
+                # A page listed again by a resumed search, already complete
+                return
+            self.pending[page] = len(case_ids)
+            for case_id in case_ids:
+                self.case_pages.setdefault(case_id, []).append(page)
+            last_page = self._advance()
+        if last_page is not None:
+            self.repository.save(self.process_type, self.process_id, last_page=last_page)
+
+    def stored(self, cases):
+        """
+        Records cases written to the data repository, and the last completed page if it moved forward. The cases
+        whose fetch failed are left out.
+
+        Args:
+            cases (list): The stored cases.
+
+        Returns:
+            None
+        """
+        case_ids = []
+        with self.lock:
+            for case in cases:
+                pages = self.case_pages.get(case['idJuicio'])
+                page = pages.pop(0) if pages else None
+                if not Utils.is_case_fetched(case):
+                    continue
+                case_ids.append(case['idJuicio'])
+                if page is not None:
+                    self.pending[page] -= 1
+            self.cases.update(case_ids)
+            last_page = self._advance()
+        self.repository.save(self.process_type, self.process_id, case_ids, last_page)
+
+    def _advance(self):
+        advanced = None
+        while self.pending.get(self.last_page + 1) == 0:
+            self.last_page += 1
+            del self.pending[self.last_page]
+            advanced = self.last_page
+        return advanced
+
+    def finish(self):
+        """
+        Marks the search as done, so a resumed run skips it.
+
+        Returns:
+            None
+        """
+        self.done = True
+        self.repository.save(self.process_type, self.process_id, done=True)
@@ -1,31 +1,115 @@
-from app.infraestructura.repositories.data_repository import DataRepository
+from app.infraestructura.repositories.repository_factory import get_data_repository
+from app.infraestructura.cache.read_cache import read_cache
+from app.infraestructura.repositories.secondary_index import secondary_index
+from app.infraestructura.repositories.text_index import text_index
 from app.utils.utils import Utils
+from itertools import islice
+import json
 
 
 class DataService:
     def __init__(self):
-        self.data_repository = DataRepository()
+        self.data_repository = get_data_repository()
 
-    def get_info_data(self):
-        data = self.data_repository.get_data()
+    def get_info_data(self, limit=None, cursor=None):
+        """
+        Retrieves the list of stored IDs, served from the shared read cache while the dataset version does not change.
+
+        :param limit: Optional page size. When given, the IDs are returned paginated.
+        :type limit: int
+        :param cursor: Optional cursor returned by the previous page.
+        :type cursor: str
+
+        :return: A list with the stored IDs, or when `limit` is given a JSON response with the page of IDs in `data`, the `total` and the `next_cursor` (None on the last page). An invalid cursor returns a message and a status code of 400.
+        """
+        ids = self._get_ids()
+        if limit is None or not isinstance(ids, list):
+            return ids
+        try:
+            offset = Utils.decode_cursor(cursor)
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        end = offset + limit
+        return {
+            'total': len(ids),
+            'data': ids[offset:end],
+            'next_cursor': Utils.encode_cursor(end) if end < len(ids) else None,
+        }
+
+    def _get_ids(self):
+        key = (self.data_repository.location, 'ids')
+        version = self.data_repository.get_version()
+        data = read_cache.get(key, version)
+        if data is None:
+            data = self.data_repository.get_data()
+            if isinstance(data, list):
+                read_cache.set(key, version, data)
         return data
 
-    def get_data_id(self, id):
+    def get_data_id(self, id, limit=None, cursor=None, fields=None, summary=False):
         """
         Retrieves data associated with a given ID from the data repository and returns it in a JSON response.
 
         :param id: The ID of the data to retrieve.
         :type id: str
+        :param limit: Optional page size. When given, only that many cases are returned, with a `next_cursor` to request the next page.
+        :type limit: int
+        :param cursor: Optional cursor returned by the previous page.
+        :type cursor: str
+        :param fields: Optional list of fields to keep in each case, nested fields are written with dots, for example `details.nombreMateria`.
+        :type fields: list[str]
+        :param summary: If True, only the ID and its counters are returned, without cases.
+        :type summary: bool
 
         :return: A JSON response containing the data associated with the given ID, including the ID itself, the total number of data items, and either the entire data list or separate lists for demandados and demandantes, along with the counts of each. If the ID is not found, a JSON response with a message and a status code of 404 is returned.
+
+        Responses are kept in the shared read cache for the current dataset version, so repeated reads of an ID are a dictionary lookup.
+
+        When any of `limit`, `cursor`, `fields` or `summary` is given, the cases are read from the repository generator and the page and projection are applied before serializing, so the response always has the counters and a single `data` list. An invalid cursor returns a message and a status code of 400.
         """
+        if summary or limit is not None or cursor is not None or fields:
+            return self._get_data_id_page(id, limit, cursor, fields, summary)
+
+        key = (self.data_repository.location, 'response', id)
+        version = self.data_repository.get_version()
+        resp = read_cache.get(key, version)
+        if resp is None:
+            resp = self._build_data_id(id)
+            if isinstance(resp, dict):
+                read_cache.set(key, version, resp)
+        return resp
+
+    def _get_data_id_page(self, id, limit, cursor, fields, summary):
+        try:
+            position = Utils.decode_position_cursor(cursor)
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+
+        resp = self.get_stats_id(id)
+        if summary or not isinstance(resp, dict):
+            return resp
+
+        # The cursor is a position the repository seeks to, so a page costs its own records and not the ones before it
+        records = self.data_repository.iter_data_id_from(id, position)
+        try:
+            page = list(islice(records, limit + 1 if limit is not None else None))
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        finally:
+            records.close()
+        following = page.pop() if limit is not None and len(page) > limit else None
+        resp['data'] = [Utils.project_fields(item, fields) if fields else item for _, item in page]
+        resp['next_cursor'] = Utils.encode_position_cursor(following[0]) if following else None
+        return resp
+
+    def _build_data_id(self, id):
         data = self.data_repository.get_data_id(id)
         if not data:
             return {"msg": "ID not found"}, 404
 
-        counts = Utils.count_demandante_demandado(data)
+        counts = self.data_repository.count_data_id(id)
 
-        any_zero = any(value == 0 for value in counts.values())
+        any_zero = counts['count_demandante'] == 0 or counts['count_demandado'] == 0
         resp = {
             'id': id,
             'total': len(data),
@@ -33,11 +117,149 @@ class DataService:
         if any_zero:
             resp['data'] = data
         else:
+            partitions = self.data_repository.get_partitions_id(id)
             resp['data_demandados'] = [
-                item for item in data if item['type'] == 'demandado']
+                data[position] for position in partitions['demandado'] if position < len(data)]
             resp['data_demandantes'] = [
-                item for item in data if item['type'] == 'demandante']
-            resp['count_demandados'] = counts['count_demandado']
-            resp['count_demandante'] = counts['count_demandante']
+                data[position] for position in partitions['demandante'] if position < len(data)]
+            resp['count_demandados'] = len(resp['data_demandados'])
+            resp['count_demandante'] = len(resp['data_demandantes'])
 
         return resp
+
+    def get_stats_id(self, id):
+        """
+        Retrieves the counters of a given ID, maintained by the repository as the data is written, without reading its cases.
+
+        :param id: The ID of the data.
+        :type id: str
+
+        :return: A JSON response with the ID, the total number of cases and the counts of demandados and demandantes. If the ID is not found, a JSON response with a message and a status code of 404 is returned.
+        """
+        counts = self.data_repository.count_data_id(id)
+        if not counts or not counts['total']:
+            return {"msg": "ID not found"}, 404
+        return {
+            'id': id,
+            'total': counts['total'],
+            'count_demandados': counts['count_demandado'],
+            'count_demandante': counts['count_demandante'],
+        }
+
+    def query_data(self, filters, desde=None, hasta=None, limit=None, cursor=None, fields=None):
+        """
+        Searches the cases of every stored ID using the secondary indexes, without scanning the dataset.
+
+        :param filters: Maps the indexed fields ('judicatura', 'materia', 'tipo_accion', 'ciudad') to the value to match. `judicatura` matches the `idJudicatura` or the `nombreJudicatura` of any subprocess.
+        :type filters: dict
+        :param desde: Optional lower bound of `fechaIngreso`, as `yyyy-mm-dd` or `dd/mm/yyyy`.
+        :type desde: str
+        :param hasta: Optional upper bound of `fechaIngreso`, inclusive, as `yyyy-mm-dd` or `dd/mm/yyyy`.
+        :type hasta: str
+        :param limit: Page size.
+        :type limit: int
+        :param cursor: Optional cursor returned by the previous page.
+        :type cursor: str
+        :param fields: Optional list of fields to keep in each case.
+        :type fields: list[str]
+
+        :return: A JSON response with the `total` of matches, the page of cases in `data` (each one with the `id` it was stored under) and the `next_cursor`. Invalid dates or cursor return a message and a status code of 400.
+        """
+        try:
+            offset = Utils.decode_cursor(cursor)
+            desde_key = Utils.parse_fecha(desde) if desde else None
+            hasta_key = Utils.parse_fecha(hasta) if hasta else None
+            if (desde and not desde_key) or (hasta and not hasta_key):
+                raise ValueError('Invalid date, use yyyy-mm-dd or dd/mm/yyyy')
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        if hasta_key and ':' not in hasta:
+            hasta_key = hasta_key[:10] + ' 23:59'
+
+        refs = secondary_index.query(
+            self.data_repository, filters, desde_key, hasta_key)
+        return self._page_refs(refs, offset, limit, fields)
+
+    def search_data(self, text, search_fields, limit=None, cursor=None, fields=None):
+        """
+        Searches the cases of every stored ID by text using the inverted index: offense name, litigant names and type of the judicial acts. Accents and case are ignored, every word must match and the last one also matches as a prefix.
+
+        :param text: The text to search, for example a person's name.
+        :type text: str
+        :param search_fields: The text fields to search in: 'delito', 'litigante' and/or 'actuacion'.
+        :type search_fields: tuple
+        :param limit: Page size.
+        :type limit: int
+        :param cursor: Optional cursor returned by the previous page.
+        :type cursor: str
+        :param fields: Optional list of fields to keep in each case.
+        :type fields: list[str]
+
+        :return: A JSON response with the `total` of matches, the page of cases in `data` (each one with the `id` it was stored under) and the `next_cursor`. An invalid cursor returns a message and a status code of 400.
+        """
+        try:
+            offset = Utils.decode_cursor(cursor)
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        refs = text_index.search(self.data_repository, text, search_fields)
+        return self._page_refs(refs, offset, limit, fields)
+
+    def _page_refs(self, refs, offset, limit, fields):
+        """
+        Reads the records of a page of `(id, position)` references, reading each ID of the page only once.
+        """
+        end = offset + limit
+        page = refs[offset:end]
+
+        positions_by_id = {}
+        for key, position in page:
+            positions_by_id.setdefault(key, set()).add(position)
+        records = {}
+        for key, positions in positions_by_id.items():
+            last = max(positions)
+            for position, item in enumerate(self.data_repository.iter_data_id(key)):
+                if position in positions:
+                    records[(key, position)] = item
+                if position >= last:
+                    break
+
+        data = []
+        for ref in page:
+            if ref in records:
+                item = Utils.project_fields(records[ref], fields) if fields else records[ref]
+                data.append({'id': ref[0], **item})
+        return {
+            'total': len(refs),
+            'data': data,
+            'next_cursor': Utils.encode_cursor(end) if end < len(refs) else None,
+        }
+
+    def stream_data_id(self, id):
+        """
+        Builds a NDJSON stream with the data associated with the given ID.
+
+        The first line is a header record with the ID and its counters, and every following line is one case read
+        from the repository generator, so the response starts right away and the memory used does not depend on the
+        number of cases of the ID.
+
+        :param id: The ID of the data to stream.
+        :type id: str
+
+        :return: A generator of NDJSON lines, or None if the ID is not found.
+        """
+        counts = self.data_repository.count_data_id(id)
+        if not counts or not counts['total']:
+            return None
+
+        def generate():
+            header = {
+                'id': id,
+                'total': counts['total'],
+                'count_demandados': counts['count_demandado'],
+                'count_demandante': counts['count_demandante'],
+            }
+            yield json.dumps(header, ensure_ascii=False) + '\n'
+            for item in self.data_repository.iter_data_id(id):
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+
+        return generate()
@@ -1,11 +1,66 @@
+from app.config import api_url
 from app.utils.utils import Utils
-from concurrent.futures import ThreadPoolExecutor
-import requests
+from app.infraestructura.cache.response_cache import response_cache
+from app.infraestructura.drivers.http_session import HttpSession
 
 
 class FetchServices:
-    def __init__(self):
-        self.url = "https://api.funcionjudicial.gob.ec"
+    def __init__(self, url=None, cache=None):
+        self.url = url or api_url
+        self.response_cache = cache or response_cache
+
+    def _get_json(self, endpoint, case_id, url, parse):
+        """
+        Sends a GET request and returns its status code and its JSON body formatted by `parse`. Successful responses
+        are read from and stored in the on-disk response cache by endpoint and case ID, so repeated scrapes do not call
+        the API again. A body is only stored once `parse` accepted it, so an empty or error body answered with a 200
+        is not served from the cache until it expires.
+
+        Args:
+            endpoint (str): The name of the endpoint, used as part of the cache key.
+            case_id (str): The ID of the judicial case.
+            url (str): The URL of the request.
+            parse (callable): Formats the JSON body, raises if the body is not valid.
+
+        Returns:
+            tuple: The status code and the formatted body, None if the request was not successful.
+        """
+        data = self.response_cache.get(endpoint, case_id)
+        if data is not None:
+            return 200, parse(data)
+        response = HttpSession.get(url)
+        if response.status_code != 200:
+            return response.status_code, None
+        data = response.json()
+        result = parse(data)
+        self.response_cache.set(endpoint, case_id, data)
+        return 200, result
+
+    def search_cases(self, process_type, process_id, page, size):
+        """
+        Fetches a page of the cases of a search from the listing endpoint used by the search page of the judicial site,
+        without a browser. The listing is not cached, since new cases can show up at any time.
+
+        Args:
+            process_type (str): The type of the search. Can be either "ofendido" or "demandado".
+            process_id (str): The identification to search for.
+            page (int): The page to fetch, starting at 1.
+            size (int): The number of cases per page.
+
+        Returns:
+            list: The cases of the page, see `Utils.format_search_results`, an empty list after the last page.
+            dict: If the request fails, a dictionary with the 'error' and the 'status_code' (if there was a response).
+        """
+        try:
+            url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/buscarCausas"
+            response = HttpSession.post(url, params={'page': page, 'size': size},
+                                        json=Utils.format_search_payload(process_type, process_id, page, size))
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {'error': 'Failed to fetch search results', 'status_code': response.status_code}
+        except Exception as e:
+            return {'error': str(e)}
 
     def fetch_actuaciones_judiciales(self, payload):
         """
@@ -35,7 +90,7 @@ class FetchServices:
         try:
             format_payload = Utils.format_data_payload(payload)
             url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/actuacionesJudiciales"
-            response = requests.post(url, json=format_payload)
+            response = HttpSession.post(url, json=format_payload)
             if response.status_code == 200:
                 data = response.json()
                 format_data = Utils.format_data_actuaciones_judiciales(data)
@@ -62,13 +117,33 @@ class FetchServices:
 
         try:
             url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-CLEX-SERVICE/api/consulta-causas-clex/informacion/getIncidenteJudicatura/{case_id}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                format_data = Utils.format_data_sub_process(data)
+            status_code, format_data = self._get_json(
+                'getIncidenteJudicatura', case_id, url, Utils.format_data_sub_process)
+            if status_code == 200:
                 return format_data
             else:
-                return {'error': 'Failed to fetch incident data', 'status_code': response.status_code}
+                return {'error': 'Failed to fetch incident data', 'status_code': status_code}
+        except Exception as e:
+            return {'error': str(e)}
+
+    def fetch_case_info(self, case_id):
+        """
+        Fetches the general information of a judicial case, without its incidents.
+
+        Args:
+            case_id (str): The ID of the judicial case.
+
+        Returns:
+            dict: A dictionary with the 'nombreTipoAccion' and 'nombreMateria' of the case if the request is successful,
+            or a dictionary with the 'error' (and the 'status_code' if there was a response) otherwise.
+        """
+        try:
+            url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/getInformacionJuicio/{case_id}"
+            status_code, data = self._get_json('getInformacionJuicio', case_id, url, Utils.format_case_info)
+            if status_code == 200:
+                return data
+            else:
+                return {'error': f'Failed to fetch data for case {case_id}', 'status_code': status_code}
         except Exception as e:
             return {'error': str(e)}
 
@@ -90,19 +165,7 @@ class FetchServices:
             dict: If an exception occurs during the execution of the function, a dictionary with the following key will be returned:
                 - 'error' (str): The string representation of the exception 'e'.
         """
-        try:
-            url = f"{self.url}/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/getInformacionJuicio/{case_id}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()[0]
-                incident_data = self.fetch_incidente_judicatura(case_id)
-                extracted_data = {
-                    'nombreTipoAccion': data.get('nombreTipoAccion', 'No disponible'),
-                    'nombreMateria': data.get('nombreMateria', 'No disponible'),
-                    'subProcess': incident_data
-                }
-                return extracted_data
-            else:
-                return {'error': f'Failed to fetch data for case {case_id}', 'status_code': response.status_code}
-        except Exception as e:
-            return {'error': str(e)}
+        extracted_data = self.fetch_case_info(case_id)
+        if 'error' not in extracted_data:
+            extracted_data['subProcess'] = self.fetch_incidente_judicatura(case_id)
+        return extracted_data
@@ -0,0 +1,291 @@
+from app.config import scrape_jobs_max_workers, scrape_jobs_retained
+from app.application.services.scraper_service import ScraperService
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+import time
+import uuid
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value).isoformat(timespec='seconds') if value else None
+
+
+class SearchProgress:
+    """
+    The progress of one search (process type and ID) of a scrape job, updated by `ScraperService.scrape_process`.
+
+    Args:
+        job (ScrapeProgress): The progress of the job, which owns the lock and the cancellation flag.
+        process_type (str): The type of the process, "ofendido" or "demandado".
+        process_id (str): The search ID.
+    """
+
+    def __init__(self, job, process_type, process_id):
+        self.job = job
+        self.process_type = process_type
+        self.process_id = process_id
+        self.status = 'pending'
+        self.pages_done = 0
+        self.pages_total = None
+        self.cases_listed = 0
+        self.cases_fetched = 0
+        self.errors = 0
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def cancelled(self):
+        return self.job.cancelled
+
+    def start(self):
+        with self.job.lock:
+            self.status = 'running'
+            self.started = time.time()
+
+    def page(self, cases, pages_total=None):
+        """
+        Records a result page read from the listing.
+
+        Args:
+            cases (int): The cases of the page.
+            pages_total (int, optional): The number of result pages, when it is known.
+        """
+        with self.job.lock:
+            self.pages_done += 1
+            self.cases_listed += cases
+            if pages_total is not None:
+                self.pages_total = pages_total
+
+    def fetched(self, cases):
+        """
+        Records cases with their details, incidents and judicial acts fetched, counting the ones with an `error`.
+
+        Args:
+            cases (list): The finished cases.
+        """
+        with self.job.lock:
+            self.cases_fetched += len(cases)
+            self.errors += sum(1 for case in cases if 'error' in case.get('details', {}))
+
+    def finish(self, status, error=None, pages_total=None):
+        """
+        Records the end of the search.
+
+        Args:
+            status (str): 'success', 'error' or 'cancelled'.
+            error (str, optional): The error of a failed search.
+            pages_total (int, optional): The number of result pages, when it is known.
+        """
+        with self.job.lock:
+            self.status = status
+            self.error = error
+            self.finished = time.time()
+            if pages_total is not None:
+                self.pages_total = pages_total
+
+    def to_dict(self):
+        seconds = ((self.finished or time.time()) - self.started) if self.started else 0
+        progress = {'process_type': self.process_type, 'process_id': self.process_id, 'status': self.status,
+                    'pages_done': self.pages_done, 'pages_total': self.pages_total,
+                    'cases_listed': self.cases_listed, 'cases_fetched': self.cases_fetched, 'errors': self.errors,
+                    'seconds': round(seconds, 3),
+                    'cases_per_second': round(self.cases_fetched / seconds, 2) if seconds else 0}
+        if self.error:
+            progress['error'] = self.error
+        return progress
+
+
+class ScrapeProgress:
+    """
+    The progress of a scrape job: one `SearchProgress` per search and the cancellation flag read by the searches
+    between result pages.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.searches = []
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def search(self, process_type, process_id):
+        """
+        Returns the progress of a search of the job, registered as 'pending'.
+        """
+        progress = SearchProgress(self, process_type, process_id)
+        with self.lock:
+            self.searches.append(progress)
+        return progress
+
+    def to_dict(self):
+        """
+        Returns the progress of each search and the totals of the job.
+        """
+        with self.lock:
+            searches = [search.to_dict() for search in self.searches]
+        totals = {key: sum(search[key] for search in searches)
+                  for key in ('pages_done', 'cases_listed', 'cases_fetched', 'errors')}
+        return {'searches': searches, 'totals': totals}
+
+
+class ScrapeJob:
+    """
+    A run of `ScraperService.init_scraper` in the background.
+
+    Args:
+        mode (str): 'full' or 'incremental'.
+    """
+
+    def __init__(self, mode):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.status = 'queued'
+        self.progress = ScrapeProgress()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def to_dict(self):
+        """
+        Returns the job as returned by the scrape job endpoints.
+
+        Returns:
+            dict: The `id`, `mode` and `status` ('queued', 'running', 'completed', 'failed' or 'cancelled') of the
+            job, its times, the elapsed `seconds`, the progress of each search in `searches` with the `totals`, and
+            once finished the `result` of `init_scraper` or the `error`.
+        """
+        seconds = ((self.finished or time.time()) - self.started) if self.started else 0
+        job = {'id': self.id, 'mode': self.mode, 'status': self.status, 'created_at': _timestamp(self.created),
+               'started_at': _timestamp(self.started), 'finished_at': _timestamp(self.finished),
+               'seconds': round(seconds, 3), **self.progress.to_dict()}
+        totals = job['totals']
+        totals['cases_per_second'] = round(totals['cases_fetched'] / seconds, 2) if seconds else 0
+        if self.result is not None:
+            job['result'] = self.result
+        if self.error is not None:
+            job['error'] = self.error
+        return job
+
+
+class ScrapeJobs:
+    """
+    Runs the scraper in the background of the app process, so the request that starts it returns at once with the
+    job ID, and keeps the jobs to report their progress.
+
+    The jobs run in order on a `ThreadPoolExecutor` of `max_workers` threads; a queued job can be cancelled before it
+    starts, and a running one stops each of its searches before the next result page. The last `retained` finished
+    jobs are kept in memory.
+
+    Args:
+        max_workers (int): The jobs running at the same time.
+        retained (int): The finished jobs kept.
+        service_factory (callable): Creates the `ScraperService` of each job.
+    """
+
+    def __init__(self, max_workers=scrape_jobs_max_workers, retained=scrape_jobs_retained,
+                 service_factory=ScraperService):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-job')
+        self.retained = retained
+        self.service_factory = service_factory
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, incremental=False, fresh=False):
+        """
+        Queues a run of the scraper.
+
+        Args:
+            incremental (bool): If True, runs the incremental mode instead of rebuilding everything.
+            fresh (bool): If True, does not resume the previous run if it was interrupted.
+
+        Returns:
+            ScrapeJob: The queued job.
+        """
+        job = ScrapeJob('incremental' if incremental else 'full')
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, incremental, fresh)
+        return job
+
+    def run(self, incremental=False, fresh=False):
+        """
+        Queues a run of the scraper and waits for it to end, used by `GET /api/scraper`. Going through the queue keeps
+        it from running at the same time as a job, which would reset the data under it and share its checkpoints.
+
+        Args:
+            incremental (bool): If True, runs the incremental mode instead of rebuilding everything.
+            fresh (bool): If True, does not resume the previous run if it was interrupted.
+
+        Returns:
+            ScrapeJob: The finished job.
+        """
+        job = self.submit(incremental, fresh)
+        job.future.result()
+        return job
+
+    def _run(self, job, incremental, fresh):
+        with self.lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'running'
+            job.started = time.time()
+        try:
+            response = self.service_factory().init_scraper(incremental, job.progress, fresh=fresh)
+        except Exception as e:
+            response = {'error': str(e)}
+        with self.lock:
+            job.finished = time.time()
+            if isinstance(response, tuple):
+                job.result = response[0]
+                job.status = 'cancelled' if job.progress.cancelled else 'completed'
+            else:
+                job.error = response.get('error')
+                job.status = 'failed'
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in finished[:max(0, len(finished) - self.retained)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        """
+        Returns a job by its ID, None if there is no such job or it was already discarded.
+        """
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancels a job: a queued job does not run, and the searches of a running job stop before their next result
+        page. The data already written is kept.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            ScrapeJob or None: The job, None if there is no such job.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.done:
+                return job
+            job.progress.cancel_event.set()
+            if job.status == 'queued':
+                job.status = 'cancelled'
+                job.finished = time.time()
+        return job
+
+
+scrape_jobs = ScrapeJobs()
@@ -0,0 +1,308 @@
+from app.config import pipeline_workers, pipeline_queue_depth, pipeline_write_batch
+from app.infraestructura.metrics.registry import metrics
+from queue import Queue, Empty
+import threading
+import time
+
+
+_STOP = object()
+scraper_phases = metrics.histogram(
+    'scraper_phase_duration_seconds', 'Duration of each phase of the scraper', ('phase',))
+
+
+class PipelineStage:
+    """
+    A stage of `CasePipeline`: a bounded queue consumed by a fixed number of worker threads.
+
+    A full queue blocks the producer, so a slow stage slows down the ones before it instead of piling up work in
+    memory. With `batch` greater than 1 the handler gets a list with the item taken from the queue plus the ones
+    already waiting, up to `batch` items, so the batches only grow when the stage falls behind. The time of each call
+    to the handler is recorded in the `scraper_phase_duration_seconds` histogram with the `phase` of the stage.
+
+    An exception of the handler does not stop the worker: it is counted in the `errors` of the stage and passed to
+    `on_error` with the same argument as the handler, so the owner of the items can finish them.
+    """
+
+    def __init__(self, name, handle, workers, depth, batch=1, phase=None, on_error=None):
+        self.name = name
+        self.phase = phase or name
+        self.handle = handle
+        self.on_error = on_error
+        self.batch = batch
+        self.queue = Queue(maxsize=depth)
+        self.depth = depth
+        self.threads = [threading.Thread(target=self._run, name=f'pipeline-{name}-{i}', daemon=True)
+                        for i in range(workers)]
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_queued = 0
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, item):
+        self.queue.put(item)
+        queued = self.queue.qsize()
+        with self.lock:
+            self.max_queued = max(self.max_queued, queued)
+
+    def _take(self):
+        items = [self.queue.get()]
+        while len(items) < self.batch and items[-1] is not _STOP:
+            try:
+                items.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._take()
+            stop = items[-1] is _STOP
+            if stop:
+                items.pop()
+            if items:
+                started = time.monotonic()
+                argument = items if self.batch > 1 else items[0]
+                try:
+                    self.handle(argument)
+                except Exception as e:
+                    with self.lock:
+                        self.errors += 1
+                    if self.on_error is not None:
+                        self.on_error(argument, e)
+                finally:
+                    elapsed = time.monotonic() - started
+                    scraper_phases.observe(elapsed, phase=self.phase)
+                    with self.lock:
+                        self.processed += len(items)
+                        self.busy += elapsed
+            if stop:
+                return
+
+    def close(self):
+        """
+        Stops the workers once the items already queued are handled.
+
+        Returns:
+            None
+        """
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def stats(self):
+        """
+        Returns the counters of the stage.
+
+        Returns:
+            dict: The number of `workers`, the queue `depth`, the items `processed`, the calls to the handler that
+            raised in `errors`, the most items waiting in the queue at once and the seconds the workers spent handling
+            items.
+        """
+        with self.lock:
+            return {'workers': len(self.threads), 'depth': self.depth, 'processed': self.processed,
+                    'errors': self.errors, 'max_queued': self.max_queued, 'busy_seconds': round(self.busy, 3)}
+
+
+class _CaseJob:
+    """
+    A case going through the pipeline, with the number of calls still pending for it.
+    """
+
+    def __init__(self, case):
+        self.case = case
+        self.pending = 2
+        self.lock = threading.Lock()
+
+
+class CasePipeline:
+    """
+    Fetches the cases of a scrape through stages connected by queues, instead of waiting for every case of a result
+    page at each step.
+
+    - details: the general information of the case (`getInformacionJuicio`).
+    - incidents: the incidents of the case (`getIncidenteJudicatura`), fetched at the same time as the details.
+      Each incident is queued for the next stage as soon as they arrive.
+    - actuaciones: the judicial acts of each incident.
+    - writer: a single thread that hands the finished cases to `sink` as they complete, in batches of up to
+      `write_batch` cases.
+
+    The cases are submitted while the result pages are read, so the time of a page is close to the latency of its
+    slowest case, and the calls of a page overlap with the navigation to the next one. A case whose information or
+    incidents could not be fetched keeps the `error` and an empty `subProcess` list, same as
+    `ScraperService.fetch_all_cases`. A handler that raises is treated the same way, so its case is still written.
+
+    Args:
+        fetch_info (callable): Fetches the information of a case ID, see `FetchServices.fetch_case_info`.
+        fetch_incidents (callable): Fetches the incidents of a case ID, see `FetchServices.fetch_incidente_judicatura`.
+        fetch_actuaciones (callable): Fetches the judicial acts of an incident, see
+            `FetchServices.fetch_actuaciones_judiciales`.
+        sink (callable): Called from the writer thread with each list of finished cases.
+        workers (dict): Worker threads of the 'details', 'incidents' and 'actuaciones' stages.
+        queue_depth (dict): Maximum items queued in each stage, including the 'writer'.
+        write_batch (int): Maximum cases per call to `sink`.
+    """
+
+    def __init__(self, fetch_info, fetch_incidents, fetch_actuaciones, sink, workers=None, queue_depth=None,
+                 write_batch=pipeline_write_batch):
+        workers = {**pipeline_workers, **(workers or {})}
+        queue_depth = {**pipeline_queue_depth, **(queue_depth or {})}
+        self.fetch_info = fetch_info
+        self.fetch_incidents = fetch_incidents
+        self.fetch_actuaciones = fetch_actuaciones
+        self.sink = sink
+        self.stages = {
+            'details': PipelineStage('details', self._handle_details, workers['details'], queue_depth['details'],
+                                     on_error=self._fail_case),
+            'incidents': PipelineStage('incidents', self._handle_incidents, workers['incidents'],
+                                       queue_depth['incidents'], on_error=self._fail_case),
+            'actuaciones': PipelineStage('actuaciones', self._handle_actuaciones, workers['actuaciones'],
+                                         queue_depth['actuaciones'], on_error=self._fail_actuaciones),
+            'writer': PipelineStage('writer', self._handle_write, 1, queue_depth['writer'], write_batch, 'write',
+                                    on_error=self._fail_write),
+        }
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.writes = 0
+        self.write_errors = []
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        """
+        Starts the worker threads of every stage.
+
+        Returns:
+            CasePipeline: The pipeline itself.
+        """
+        self.started = time.monotonic()
+        for stage in self.stages.values():
+            stage.start()
+        return self
+
+    def submit(self, case):
+        """
+        Queues a case built by `Utils.format_init`, blocking while the first stages are full.
+
+        Args:
+            case (dict): The case, its `details` are filled in place.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.submitted += 1
+        job = _CaseJob(case)
+        self.stages['details'].put(job)
+        self.stages['incidents'].put(job)
+
+    @staticmethod
+    def _call(fetch, argument):
+        try:
+            return fetch(argument)
+        except Exception as e:
+            return {'error': str(e) or type(e).__name__}
+
+    def _handle_details(self, job):
+        result = self._call(self.fetch_info, job.case['idJuicio'])
+        with job.lock:
+            job.case['details'].update(result)
+        self._finish(job)
+
+    def _handle_incidents(self, job):
+        result = self._call(self.fetch_incidents, job.case['idJuicio'])
+        details = job.case['details']
+        if not isinstance(result, list):
+            with job.lock:
+                details['error'] = result.get('error') if isinstance(result, dict) else str(result)
+                details['subProcess'] = []
+            self._finish(job)
+            return
+        with job.lock:
+            details['subProcess'] = result
+            job.pending += len(result)
+        for subprocess in result:
+            self.stages['actuaciones'].put((job, subprocess))
+        self._finish(job)
+
+    def _handle_actuaciones(self, item):
+        job, subprocess = item
+        payload = {**subprocess, 'idJuicio': job.case['idJuicio']}
+        result = self._call(self.fetch_actuaciones, payload)
+        # Failed calls keep their subprocess without judicial acts
+        if isinstance(result, dict) and 'error' not in result and subprocess['idJudicatura'] in result:
+            with job.lock:
+                subprocess['actuacionesJudiciales'] = result[subprocess['idJudicatura']]
+        self._finish(job)
+
+    def _fail_case(self, job, error):
+        # The handler raised before finishing its part of the case
+        with job.lock:
+            job.case['details']['error'] = str(error) or type(error).__name__
+            job.case['details'].setdefault('subProcess', [])
+        self._finish(job)
+
+    def _fail_actuaciones(self, item, error):
+        # Same as a failed call, the subprocess is kept without judicial acts
+        self._finish(item[0])
+
+    def _fail_write(self, cases, error):
+        with self.lock:
+            self.write_errors.append(str(error) or type(error).__name__)
+
+    def _finish(self, job):
+        with job.lock:
+            job.pending -= 1
+            done = job.pending == 0
+        if done:
+            self.stages['writer'].put(job.case)
+
+    def _handle_write(self, cases):
+        try:
+            self.sink(cases)
+        except Exception as e:
+            with self.lock:
+                self.write_errors.append(str(e))
+            return
+        with self.lock:
+            self.writes += 1
+            self.completed += len(cases)
+            self.errors += sum(1 for case in cases if 'error' in case['details'])
+
+    def close(self):
+        """
+        Waits for every submitted case to be written and stops the workers, stage by stage.
+
+        Returns:
+            dict: The pipeline stats, see `stats`.
+
+        Raises:
+            RuntimeError: If `sink` failed, with its first error.
+        """
+        for name in ('details', 'incidents', 'actuaciones', 'writer'):
+            self.stages[name].close()
+        self.finished = time.monotonic()
+        if self.write_errors:
+            raise RuntimeError(self.write_errors[0])
+        return self.stats()
+
+    def stats(self):
+        """
+        Returns the counters of the pipeline.
+
+        Returns:
+            dict: The cases `submitted`, `completed` (written) and completed with an `error`, the number of `writes`,
+            the `seconds` since the start and the stats of each stage in `stages`.
+        """
+        end = self.finished or time.monotonic()
+        with self.lock:
+            return {'submitted': self.submitted, 'completed': self.completed, 'errors': self.errors,
+                    'writes': self.writes, 'seconds': round(end - self.started, 3) if self.started else 0,
+                    'stages': {name: stage.stats() for name, stage in self.stages.items()}}
@@ -1,4 +1,5 @@
-from app.config import url_scraper, array_search
+from app.config import (url_scraper, array_search, fetch_engine, incremental_active_days, scrape_pipeline_enabled,
+                        search_mode, search_page_size, scrape_resume_enabled)
 from app.utils.utils import Utils
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -6,10 +7,32 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.keys import Keys
 from app.application.services.fetch_service import FetchServices
-from app.infraestructura.repositories.data_repository import DataRepository
-from app.infraestructura.drivers.selenium_driver import SeleniumDriver
+from app.application.services.async_fetch_service import AsyncFetchServices
+from app.application.services.pipeline_service import CasePipeline
+from app.application.services.checkpoint_service import SearchCheckpoint
+from app.infraestructura.repositories.repository_factory import get_data_repository
+from app.infraestructura.repositories.checkpoint_repository import CheckpointRepository
+from app.infraestructura.drivers.driver_pool import driver_pool
+from app.infraestructura.drivers.page_readiness import PageReadiness, PAGINATOR_LABEL, results_loaded, text_changed
+from app.infraestructura.drivers.http_session import HttpSession
+from app.infraestructura.drivers.async_http import AsyncHttpEngine
+from app.infraestructura.drivers.rate_controller import rate_controller
+from app.infraestructura.cache.response_cache import response_cache
+from app.infraestructura.cache.single_flight import single_flight
+from app.infraestructura.metrics.registry import metrics
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from time import sleep
+from datetime import date, timedelta
+import json
+
+
+scraper_phases = metrics.histogram(
+    'scraper_phase_duration_seconds', 'Duration of each phase of the scraper', ('phase',))
+
+
+class ScrapeCancelled(Exception):
+    """
+    Raised between two result pages when the scrape job of the search was cancelled.
+    """
 
 
 class ScraperService:
@@ -18,7 +41,54 @@ class ScraperService:
         self.current_page = 1
         self.pagination = 0
         self.fetch_services = FetchServices()
-        self.data_repository = DataRepository()
+        self.async_fetch_services = AsyncFetchServices()
+        self.data_repository = get_data_repository()
+        self.checkpoints = CheckpointRepository()
+
+    def fetch_case_details(self, case_id):
+        """
+        Fetches the details of a case once per scraper run, see `SingleFlight`.
+        """
+        return single_flight.do(('case', case_id), lambda: self.fetch_services.fetch_case_details(case_id))
+
+    async def fetch_case_details_async(self, case_id):
+        return await single_flight.do_async(
+            ('case', case_id), lambda: self.async_fetch_services.fetch_case_details(case_id))
+
+    def fetch_case_info(self, case_id):
+        """
+        Fetches the information of a case, without its incidents, once per scraper run.
+        """
+        return single_flight.do(('info', case_id), lambda: self.fetch_services.fetch_case_info(case_id))
+
+    async def fetch_case_info_async(self, case_id):
+        return await single_flight.do_async(
+            ('info', case_id), lambda: self.async_fetch_services.fetch_case_info(case_id))
+
+    def fetch_incidente_judicatura(self, case_id):
+        """
+        Fetches the incidents of a case once per scraper run.
+        """
+        return single_flight.do(('incidente', case_id), lambda: self.fetch_services.fetch_incidente_judicatura(case_id))
+
+    async def fetch_incidente_judicatura_async(self, case_id):
+        return await single_flight.do_async(
+            ('incidente', case_id), lambda: self.async_fetch_services.fetch_incidente_judicatura(case_id))
+
+    @staticmethod
+    def _actuaciones_key(payload):
+        return ('actuaciones', json.dumps(Utils.format_data_payload(payload), sort_keys=True, default=str))
+
+    def fetch_actuaciones_judiciales(self, payload):
+        """
+        Fetches the judicial acts of a subprocess once per scraper run, keyed by the request payload.
+        """
+        return single_flight.do(self._actuaciones_key(payload),
+                                lambda: self.fetch_services.fetch_actuaciones_judiciales(payload))
+
+    async def fetch_actuaciones_judiciales_async(self, payload):
+        return await single_flight.do_async(
+            self._actuaciones_key(payload), lambda: self.async_fetch_services.fetch_actuaciones_judiciales(payload))
 
     def fetch_all_act_jud(self, list_process, process_id):
         """
@@ -32,7 +102,7 @@ class ScraperService:
             list: A list of processes with updated subprocess details.
 
         Description:
-            This function fetches the details of judicial acts for each subprocess in the given process. It uses the `Utils.extract_info_subprocess` function to extract the necessary information from the subprocesses. It then uses a `ThreadPoolExecutor` to fetch the details in parallel. The results are combined into a single dictionary and then updated in the original list of processes. Finally, the updated list of processes is returned.
+            This function fetches the details of judicial acts for each subprocess in the given process. It uses the `Utils.extract_info_subprocess` function to extract the necessary information from the subprocesses. It then uses a `ThreadPoolExecutor` to fetch the details in parallel, or the shared event loop of `AsyncHttpEngine` when `fetch_engine` is 'asyncio'. The results are combined into a single dictionary and then updated in the original list of processes. Finally, the updated list of processes is returned.
 
         Note:
             This function assumes that the `Utils.extract_info_subprocess` function is defined in the `Utils` class.
@@ -41,10 +111,16 @@ class ScraperService:
             list_process[process_id])
 
         combined_results = {}
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = list(executor.map(
-                self.fetch_services.fetch_actuaciones_judiciales, extract_subprocess))
-            for result in results:
+        if fetch_engine == 'asyncio':
+            results = self.async_fetch_services.fetch_all(
+                self.fetch_actuaciones_judiciales_async, extract_subprocess)
+        else:
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                results = list(executor.map(
+                    self.fetch_actuaciones_judiciales, extract_subprocess))
+        for result in results:
+            # Failed calls keep their subprocess without judicial acts
+            if 'error' not in result:
                 combined_results.update(result)
 
         for process in list_process[process_id]:
@@ -67,35 +143,111 @@ class ScraperService:
             dict: A dictionary containing the updated list of processes.
 
         Description:
-            This function fetches the details of multiple cases in parallel using a ThreadPoolExecutor. It takes a list of processes and a process ID as input. It extracts the case IDs from the list of processes and uses the ThreadPoolExecutor to fetch the details of each case in parallel. The results are then combined into a single list and updated in the original list of processes. Finally, the updated list of processes is returned.
+            This function fetches the details of multiple cases in parallel using a ThreadPoolExecutor, or the shared event loop of `AsyncHttpEngine` when `fetch_engine` is 'asyncio'. It takes a list of processes and a process ID as input. It extracts the case IDs from the list of processes and uses the ThreadPoolExecutor to fetch the details of each case in parallel. The results are then combined into a single list and updated in the original list of processes; a case whose details or incidents could not be fetched keeps the `error` and an empty `subProcess` list. Finally, the updated list of processes is returned.
         """
 
         case_ids = [case['idJuicio']
                     for case in list_process[process_id]]
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            results = list(executor.map(
-                self.fetch_services.fetch_case_details, case_ids))
+        if fetch_engine == 'asyncio':
+            results = self.async_fetch_services.fetch_all(
+                self.fetch_case_details_async, case_ids)
+        else:
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                results = list(executor.map(
+                    self.fetch_case_details, case_ids))
 
         for i in range(len(list_process[process_id])):
-            list_process[process_id][i]['details'].update(results[i])
+            details = list_process[process_id][i]['details']
+            details.update(results[i])
+            sub_process = details.get('subProcess')
+            if not isinstance(sub_process, list):
+                # The case or its incidents could not be fetched, keep the error without subprocesses
+                if isinstance(sub_process, dict) and 'error' in sub_process:
+                    details['error'] = sub_process['error']
+                details['subProcess'] = []
 
         return list_process
 
-    def get_pagination(self, wait):
+    def create_pipeline(self, process_id, incremental=False, listeners=()):
+        """
+        Creates the stage pipeline of a search, see `CasePipeline`.
+
+        Args:
+            process_id (str): The search ID.
+            incremental (bool): If True the finished cases are not written, since the incremental mode replaces the
+                records of the search at the end.
+            listeners (list): Called from the writer thread with each list of finished cases once written, see
+                `scrape_process`.
+
+        Returns:
+            CasePipeline: The started pipeline. Its stages call the API through the single-flight wrappers, on the
+            shared event loop of `AsyncHttpEngine` when `fetch_engine` is 'asyncio'.
+        """
+        if fetch_engine == 'asyncio':
+            fetchers = (lambda case_id: AsyncHttpEngine.run(self.fetch_case_info_async(case_id)),
+                        lambda case_id: AsyncHttpEngine.run(self.fetch_incidente_judicatura_async(case_id)),
+                        lambda payload: AsyncHttpEngine.run(self.fetch_actuaciones_judiciales_async(payload)))
+        else:
+            fetchers = (self.fetch_case_info, self.fetch_incidente_judicatura, self.fetch_actuaciones_judiciales)
+
+        def sink(cases):
+            if not incremental:
+                self.data_repository.update_data({process_id: cases}, process_id)
+            for listener in listeners:
+                listener(cases)
+        return CasePipeline(*fetchers, sink).start()
+
+    def get_stored_cases(self, process_id, record_type):
+        """
+        Returns the stored records of a search ID and type by `idJuicio`, used by the incremental mode.
+
+        Args:
+            process_id (str): The search ID.
+            record_type (str): 'demandado' or 'demandante'.
+
+        Returns:
+            dict: A dictionary with the `idJuicio` as key and the stored record as value.
+        """
+        return {record.get('idJuicio'): record for record in self.data_repository.iter_data_id(process_id)
+                if record.get('type') == record_type}
+
+    def is_case_changed(self, case, stored):
+        """
+        Checks if a case of the listing has to be fetched again in the incremental mode.
+
+        Args:
+            case (dict): The case built by `Utils.format_init` from the listing.
+            stored (dict or None): The stored record with the same `idJuicio`, None if there is none.
+
+        Returns:
+            bool: True if the case is new, its `fechaIngreso` changed, its previous fetch failed, or its latest
+            judicial act is from the last `incremental_active_days` days (an active case may have new acts, which the
+            listing does not show). False if the stored record can be kept.
+        """
+        if stored is None or stored.get('fechaIngreso') != case.get('fechaIngreso'):
+            return True
+        if not Utils.is_case_fetched(stored):
+            return True
+        latest = Utils.latest_actuacion_date(stored)
+        active_since = (date.today() - timedelta(days=incremental_active_days)).isoformat()
+        return latest is not None and latest >= active_since
+
+    def get_pagination(self, wait, readiness):
         """
         Retrieves the pagination information from the web page.
 
         Args:
             wait (WebDriverWait): The WebDriverWait object used to wait for elements to be present.
+            readiness (PageReadiness): Waits for the results to be rendered, see `results_loaded`.
 
         Returns:
             int or Exception: The number of pages if pagination is available, 0 if there are no results, or an Exception if an error occurs.
 
         Description:
-            This function waits for the presence of the element with the CSS selector ".cantidadMovimiento" and retrieves the text of that element. If the text is not empty, it splits the text by ': ' to extract the number of results. If the number of results is greater than 0, it waits for the presence of all elements with the CSS selector ".mat-mdc-paginator-range-label" and retrieves the text of the first element. It then splits the text by ' de ' to extract the number of pages. Finally, it returns the number of pages. If there are no results or an error occurs, it returns 0 or the Exception object respectively.
+            This function waits until the results are rendered (at most the 'results' ceiling of `readiness_timeouts`) and for the presence of the element with the CSS selector ".cantidadMovimiento" and retrieves the text of that element. If the text is not empty, it splits the text by ': ' to extract the number of results. If the number of results is greater than 0, it waits for the presence of all elements with the CSS selector ".mat-mdc-paginator-range-label" and retrieves the text of the first element. It then splits the text by ' de ' to extract the number of pages. Finally, it returns the number of pages. If there are no results or an error occurs, it returns 0 or the Exception object respectively.
         """
         try:
-            sleep(3)
+            readiness.wait('results', results_loaded, replaces=3)
             resultados_element = wait.until(
                 EC.presence_of_element_located(
                     (By.CSS_SELECTOR, ".cantidadMovimiento")
@@ -117,16 +269,17 @@ class ScraperService:
         except Exception as e:
             return e
 
-    def reload_get_pagination(self, wait, data):
+    def reload_get_pagination(self, wait, readiness, data):
         """
         Reloads the pagination information by clicking on a link and navigating back.
 
         Args:
             wait (WebDriverWait): The WebDriverWait object used to wait for elements to be present.
+            readiness (PageReadiness): Waits for the movements page to be loaded.
             data (list): A list of elements containing the first juicio ID.
 
         Description:
-            This function retrieves the first juicio ID from the first element in the data list. It then waits for the presence of an element with the CSS selector 'a[aria-label="Vínculo para ingresar a los movimientos del proceso {id_first_juicio}"]' and clicks on it. After a 4-second delay, it waits for the presence of an element with the CSS selector '.btn-regresar' and clicks on it.
+            This function retrieves the first juicio ID from the first element in the data list. It then waits for the presence of an element with the CSS selector 'a[aria-label="Vínculo para ingresar a los movimientos del proceso {id_first_juicio}"]' and clicks on it. Once the element with the CSS selector '.btn-regresar' is present and the network is idle (at most the 'reload' ceiling of `readiness_timeouts`), it clicks on it.
         """
         id_first_juicio = data[0].find_element(
             By.CSS_SELECTOR, ".numero-proceso").text
@@ -137,8 +290,10 @@ class ScraperService:
                  f'a[aria-label="Vínculo para ingresar a los movimientos del proceso {id_first_juicio}"]')
             ))
 
+        network_idle = readiness.network_idle()
         elemento_href.click()
-        sleep(4)
+        readiness.wait('reload', EC.presence_of_element_located(
+            (By.CSS_SELECTOR, '.btn-regresar')), network_idle, replaces=4)
         btn_back = wait.until(EC.presence_of_element_located(
             (By.CSS_SELECTOR, '.btn-regresar')))
         btn_back.click()
@@ -164,12 +319,13 @@ class ScraperService:
 
         return causas_individuales
 
-    def search_data(self, wait, process_type, process_id):
+    def search_data(self, wait, readiness, process_type, process_id):
         """
         Searches for data based on the given process type and process ID.
 
         Args:
             wait (WebDriverWait): The WebDriverWait object used to wait for elements to be present.
+            readiness (PageReadiness): Waits for the search requests to finish.
             process_type (str): The type of the process. Can be either "ofendido" or "demandado/procesado".
             process_id (str): The ID of the process to search for.
 
@@ -177,7 +333,7 @@ class ScraperService:
             dict or int: If the data is found, returns the pagination information. If an error occurs, returns a dictionary with the error message.
 
         Description:
-            This function searches for data based on the given process type and process ID. It uses the WebDriverWait object to wait for the input element with the specified placeholder to be present on the page. It then enters the process ID into the input element and presses the Enter key. After a short delay, it calls the `get_pagination` method to retrieve the pagination information.
+            This function searches for data based on the given process type and process ID. It uses the WebDriverWait object to wait for the input element with the specified placeholder to be present on the page. It then enters the process ID into the input element and presses the Enter key. Once the network is idle (at most the 'search' ceiling of `readiness_timeouts`), it calls the `get_pagination` method to retrieve the pagination information.
 
             If an error occurs during the search process, a dictionary with the error message is returned.
         """
@@ -192,24 +348,26 @@ class ScraperService:
             ))
 
             input_element.send_keys(process_id)
+            network_idle = readiness.network_idle()
             input_element.send_keys(Keys.ENTER)
-            sleep(1)
-            return self.get_pagination(wait)
+            readiness.wait('search', network_idle, replaces=1)
+            return self.get_pagination(wait, readiness)
         except Exception as e:
             return {'error': str(e)}
 
-    def next_page(self, wait):
+    def next_page(self, wait, readiness):
         """
         Clicks on the next page button on a web page.
 
         Args:
             wait (WebDriverWait): The WebDriverWait object used to wait for elements to be present.
+            readiness (PageReadiness): Waits for the next page to be loaded.
 
         Returns:
             Exception or None: If an exception occurs during the process, it is returned. Otherwise, None is returned.
 
         Description:
-            This function uses the WebDriverWait object to wait for the presence of the next page button on a web page. Once the button is located, it is clicked. If an exception occurs during the process, it is returned. Otherwise, None is returned.
+            This function uses the WebDriverWait object to wait for the presence of the next page button on a web page. Once the button is located, it is clicked, and the function waits until the label of the paginator changes and the network is idle (at most the 'next_page' ceiling of `readiness_timeouts`), so the cases read next are the ones of the new page. If an exception occurs during the process, it is returned. Otherwise, None is returned.
         """
         try:
             next_page = wait.until(
@@ -217,98 +375,312 @@ class ScraperService:
                     (By.CSS_SELECTOR, ".mat-mdc-tooltip-trigger.mat-mdc-paginator-navigation-next.mdc-icon-button.mat-mdc-icon-button.mat-unthemed.mat-mdc-button-base")
                 )
             )
+            label = readiness.driver.find_element(*PAGINATOR_LABEL).text
+            network_idle = readiness.network_idle()
             next_page.click()
+            readiness.wait('next_page', text_changed(PAGINATOR_LABEL, label), network_idle, replaces=1)
         except Exception as e:
             return e
 
-    def scrape_process(self, process_type, process_id):
+    def iter_pages_browser(self, process_type, process_id, report=None, start_page=1):
         """
-        Scrapes a process based on the given process type and process ID.
+        Lists the cases of a search page by page with the search page of the judicial site, using Selenium.
 
         Args:
             process_type (str): The type of the process. Can be either "ofendido" or "demandado".
-            process_id (str): The ID of the process to scrape.
+            process_id (str): The ID of the process to search for.
+            report (dict, optional): Filled with the number of result pages in `pages_total` once it is known, and
+                with the time spent waiting for the page in `readiness`, see `PageReadiness.stats`.
+            start_page (int): The first page to read. The search page has no way to jump to a page, so the pages
+                before it are still navigated, but not read.
 
-        Returns:
-            dict: A dictionary containing the process ID, process type, and status of the scraping process.
-                - process_id (str): The ID of the process.
-                - process_type (str): The type of the process.
-                - status (str): The status of the scraping process. Can be either "success" or "error".
-                - error (str, optional): The error message if the scraping process encounters an exception.
+        Yields:
+            list: The cases of each result page, see `Utils.format_init`.
 
         Description:
-            This function uses Selenium to scrape a process based on the given process type and process ID.
-            It initializes a Selenium driver and a WebDriverWait object.
             It navigates to the URL scraper and searches for data based on the process type and process ID.
             If no pagination are found, it reloads the page and gets the pagination information.
-            It then iterates through each page and fetches the necessary data.
-            The fetched data is updated in the data repository.
-            The function returns a dictionary containing the process ID, process type, and status of the scraping process.
-            If an exception occurs during the scraping process, the function returns a dictionary with the error message.
+            The browser is taken from `driver_pool` for the search and given back at the end, so the searches running at the same time use their own browser and the next ones reuse it.
+            It then iterates through each page. Instead of fixed sleeps, each step waits for the page to be ready with `PageReadiness` (DOM conditions, the label of the paginator and the network idle), up to the ceilings of `readiness_timeouts`.
         """
-        driver = SeleniumDriver.get_driver()
-        wait = WebDriverWait(driver, 50)
-
-        try:
-            driver.get(url_scraper)
-            pages = self.search_data(wait, process_type, process_id)
+        with driver_pool.driver() as driver:
+            wait = WebDriverWait(driver, 50)
+            readiness = PageReadiness(driver)
+            with scraper_phases.time(phase='search'):
+                driver.get(url_scraper)
+                pages = self.search_data(wait, readiness, process_type, process_id)
             current_page = 1
 
             if pages == 0:
-                list_data = self.wait_for_page_data_load(wait)
-                self.reload_get_pagination(wait, list_data)
-                pages = self.get_pagination(wait)
+                with scraper_phases.time(phase='pagination'):
+                    list_data = self.wait_for_page_data_load(wait)
+                    self.reload_get_pagination(wait, readiness, list_data)
+                    pages = self.get_pagination(wait, readiness)
+            if report is not None and isinstance(pages, int):
+                report['pages_total'] = pages
 
             while current_page <= pages:
-                if (current_page > 1):
-                    self.next_page(wait)
+                with scraper_phases.time(phase='pagination'):
+                    if (current_page > 1):
+                        self.next_page(wait, readiness)
+
+                    list_process = self.wait_for_page_data_load(wait)
+                if current_page >= start_page:
+                    with scraper_phases.time(phase='listing_parse'):
+                        cases = Utils.format_init(list_process, process_id, process_type)[process_id]
+                    yield cases
+                current_page += 1
+            if report is not None:
+                report['readiness'] = readiness.stats(pages)
 
-                list_process = self.wait_for_page_data_load(wait)
-                format_list_causas = Utils.format_init(
-                    list_process, process_id, process_type)
+    def iter_pages_http(self, process_type, process_id, report=None, start_page=1):
+        """
+        Lists the cases of a search page by page with the listing endpoint of the API, without a browser.
 
-                result_details = self.fetch_all_cases(
-                    format_list_causas, process_id)
+        Args:
+            process_type (str): The type of the process. Can be either "ofendido" or "demandado".
+            process_id (str): The ID of the process to search for.
+            report (dict, optional): Filled with the number of result pages in `pages_total` once the last page is
+                read, since the endpoint does not return the total.
+            start_page (int): The first page to read.
 
-                result_act_jud = self.fetch_all_act_jud(
-                    result_details, process_id)
+        Yields:
+            list: The cases of each page of up to `search_page_size` cases, see `Utils.format_search_results`. The
+            endpoint may cap the size of the pages below `search_page_size`, so the listing ends with an empty page or
+            with a page shorter than the previous ones.
 
-                sleep(3)
-                self.data_repository.update_data(result_act_jud, process_id)
-                sleep(1)
-                current_page += 1
-            driver.quit()
-            return {'process_id': process_id, 'process_type': process_type, 'status': 'success'}
+        Raises:
+            RuntimeError: If a page of the listing could not be fetched.
+        """
+        page = start_page
+        largest = 0
+        while True:
+            with scraper_phases.time(phase='search'):
+                data = self.fetch_services.search_cases(process_type, process_id, page, search_page_size)
+            if not isinstance(data, list):
+                raise RuntimeError(data.get('error', 'Failed to fetch search results'))
+            if data:
+                with scraper_phases.time(phase='listing_parse'):
+                    cases = Utils.format_search_results(data, process_id, process_type)[process_id]
+                yield cases
+            if not data or len(data) < largest:
+                if report is not None:
+                    report['pages_total'] = page if data else page - 1
+                return
+            largest = len(data)
+            page += 1
+
+    def scrape_process(self, process_type, process_id, incremental=False, progress=None, checkpoint=None):
+        """
+        Scrapes a process based on the given process type and process ID.
+
+        Args:
+            process_type (str): The type of the process. Can be either "ofendido" or "demandado".
+            process_id (str): The ID of the process to scrape.
+            incremental (bool): If True, only the new or changed cases are fetched (see `is_case_changed`), the others
+                keep their stored record, and the records of this ID and type are replaced at the end.
+            progress (SearchProgress, optional): Receives the pages read and the cases fetched of a scrape job, and
+                tells if the job was cancelled, see `ScrapeJobs`.
+            checkpoint (SearchCheckpoint, optional): The checkpoint of the search in the current run, see `init_scraper`.
 
+        Returns:
+            dict: A dictionary containing the process ID, process type, and status of the scraping process. In the incremental mode it also has the number of cases `fetched` and `unchanged`.
+                - process_id (str): The ID of the process.
+                - process_type (str): The type of the process.
+                - status (str): The status of the scraping process. Can be either "success", "error" or "cancelled".
+                - error (str, optional): The error message if the scraping process encounters an exception.
+                - pipeline (dict, optional): The stats of the stage pipeline when `scrape_pipeline_enabled`, see `CasePipeline.stats`.
+                - readiness (dict, optional): The time spent waiting for the search page in the 'browser' mode and the time saved per page compared to the fixed sleeps, see `PageReadiness.stats`.
+                - checkpoint (dict, optional): When the search resumes an interrupted run, the page it `resumed_from_page` and the `skipped_cases` already stored, or `done` if it had finished.
+
+        Description:
+            This function lists the cases of the search page by page, with Selenium (`iter_pages_browser`) or, when `search_mode` is 'http', with the listing endpoint of the API (`iter_pages_http`).
+            With `scrape_pipeline_enabled` the cases of each page are submitted to a `CasePipeline`, which fetches and writes them in the background while the next pages are read; otherwise each page is fetched stage by stage.
+            The fetched data is updated in the data repository.
+            The time of each phase (search, pagination, listing_parse, details, incidents, actuaciones and write) is recorded in the `scraper_phase_duration_seconds` histogram.
+            The function returns a dictionary containing the process ID, process type, and status of the scraping process.
+            If an exception occurs during the scraping process, the function returns a dictionary with the error message.
+            When the scrape job of `progress` is cancelled, the search stops before the next result page; the cases already submitted to the pipeline are still written.
+            With a `checkpoint`, each page is recorded once all its cases are stored, along with the stored case IDs. A resumed search that had finished is skipped; otherwise, in the full mode, it starts at the page after the last completed one and skips the cases already stored, while the cases whose fetch failed are fetched again and their failed records replaced. In the incremental mode the records are only replaced at the end, so only finished searches are skipped.
+        """
+        record_type = 'demandado' if process_type == 'demandado' else 'demandante'
+        listing = {}
+        pipeline = None
+        # Page checkpoints only apply to the full mode, which writes the cases as they are fetched
+        paged = checkpoint is not None and not incremental
+        start_page = checkpoint.last_page + 1 if paged else 1
+        listeners = []
+        if progress is not None:
+            listeners.append(progress.fetched)
+        if paged:
+            listeners.append(checkpoint.stored)
+
+        try:
+            self.check_cancelled(progress)
+            if progress is not None:
+                progress.start()
+            if checkpoint is not None and checkpoint.done:
+                if progress is not None:
+                    progress.finish('success')
+                return {'process_id': process_id, 'process_type': process_type, 'status': 'success',
+                        'checkpoint': {'done': True}}
+            enriched = set()
+            if paged and checkpoint.resumed:
+                # Cases written right before the interruption may be missing from the checkpoint, and the cases
+                # whose fetch failed are fetched again whichever side lists them
+                previous = self.get_stored_cases(process_id, record_type)
+                fetched_ids = {case_id for case_id, record in previous.items() if Utils.is_case_fetched(record)}
+                enriched = {case_id for case_id in checkpoint.cases | set(previous) if case_id in fetched_ids}
+                if len(fetched_ids) < len(previous):
+                    # Their stored records are dropped, so the new fetch does not add a second one, and the listing
+                    # starts again from the first page, since they may be on pages before the checkpoint
+                    self.data_repository.replace_data(
+                        process_id, [previous[case_id] for case_id in fetched_ids], record_type)
+                    start_page = 1
+            pipeline = self.create_pipeline(
+                process_id, incremental, listeners) if scrape_pipeline_enabled else None
+            stored = self.get_stored_cases(
+                process_id, record_type) if incremental else {}
+            refreshed = []
+            fetched = 0
+            skipped = 0
+
+            if search_mode == 'http':
+                pages = self.iter_pages_http(process_type, process_id, listing, start_page)
+            else:
+                pages = self.iter_pages_browser(process_type, process_id, listing, start_page)
+
+            for page, cases in enumerate(pages, start_page):
+                self.check_cancelled(progress)
+                if progress is not None:
+                    progress.page(len(cases), listing.get('pages_total'))
+                if paged:
+                    pending = [case for case in cases if case['idJuicio'] not in enriched]
+                    skipped += len(cases) - len(pending)
+                    cases = pending
+                    # Registered before the cases are submitted, so the writer always finds their page
+                    checkpoint.page_listed(page, [case['idJuicio'] for case in cases])
+                if incremental:
+                    changed = [case for case in cases if self.is_case_changed(
+                        case, stored.get(case['idJuicio']))]
+                    changed_ids = {id(case) for case in changed}
+                    refreshed.extend(case if id(case) in changed_ids else stored[case['idJuicio']]
+                                     for case in cases)
+                else:
+                    changed = cases
+                fetched += len(changed)
+
+                if pipeline is not None:
+                    # The cases are fetched and written in the background while the next page is loaded
+                    for case in changed:
+                        pipeline.submit(case)
+                elif changed:
+                    with scraper_phases.time(phase='details'):
+                        result_details = self.fetch_all_cases(
+                            {process_id: changed}, process_id)
+
+                    with scraper_phases.time(phase='actuaciones'):
+                        result_act_jud = self.fetch_all_act_jud(
+                            result_details, process_id)
+
+                    if not incremental:
+                        with scraper_phases.time(phase='write'):
+                            self.data_repository.update_data(result_act_jud, process_id)
+                    for listener in listeners:
+                        listener(result_act_jud[process_id])
+
+            result = {'process_id': process_id, 'process_type': process_type, 'status': 'success'}
+            if pipeline is not None:
+                pipeline, running = None, pipeline
+                result['pipeline'] = running.close()
+            if 'readiness' in listing:
+                result['readiness'] = listing['readiness']
+            if incremental:
+                self.data_repository.replace_data(
+                    process_id, refreshed, record_type)
+                result.update({'fetched': fetched, 'unchanged': len(refreshed) - fetched})
+            if checkpoint is not None:
+                checkpoint.finish()
+                if paged and checkpoint.resumed:
+                    result['checkpoint'] = {'resumed_from_page': start_page, 'skipped_cases': skipped}
+            if progress is not None:
+                progress.finish('success', pages_total=listing.get('pages_total'))
+            return result
+
+        except ScrapeCancelled:
+            if progress is not None:
+                progress.finish('cancelled')
+            return {'process_id': process_id, 'process_type': process_type, 'status': 'cancelled'}
         except Exception as e:
+            if progress is not None:
+                progress.finish('error', str(e))
             return {'process_id': process_id, 'process_type': process_type, 'status': 'error', 'error': str(e)}
+        finally:
+            if pipeline is not None:
+                try:
+                    pipeline.close()
+                except RuntimeError:
+                    pass
+
+    @staticmethod
+    def check_cancelled(progress):
+        """
+        Raises `ScrapeCancelled` if the scrape job of `progress` was cancelled.
+        """
+        if progress is not None and progress.cancelled:
+            raise ScrapeCancelled()
 
-    def init_scraper(self):
+    def init_scraper(self, incremental=False, progress=None, resume=scrape_resume_enabled, fresh=False):
         """
         Executes the scraping process concurrently using a ThreadPoolExecutor.
 
         Performs up to 15 queries in parallel and handles any potential errors that may occur during the process.
+        In the incremental mode the stored data is kept and only the new or changed cases are fetched again.
+        With `resume`, the progress of each search is saved in `checkpoints`. If the previous run of the same mode did not finish (the process died, the job was cancelled or a search failed), it is resumed without resetting the data: the finished searches are skipped and the others continue from their checkpoint, see `scrape_process`. A run is only resumed up to `scrape_resume_max_attempts` times and within `scrape_resume_max_age` seconds of its start, see `CheckpointRepository.begin_run`, and `fresh` always starts a new one.
+
+        Args:
+            incremental (bool): If True, runs the incremental mode instead of rebuilding everything.
+            progress (ScrapeProgress, optional): The progress of the scrape job running the scraper, which receives
+                the progress of each search, see `ScrapeJobs`.
+            resume (bool): If True, saves checkpoints and resumes the previous run if it was interrupted.
+            fresh (bool): If True, starts a new run even if the previous one was interrupted, the checkpoints are
+                still saved.
 
         Returns:
-            JSON with the completion message of the process or a dictionary with the error.
+            JSON with the completion message of the process, whether it `resumed` an interrupted run, the result of each search in `searches`, the usage of the shared HTTP connection pool in `http` (of the asyncio client when `fetch_engine` is 'asyncio') and the counters of the on-disk response cache in `response_cache`, the state of the adaptive rate controller in `rate_controller` and the duplicate calls saved by the single-flight layer in `single_flight` and the counters of the browser pool in `driver_pool`, or a dictionary with the error.
         """
         try:
-            self.data_repository.reset_data()
+            resumed = resume and self.checkpoints.begin_run(
+                'incremental' if incremental else 'full', {'search_mode': search_mode, 'page_size': search_page_size},
+                fresh=fresh)
+            if not incremental and not resumed:
+                self.data_repository.reset_data()
+            single_flight.reset()
             results = []
             with ThreadPoolExecutor(max_workers=15) as executor:
                 futures = {
-                    executor.submit(self.scrape_process, item['type'], item['id']): item['id']
-                    for item in self.arr_process_search
+                    executor.submit(self.scrape_process, item['type'], item['id'], incremental,
+                                    progress.search(item['type'], item['id']) if progress else None,
+                                    SearchCheckpoint(self.checkpoints, item['type'], item['id']) if resume else None):
+                    item['id'] for item in self.arr_process_search
                 }
                 for future in as_completed(futures):
                     try:
                         result = future.result()
-                        results.append(
-                            {id: result['process_id'], type: result['process_type']})
+                        results.append(result)
                     except Exception as e:
                         results.append(
                             {'process_id': futures[future], 'status': 'error', 'error': str(e)})
 
-            return {'msg': 'The scraping process has been completed'}, 200
+            # A run with a failed or cancelled search stays open, so the next one resumes it instead of resetting
+            if resume and all(result.get('status') == 'success' for result in results):
+                self.checkpoints.finish_run()
+            http_stats = AsyncHttpEngine.stats() if fetch_engine == 'asyncio' else HttpSession.stats()
+            return {'msg': 'The scraping process has been completed', 'resumed': resumed, 'searches': results,
+                    'http': http_stats,
+                    'response_cache': response_cache.stats(), 'rate_controller': rate_controller.stats(),
+                    'single_flight': single_flight.stats(), 'driver_pool': driver_pool.stats()}, 200
         except Exception as e:
             return {'error': str(e)}
+        finally:
+            single_flight.forget()
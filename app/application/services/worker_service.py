@@ -0,0 +1,202 @@
+from app.config import worker_poll_interval
+from app.application.services.scraper_service import ScraperService
+from app.application.services.job_service import ScrapeProgress
+from app.infraestructura.cache.single_flight import single_flight
+from app.infraestructura.queue.work_queue import WorkQueue
+import multiprocessing
+import threading
+import sqlite3
+import socket
+import signal
+import time
+import os
+
+
+def search_tasks(searches, incremental=False):
+    """
+    Builds the work queue tasks of a list of searches.
+
+    Args:
+        searches (list): Searches in the format of `array_search`, dictionaries with the `type` and `id`.
+        incremental (bool): If True the tasks run the incremental mode.
+
+    Returns:
+        list: One task per search, keyed by mode, type and ID, in the group of its ID, since the searches of the
+        same ID as ofendido and as demandado write the same records.
+    """
+    mode = 'incremental' if incremental else 'full'
+    return [{'key': f"{mode}:{search['type']}:{search['id']}", 'group': search['id'],
+             'payload': {'type': search['type'], 'id': search['id'], 'mode': mode}} for search in searches]
+
+
+class ScrapeWorker:
+    """
+    Runs the searches of the work queue one at a time with `ScraperService.scrape_process`. Several workers, in
+    separate processes or machines sharing the queue file, scrape different searches at the same time.
+
+    A search of the full mode first removes the records stored for its ID and type, so a retried task does not store
+    its cases twice. While a task runs, a thread renews its lease every third of the visibility timeout, and cancels
+    the search if the lease was lost; a failed search (status 'error') is handed back to the queue to be retried. The
+    worker counters (tasks, cases, busy time) are recorded in the queue after each task it still held, see
+    `WorkQueue.stats`.
+
+    Args:
+        queue (WorkQueue): The work queue.
+        service_factory (callable): Creates the `ScraperService` of the worker.
+        worker_id (str, optional): The ID of the worker, the host name and process ID by default.
+        poll_interval (float): Seconds to wait when there is no available task.
+    """
+
+    def __init__(self, queue, service_factory=ScraperService, worker_id=None, poll_interval=worker_poll_interval):
+        self.queue = queue
+        self.service_factory = service_factory
+        self.host = socket.gethostname()
+        self.worker_id = worker_id or f'{self.host}-{os.getpid()}'
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self.service = None
+
+    def stop(self):
+        """
+        Stops the worker once the current task ends.
+        """
+        self.stopping.set()
+
+    def _record(self, status, **counters):
+        self.queue.record_worker(self.worker_id, self.host, os.getpid(), status, **counters)
+
+    def _keep_lease(self, task, done, progress):
+        """
+        Renews the lease of a running task until `done` is set. When the lease is lost (another worker took the task
+        after it expired) or can not be renewed before it expires, the search is cancelled through its `progress`, so
+        two workers do not keep writing the same search.
+        """
+        interval = max(self.queue.visibility_timeout / 3, 0.1)
+        renewed = time.monotonic()
+        while not done.wait(interval):
+            try:
+                held = self.queue.extend(task['id'], self.worker_id)
+                renewed = time.monotonic()
+            except sqlite3.Error:
+                # The queue is busy or unreachable, the lease is kept until it would expire
+                held = time.monotonic() - renewed < self.queue.visibility_timeout
+            if not held:
+                progress.job.cancel_event.set()
+                return
+
+    def run_task(self, task):
+        """
+        Runs the search of a leased task and completes it, or hands it back to the queue if it failed. A search whose
+        lease was lost is cancelled before its next result page and left to the worker that holds the task now; the
+        cases already submitted to its pipeline are still written.
+
+        Args:
+            task (dict): The task returned by `WorkQueue.lease`.
+
+        Returns:
+            dict: The result of `scrape_process`.
+        """
+        payload = task['payload']
+        incremental = payload.get('mode') == 'incremental'
+        record_type = 'demandado' if payload['type'] == 'demandado' else 'demandante'
+        progress = ScrapeProgress().search(payload['type'], payload['id'])
+        done = threading.Event()
+        keeper = threading.Thread(target=self._keep_lease, args=(task, done, progress), daemon=True)
+        keeper.start()
+        started = time.monotonic()
+        try:
+            # The calls of a task are deduplicated among themselves, not with the stale results of previous tasks
+            single_flight.reset()
+            if not incremental:
+                self.service.data_repository.replace_data(payload['id'], [], record_type)
+            result = self.service.scrape_process(payload['type'], payload['id'], incremental, progress)
+        except Exception as e:
+            result = {'process_id': payload['id'], 'process_type': payload['type'], 'status': 'error',
+                      'error': str(e)}
+        finally:
+            done.set()
+            keeper.join()
+            single_flight.forget()
+
+        if progress.cancelled:
+            self._record('idle')
+        elif result['status'] == 'success':
+            # The full mode stores every case of the search, the incremental one only fetches the changed ones
+            cases = result['fetched'] if incremental else len(self.service.get_stored_cases(
+                payload['id'], record_type))
+            if self.queue.complete(task['id'], self.worker_id, {'cases': cases, **{
+                    key: result[key] for key in ('fetched', 'unchanged') if key in result}}):
+                self._record('idle', tasks_done=1, cases=cases, busy_seconds=time.monotonic() - started)
+            else:
+                self._record('idle')
+        elif self.queue.fail(task['id'], self.worker_id, result.get('error', result['status'])):
+            self._record('idle', tasks_failed=1, busy_seconds=time.monotonic() - started)
+        else:
+            self._record('idle')
+        return result
+
+    def run(self, max_tasks=None, exit_when_empty=False):
+        """
+        Takes and runs tasks until `stop` is called.
+
+        Args:
+            max_tasks (int, optional): Stops after running this many tasks.
+            exit_when_empty (bool): Stops when there is no available task instead of waiting for more.
+
+        Returns:
+            int: The number of tasks run.
+        """
+        self.service = self.service or self.service_factory()
+        self._record('idle')
+        count = 0
+        try:
+            while not self.stopping.is_set() and (max_tasks is None or count < max_tasks):
+                task = self.queue.lease(self.worker_id)
+                if task is None:
+                    if exit_when_empty:
+                        break
+                    self._record('idle')
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                self._record('busy')
+                self.run_task(task)
+                count += 1
+        finally:
+            self._record('stopped')
+        return count
+
+
+def _worker_process(queue_path, exit_when_empty, service_factory):
+    worker = ScrapeWorker(WorkQueue(queue_path), service_factory or ScraperService)
+    # SIGTERM lets the current task end before the process exits
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run(exit_when_empty=exit_when_empty)
+
+
+def run_workers(processes, queue_path=None, exit_when_empty=False, service_factory=None):
+    """
+    Runs `processes` workers, each in its own process with its own `ScraperService`, HTTP pool and browsers, and
+    waits for them to end.
+
+    Args:
+        processes (int): The number of worker processes.
+        queue_path (str, optional): The work queue file.
+        exit_when_empty (bool): If True the workers end when the queue has no available task.
+        service_factory (callable, optional): Creates the `ScraperService` of each worker.
+
+    Returns:
+        None
+    """
+    children = [multiprocessing.Process(target=_worker_process, name=f'scrape-worker-{i}',
+                                        args=(queue_path, exit_when_empty, service_factory))
+                for i in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # The children got the same SIGINT and stop after their current task
+        for child in children:
+            child.join()
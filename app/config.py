@@ -3,13 +3,128 @@ import os
 
 load_dotenv()
 
-url_scraper = 'https://procesosjudiciales.funcionjudicial.gob.ec/busqueda-filtros'
+url_scraper = os.getenv('URL_SCRAPER', 'https://procesosjudiciales.funcionjudicial.gob.ec/busqueda-filtros')
+api_url = os.getenv('API_URL', 'https://api.funcionjudicial.gob.ec')
+
+# How the cases of each search are listed: 'browser' (the search page with Selenium) or 'http' (the listing endpoint
+# of the API used by that page, without Chrome), and the cases per page requested in the 'http' mode
+search_mode = os.getenv('SEARCH_MODE', 'browser')
+search_page_size = int(os.getenv('SEARCH_PAGE_SIZE', 50))
+
+# Readiness of the search page in the 'browser' mode: maximum seconds to wait for each condition (results rendered
+# after the search, back from the movements of a case, paginator label changed after the next page button) before
+# going on, and seconds without requests in the performance log of Chrome that count as network idle
+readiness_timeouts = {
+    'search': float(os.getenv('READINESS_SEARCH_TIMEOUT', 10)),
+    'results': float(os.getenv('READINESS_RESULTS_TIMEOUT', 10)),
+    'reload': float(os.getenv('READINESS_RELOAD_TIMEOUT', 10)),
+    'next_page': float(os.getenv('READINESS_NEXT_PAGE_TIMEOUT', 10)),
+}
+network_idle_time = float(os.getenv('NETWORK_IDLE_TIME', 0.5))
+
+# Pool of Chrome browsers of the 'browser' mode, one per search running at the same time: maximum browsers open,
+# browsers started when the app starts, seconds a search waits for a free browser, and uses or memory (MB of the
+# browser processes, 0 disables the check) after which a browser is closed and replaced by a new one
+driver_pool_size = int(os.getenv('DRIVER_POOL_SIZE', 4))
+driver_pool_prewarm = int(os.getenv('DRIVER_POOL_PREWARM', 0))
+driver_pool_checkout_timeout = 600
+driver_pool_max_uses = int(os.getenv('DRIVER_POOL_MAX_USES', 20))
+driver_pool_max_memory_mb = int(os.getenv('DRIVER_POOL_MAX_MEMORY_MB', 1024))
 
 jwt_secret_key = os.getenv('SECRET_KEY', 'C4.48*234/$23)?898')
 
 is_get_activity_for_actuaciones_judiciales = False
 is_view_chrome_headless = True
 
+# Storage mode of the scraped data: 'json' (single data.json file), 'segment_log' (append-only segments), 'sqlite'
+# 'binary_shards' (one compact binary shard per ID) or 'json_shards' (one directory of JSON pages per ID)
+data_repository_mode = os.getenv('DATA_REPOSITORY_MODE', 'json')
+segment_log_max_bytes = 4 * 1024 * 1024
+segment_log_compaction_threshold = 4
+binary_shard_compression = True
+
+# SQLite files written by several processes: the 'sqlite' data repository (SQLITE_DATA_PATH, data.sqlite next to the
+# repository module by default) and the work queue. WAL needs memory shared by the processes, so it only works on a
+# single host; SQLITE_SHARED_STORAGE=1 uses the rollback journal instead, for files on a network filesystem with
+# working file locks shared by workers on several machines
+sqlite_data_path = os.getenv('SQLITE_DATA_PATH')
+sqlite_journal_mode = 'DELETE' if os.getenv('SQLITE_SHARED_STORAGE', '0') == '1' else 'WAL'
+
+# Memory budget (bytes) of the in-process cache of parsed reads shared by DataService and the repositories
+read_cache_max_bytes = int(os.getenv('READ_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Pagination of the data endpoints
+data_page_default_limit = 50
+data_page_max_limit = 500
+
+# Shared keep-alive HTTP session of FetchServices: hosts kept in the pool, connections per host (the largest
+# ThreadPoolExecutor of ScraperService uses 10 workers) and (connect, read) timeout in seconds
+http_pool_connections = 4
+http_pool_maxsize = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+http_timeout = (float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)), float(os.getenv('HTTP_READ_TIMEOUT', 30)))
+
+# On-disk cache of the getInformacionJuicio and getIncidenteJudicatura responses, kept across scraper runs:
+# time to live (seconds) and size budget (bytes) with LRU eviction
+response_cache_enabled = os.getenv('RESPONSE_CACHE_ENABLED', '1') == '1'
+response_cache_ttl = int(os.getenv('RESPONSE_CACHE_TTL', 24 * 60 * 60))
+response_cache_max_bytes = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Flow control of the calls to the API: token bucket pacing (calls per second, 0 disables it, and burst), adaptive
+# concurrency limits (AIMD on errors and latency) and retries of 429/5xx/connection errors with jittered backoff,
+# limited to a ratio of the calls
+api_rate_limit = float(os.getenv('API_RATE_LIMIT', 25))
+api_rate_burst = 25
+api_concurrency_initial = 10
+api_concurrency_min = 1
+api_concurrency_max = int(os.getenv('API_CONCURRENCY_MAX', 50))
+api_latency_tolerance = 2.5
+api_max_retries = 3
+api_retry_base_delay = 0.25
+api_retry_max_delay = 8
+api_retry_budget_ratio = 0.2
+
+# Incremental scraper mode: cases with a judicial act in the last days are fetched again even if the listing did
+# not change, since the listing does not show new acts
+incremental_active_days = int(os.getenv('INCREMENTAL_ACTIVE_DAYS', 30))
+
+# Engine of the API calls of each result page: 'threads' (a ThreadPoolExecutor per page) or 'asyncio' (a single
+# event loop thread shared by every scrape, with a global and a per host limit of in-flight calls)
+fetch_engine = os.getenv('FETCH_ENGINE', 'threads')
+async_fetch_max_concurrency = int(os.getenv('ASYNC_FETCH_MAX_CONCURRENCY', 100))
+async_fetch_per_host_limit = int(os.getenv('ASYNC_FETCH_PER_HOST_LIMIT', 20))
+async_fetch_timeout = 30
+
+# Stage pipeline of the scraper (case information, incidents and judicial acts connected by queues): workers and queue
+# depth of each stage, and cases written per batch as they complete. SCRAPE_PIPELINE=0 goes back to fetching each
+# result page stage by stage
+scrape_pipeline_enabled = os.getenv('SCRAPE_PIPELINE', '1') == '1'
+pipeline_workers = {'details': 5, 'incidents': 5, 'actuaciones': 10}
+pipeline_queue_depth = {'details': 100, 'incidents': 100, 'actuaciones': 500, 'writer': 100}
+pipeline_write_batch = 20
+
+# Scrape jobs of POST /api/scraper/jobs, run in the background by the app process: jobs running at the same time (the
+# others wait in order, since a full run resets the stored data) and finished jobs kept for GET /api/scraper/jobs/<id>
+scrape_jobs_max_workers = 1
+scrape_jobs_retained = int(os.getenv('SCRAPE_JOBS_RETAINED', 20))
+
+# Checkpoints of the scraper runs: the last completed result page and the stored cases of each search are saved, and
+# a run interrupted by a crash or a cancellation is resumed by the next one of the same mode. SCRAPE_RESUME=0 always
+# starts from scratch. A run is resumed at most SCRAPE_RESUME_MAX_ATTEMPTS times in total, and not after
+# SCRAPE_RESUME_MAX_AGE seconds since it started, so a search that keeps failing does not keep the run open forever
+scrape_resume_enabled = os.getenv('SCRAPE_RESUME', '1') == '1'
+scrape_resume_max_attempts = int(os.getenv('SCRAPE_RESUME_MAX_ATTEMPTS', 3))
+scrape_resume_max_age = int(os.getenv('SCRAPE_RESUME_MAX_AGE', 24 * 3600))
+
+# Work queue of the scrape workers (python -m app.distribution.worker): database file shared by the workers (next to
+# the queue module by default), seconds a leased task stays hidden from the other workers while its worker renews the
+# lease, attempts of a task before it is marked as failed, seconds before the first retry (doubled on each one) and
+# seconds an idle worker waits before looking for tasks again
+work_queue_path = os.getenv('WORK_QUEUE_PATH')
+work_queue_visibility_timeout = int(os.getenv('WORK_QUEUE_VISIBILITY_TIMEOUT', 300))
+work_queue_max_attempts = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', 3))
+work_queue_retry_delay = 30
+worker_poll_interval = 2
+
 user_login_success = {
     'username': os.getenv('AUTH_USERNAME', 'tusdatos'),
     'password': os.getenv('AUTH_PASSWORD', '123456')
@@ -1,5 +1,8 @@
 from app.application.services.data_service import DataService
 from app.distribution.web.server.middleware import token_required
+from app.config import data_page_default_limit, data_page_max_limit
+from app.infraestructura.repositories.text_index import TEXT_FIELDS
+from flask import Response, request, stream_with_context
 from flask_restx import Namespace, Resource
 
 authorizations = {
@@ -15,11 +18,39 @@ data_ns = Namespace('api', description='Test operations',
                     authorizations=authorizations)
 
 
+def parse_pagination():
+    """
+    Reads the `limit` and `cursor` query parameters of the current request.
+
+    A cursor without limit uses `data_page_default_limit`, and the limit is capped at `data_page_max_limit`.
+
+    Returns:
+        tuple: The page size (None if the request is not paginated) and the cursor (None for the first page).
+
+    Raises:
+        ValueError: If `limit` is not a positive integer.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor') or None
+    if limit is None:
+        return (data_page_default_limit if cursor else None), cursor
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if limit <= 0:
+        raise ValueError('Invalid limit')
+    return min(limit, data_page_max_limit), cursor
+
+
 @data_ns.route("")
 class DataList(Resource):
     @data_ns.doc(security='Bearer')
     @data_ns.response(200, 'Success')
+    @data_ns.response(400, 'Invalid limit or cursor')
     @data_ns.response(401, 'Invalid token, user not authorized!')
+    @data_ns.param('limit', 'Page size. When given, the IDs are returned paginated with a `next_cursor`')
+    @data_ns.param('cursor', 'Cursor returned by the previous page')
     @token_required
     def get(self):
         """
@@ -35,21 +66,108 @@ class DataList(Resource):
             self: The instance of the class.
 
         Returns:
-            List of ID's save info in data.json
+            List of ID's save info in data.json, or a page of them in `data` with `total` and `next_cursor` when `limit` or `cursor` are given.
 
         Raises:
             None.
         """
+        try:
+            limit, cursor = parse_pagination()
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        data_service = DataService()
+        return data_service.get_info_data(limit, cursor)
+
+
+@data_ns.route("/query")
+class DataQueryRoutes(Resource):
+    @data_ns.doc(security='Bearer')
+    @data_ns.response(200, 'Success')
+    @data_ns.response(400, 'Invalid filters, limit or cursor')
+    @data_ns.response(401, 'Invalid token, user not authorized!')
+    @data_ns.param('judicatura', 'Court ID (`idJudicatura`) or name (`nombreJudicatura`)')
+    @data_ns.param('materia', 'Subject (`details.nombreMateria`)')
+    @data_ns.param('tipo_accion', 'Action type (`details.nombreTipoAccion`)')
+    @data_ns.param('ciudad', 'City of the court (`ciudad`)')
+    @data_ns.param('desde', 'First entry date (`fechaIngreso`), yyyy-mm-dd or dd/mm/yyyy')
+    @data_ns.param('hasta', 'Last entry date (`fechaIngreso`), inclusive, yyyy-mm-dd or dd/mm/yyyy')
+    @data_ns.param('limit', 'Page size')
+    @data_ns.param('cursor', 'Cursor returned by the previous page')
+    @data_ns.param('fields', 'Comma separated fields to keep in each case')
+    @token_required
+    def get(self):
+        """
+        Searches the cases of every stored ID by court, subject, action type, city and entry date range, using secondary indexes built over the stored records.
+        At least one filter is required. Filters are combined, and text values are matched without case distinction.
+
+        :return: A JSON response with the `total` of matches, the page of cases in `data` (each one with the `id` it was stored under) and the `next_cursor`.
+        :rtype: flask.Response
+        """
+        filters = {field: request.args[field] for field in (
+            'judicatura', 'materia', 'tipo_accion', 'ciudad') if request.args.get(field)}
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        if not filters and not desde and not hasta:
+            return {'msg': 'At least one filter is required'}, 400
+        try:
+            limit, cursor = parse_pagination()
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        fields = [field.strip() for field in request.args.get(
+            'fields', '').split(',') if field.strip()]
+        data_service = DataService()
+        return data_service.query_data(filters, desde, hasta, limit or data_page_default_limit, cursor, fields)
+
+
+@data_ns.route("/search")
+class DataSearchRoutes(Resource):
+    @data_ns.doc(security='Bearer')
+    @data_ns.response(200, 'Success')
+    @data_ns.response(400, 'Invalid query, limit or cursor')
+    @data_ns.response(401, 'Invalid token, user not authorized!')
+    @data_ns.param('q', 'Text to search, for example a person\'s name')
+    @data_ns.param('in', 'Comma separated fields to search in: `delito`, `litigante`, `actuacion`. All of them by default')
+    @data_ns.param('limit', 'Page size')
+    @data_ns.param('cursor', 'Cursor returned by the previous page')
+    @data_ns.param('fields', 'Comma separated fields to keep in each case')
+    @token_required
+    def get(self):
+        """
+        Searches the cases of every stored ID by text: offense name, names of the demandantes and demandados, and type of the judicial acts.
+        Accents and case are ignored, every word must match and the last one also matches as a prefix.
+
+        :return: A JSON response with the `total` of matches, the page of cases in `data` (each one with the `id` it was stored under) and the `next_cursor`.
+        :rtype: flask.Response
+        """
+        text = request.args.get('q', '').strip()
+        if not text:
+            return {'msg': 'The q parameter is required'}, 400
+        search_fields = tuple(field.strip() for field in request.args.get(
+            'in', 'delito,litigante,actuacion').split(',') if field.strip())
+        if not search_fields or any(field not in TEXT_FIELDS for field in search_fields):
+            return {'msg': f"Invalid fields, use {', '.join(TEXT_FIELDS)}"}, 400
+        try:
+            limit, cursor = parse_pagination()
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        fields = [field.strip() for field in request.args.get(
+            'fields', '').split(',') if field.strip()]
         data_service = DataService()
-        return data_service.get_info_data()
+        return data_service.search_data(text, search_fields, limit or data_page_default_limit, cursor, fields)
 
 
 @data_ns.route("/<id>")
 class DataRoutes(Resource):
     @data_ns.doc(security='Bearer')
     @data_ns.response(200, 'Success')
+    @data_ns.response(400, 'Invalid limit or cursor')
     @data_ns.response(401, 'Invalid token, user not authorized!')
     @data_ns.response(404, 'ID not found')
+    @data_ns.param('limit', 'Page size. When given, only that many cases are returned with a `next_cursor`')
+    @data_ns.param('cursor', 'Cursor returned by the previous page')
+    @data_ns.param('fields', 'Comma separated fields to keep in each case, for example `idJuicio,fechaIngreso,details.nombreMateria`')
+    @data_ns.param('summary', 'Set to 1 to return only the counters of the ID, without cases')
+    @data_ns.param('stream', 'Set to 1 to receive the cases as NDJSON, one per line after a header record with the counters. Also enabled with the header `Accept: application/x-ndjson`')
     @token_required
     def get(sefl, id):
         """
@@ -62,7 +180,46 @@ class DataRoutes(Resource):
         :type id: str
 
         :return: A JSON response containing the data associated with the given ID, including the ID itself, the total number of data items, and either the entire data list or separate lists for demandados and demandantes, along with the counts of each. If the ID is not found, a JSON response with a message and a status code of 404 is returned.
+        The `limit`, `cursor`, `fields` and `summary` query parameters paginate and project the cases before serializing them, see `DataService.get_data_id`.
+
+        When the `stream` query parameter is `1` or the `Accept` header asks for `application/x-ndjson`, the response is sent in chunks as NDJSON: a header record with the ID and its counters, followed by one case per line.
+
+        :rtype: flask.Response
+        """
+        data_service = DataService()
+        if request.args.get('stream') in ('1', 'true') or 'application/x-ndjson' in request.headers.get('Accept', ''):
+            stream = data_service.stream_data_id(id)
+            if stream is None:
+                return {"msg": "ID not found"}, 404
+            return Response(stream_with_context(stream), mimetype='application/x-ndjson')
+
+        try:
+            limit, cursor = parse_pagination()
+        except ValueError as e:
+            return {'msg': str(e)}, 400
+        fields = [field.strip() for field in request.args.get(
+            'fields', '').split(',') if field.strip()]
+        summary = request.args.get('summary') in ('1', 'true')
+        return data_service.get_data_id(id, limit, cursor, fields, summary)
+
+
+@data_ns.route("/<id>/stats")
+class DataStatsRoutes(Resource):
+    @data_ns.doc(security='Bearer')
+    @data_ns.response(200, 'Success')
+    @data_ns.response(401, 'Invalid token, user not authorized!')
+    @data_ns.response(404, 'ID not found')
+    @token_required
+    def get(self, id):
+        """
+        Retrieves the counters of a given ID: the total number of cases and the counts of demandados and demandantes.
+        The counters are maintained by the repository on every write, so this endpoint does not read the cases.
+
+        :param id: The ID of the data.
+        :type id: str
+
+        :return: A JSON response with the ID and its counters. If the ID is not found, a JSON response with a message and a status code of 404 is returned.
         :rtype: flask.Response
         """
         data_service = DataService()
-        return data_service.get_data_id(id)
+        return data_service.get_stats_id(id)
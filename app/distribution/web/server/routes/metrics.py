@@ -0,0 +1,35 @@
+from app.distribution.web.server.middleware import token_required
+from app.infraestructura.metrics.registry import metrics
+from flask import Response
+from flask_restx import Namespace, Resource
+
+authorizations = {
+    'Bearer': {
+        'type': 'apiKey',
+        'in': 'header',
+        'name': 'Authorization',
+        'description': 'JWT Authorization header using the Bearer scheme. Example: "Authorization: Bearer {token}"'
+    }
+}
+
+metrics_ns = Namespace('api', description='Test operations',
+                       authorizations=authorizations)
+
+
+@metrics_ns.route("")
+class MetricsRoutes(Resource):
+    @metrics_ns.doc(security='Bearer')
+    @metrics_ns.response(200, 'The metrics in the Prometheus text format')
+    @metrics_ns.response(401, 'Invalid token, user not authorized!')
+    @token_required
+    def get(self):
+        """
+        This function is a endpoint with the HTTP method "GET". It requires a valid token to access the resource.
+        Returns the metrics of the process in the Prometheus text exposition format: the latency histograms, the
+        responses by status code, the bytes, the retries and the calls in flight of each API endpoint, and the duration
+        of each phase of the scraper.
+
+        Returns:
+            Response: The metrics as `text/plain`.
+        """
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,5 +1,6 @@
-from app.application.services.scraper_service import ScraperService
+from app.application.services.job_service import scrape_jobs
 from app.distribution.web.server.middleware import token_required
+from flask import request
 from flask_restx import Namespace, Resource
 
 authorizations = {
@@ -19,15 +20,20 @@ scraper_ns = Namespace('api', description='Test operations',
 class ScraperRoutes(Resource):
     @scraper_ns.doc(security='Bearer')
     @scraper_ns.response(200, 'The scraping process has been completed')
+    @scraper_ns.response(400, 'Invalid mode or resume')
     @scraper_ns.response(401, 'Invalid token, user not authorized!')
+    @scraper_ns.param('mode', '`full` (default) rebuilds all the data, `incremental` only fetches the new or changed cases')
+    @scraper_ns.param('resume', '`true` (default) resumes the previous run of the mode if it was interrupted, `false` starts a new one')
     @token_required
     def get(self):
         """
         This function is a endpoint with the HTTP method "GET". It requires a valid token to access the resource. 
-        The function initializes a ScraperService object and calls its init_scraper() method. The result of the method call is returned as the response.
+        The function queues a scrape job, like `POST /api/scraper/jobs`, and waits for it to end, so it never runs at the same time as another job. The result of its init_scraper() call is returned as the response.
 
         Parameters:
-            None
+            mode (str): Query parameter, `full` (default) or `incremental`.
+            resume (str): Query parameter, `true` (default) or `false` to start a new run instead of resuming an
+                interrupted one.
 
         This endpoint is protected by the `token_required` decorator, which ensures that only authenticated
 
@@ -35,7 +41,95 @@ class ScraperRoutes(Resource):
         header as a Bearer token.
 
         Returns:
-            The result of calling the init_scraper() method of the ScraperService object.
+            The result of calling the init_scraper() method of the ScraperService object, the error if it failed, or
+            the job if it was cancelled before it started.
         """
-        scraper_service = ScraperService()
-        return scraper_service.init_scraper()
+        mode = request.args.get('mode', 'full')
+        if mode not in ('full', 'incremental'):
+            return {'msg': 'Invalid mode, use full or incremental'}, 400
+        resume = request.args.get('resume', 'true')
+        if resume not in ('true', 'false'):
+            return {'msg': 'Invalid resume, use true or false'}, 400
+        job = scrape_jobs.run(incremental=mode == 'incremental', fresh=resume == 'false')
+        if job.result is not None:
+            return job.result, 200
+        if job.error is not None:
+            return {'error': job.error}
+        return job.to_dict()
+
+
+@scraper_ns.route("/jobs")
+class ScrapeJobList(Resource):
+    @scraper_ns.doc(security='Bearer')
+    @scraper_ns.response(202, 'The scrape job has been queued')
+    @scraper_ns.response(400, 'Invalid mode or resume')
+    @scraper_ns.response(401, 'Invalid token, user not authorized!')
+    @scraper_ns.param('mode', '`full` (default) rebuilds all the data, `incremental` only fetches the new or changed cases')
+    @scraper_ns.param('resume', '`true` (default) resumes the previous run of the mode if it was interrupted, `false` starts a new one')
+    @token_required
+    def post(self):
+        """
+        Queues a run of the scraper in the background and returns at once with the job, instead of keeping the request
+        open until the scraping process ends like `GET /api/scraper`.
+
+        Parameters:
+            mode (str): Query parameter, `full` (default) or `incremental`.
+            resume (str): Query parameter, `true` (default) or `false` to start a new run instead of resuming an
+                interrupted one.
+
+        Returns:
+            The queued job, see `ScrapeJob.to_dict`; its progress is read with `GET /api/scraper/jobs/<job_id>`.
+        """
+        mode = request.args.get('mode', 'full')
+        if mode not in ('full', 'incremental'):
+            return {'msg': 'Invalid mode, use full or incremental'}, 400
+        resume = request.args.get('resume', 'true')
+        if resume not in ('true', 'false'):
+            return {'msg': 'Invalid resume, use true or false'}, 400
+        job = scrape_jobs.submit(incremental=mode == 'incremental', fresh=resume == 'false')
+        return job.to_dict(), 202
+
+
+@scraper_ns.route("/jobs/<string:job_id>")
+class ScrapeJobItem(Resource):
+    @scraper_ns.doc(security='Bearer')
+    @scraper_ns.response(200, 'Success')
+    @scraper_ns.response(401, 'Invalid token, user not authorized!')
+    @scraper_ns.response(404, 'Job not found')
+    @token_required
+    def get(self, job_id):
+        """
+        Returns the status of a scrape job and the progress of each search: result pages read of the total, cases
+        listed and fetched, cases with errors and cases per second.
+
+        Parameters:
+            job_id (str): The ID returned by `POST /api/scraper/jobs`.
+
+        Returns:
+            The job, see `ScrapeJob.to_dict`, or a 404 status code if there is no such job.
+        """
+        job = scrape_jobs.get(job_id)
+        if job is None:
+            return {'msg': 'Job not found'}, 404
+        return job.to_dict()
+
+    @scraper_ns.doc(security='Bearer')
+    @scraper_ns.response(202, 'The scrape job is being cancelled')
+    @scraper_ns.response(401, 'Invalid token, user not authorized!')
+    @scraper_ns.response(404, 'Job not found')
+    @token_required
+    def delete(self, job_id):
+        """
+        Cancels a scrape job. A queued job does not run; the searches of a running job stop before their next result
+        page, and the job ends with the `cancelled` status. The data already written is kept.
+
+        Parameters:
+            job_id (str): The ID returned by `POST /api/scraper/jobs`.
+
+        Returns:
+            The job, see `ScrapeJob.to_dict`, or a 404 status code if there is no such job.
+        """
+        job = scrape_jobs.cancel(job_id)
+        if job is None:
+            return {'msg': 'Job not found'}, 404
+        return job.to_dict(), 202
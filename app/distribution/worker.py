@@ -0,0 +1,62 @@
+"""
+Scrape workers that take the searches from the shared work queue, see `WorkQueue` and `ScrapeWorker`.
+
+Usage:
+    python -m app.distribution.worker enqueue [--mode full|incremental] [--file searches.json]
+    python -m app.distribution.worker run [--processes 4] [--max-tasks N] [--exit-when-empty]
+    python -m app.distribution.worker stats
+
+`enqueue` queues one task per search of `array_search`, or of the JSON list of `--file` with the same format. `run`
+starts the workers of this machine; other machines run their own workers against the same `WORK_QUEUE_PATH` and
+`SQLITE_DATA_PATH` on a network filesystem, all of them with `SQLITE_SHARED_STORAGE=1` (WAL only works on one host).
+`stats` prints the tasks by status and the counters of each worker.
+"""
+from app.config import array_search, data_repository_mode
+from app.application.services.worker_service import ScrapeWorker, run_workers, search_tasks
+from app.infraestructura.queue.work_queue import WorkQueue
+import argparse
+import signal
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scrape workers of the shared work queue')
+    parser.add_argument('--queue', help='the work queue file, WORK_QUEUE_PATH by default')
+    commands = parser.add_subparsers(dest='command', required=True)
+    enqueue = commands.add_parser('enqueue', help='queue the searches')
+    enqueue.add_argument('--mode', choices=('full', 'incremental'), default='full')
+    enqueue.add_argument('--file', help='JSON list of searches with their type and id, array_search by default')
+    run = commands.add_parser('run', help='run workers until they are stopped')
+    run.add_argument('--processes', type=int, default=1)
+    run.add_argument('--max-tasks', type=int, help='stop after this many tasks (single process only)')
+    run.add_argument('--exit-when-empty', action='store_true', help='stop when there is no available task')
+    commands.add_parser('stats', help='print the tasks by status and the counters of each worker')
+    args = parser.parse_args(argv)
+    queue = WorkQueue(args.queue)
+
+    if args.command == 'enqueue':
+        searches = array_search
+        if args.file:
+            with open(args.file, encoding='utf-8') as file:
+                searches = json.load(file)
+        queued = queue.enqueue(search_tasks(searches, incremental=args.mode == 'incremental'))
+        print(f'{queued} of {len(searches)} searches queued')
+    elif args.command == 'run':
+        if args.processes > 1 and data_repository_mode != 'sqlite':
+            print(f"warning: DATA_REPOSITORY_MODE '{data_repository_mode}' is not safe to write from several "
+                  "processes, use 'sqlite'", file=sys.stderr)
+        if args.processes > 1:
+            run_workers(args.processes, queue.path, args.exit_when_empty)
+        else:
+            worker = ScrapeWorker(queue)
+            signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+            try:
+                worker.run(args.max_tasks, args.exit_when_empty)
+            except KeyboardInterrupt:
+                worker.stop()
+    print(json.dumps(queue.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
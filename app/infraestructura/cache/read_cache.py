@@ -0,0 +1,158 @@
+from app.config import read_cache_max_bytes
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from collections import OrderedDict
+import threading
+import sys
+
+
+def estimate_size(value):
+    """
+    Estimates the memory used by a parsed JSON value, adding up the size of every nested container and scalar.
+
+    Args:
+        value (object): A value made of dicts, lists, strings, numbers, booleans and None.
+
+    Returns:
+        int: The estimated size in bytes.
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return size
+
+
+class ReadCache:
+    """
+    Process-wide LRU cache of parsed repository reads, bounded by an estimated memory budget.
+
+    Every entry is stored with the dataset version it was built from (see `BaseDataRepository.get_version`), so a
+    stale entry is not returned once the version changes. Every storage mode takes its version from the storage
+    itself (file sizes and modification times, or a counter written with the data), so the writes of other processes
+    change it too, as far as the modification times of the filesystem can tell them apart. Writes made through a
+    repository in this process also drop the entries of that repository right away through the listener methods.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """
+        Returns the value cached for the key if it was built from the given version.
+
+        Args:
+            key (tuple): The cache key, its first element is the repository location.
+            version (object): The current dataset version.
+
+        Returns:
+            object or None: The cached value, None if it is missing or stale.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value):
+        """
+        Stores a value built from the given version, evicting the least recently used entries over the budget.
+        Values bigger than the whole budget are not stored.
+
+        Args:
+            key (tuple): The cache key, its first element is the repository location.
+            version (object): The dataset version the value was built from.
+            value (object): The value to cache.
+
+        Returns:
+            None
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self._discard(key)
+            self.entries[key] = (version, value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._discard(oldest)
+
+    def get_or_load(self, key, version, loader):
+        """
+        Returns the cached value for the key, or calls `loader` and caches its result.
+
+        Args:
+            key (tuple): The cache key, its first element is the repository location.
+            version (object): The current dataset version.
+            loader (callable): Function without arguments that builds the value.
+
+        Returns:
+            object: The cached or freshly loaded value.
+        """
+        value = self.get(key, version)
+        if value is None:
+            value = loader()
+            self.set(key, version, value)
+        return value
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def invalidate(self, location=None):
+        """
+        Drops the entries of one repository location, or every entry if no location is given.
+
+        Args:
+            location (str, optional): The repository location.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            for key in list(self.entries.keys()):
+                if location is None or key[0] == location:
+                    self._discard(key)
+
+    def on_update(self, repository, key, records, previous, version):
+        self.invalidate(repository.location)
+
+    def on_reset(self, repository):
+        self.invalidate(repository.location)
+
+    def stats(self):
+        """
+        Returns the usage counters of the cache.
+
+        Returns:
+            dict: The number of entries, the estimated bytes in use, the budget, and the hit and miss counters.
+        """
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+read_cache = ReadCache(read_cache_max_bytes)
+BaseDataRepository.add_listener(read_cache)
@@ -0,0 +1,242 @@
+from app.config import response_cache_enabled, response_cache_max_bytes, response_cache_ttl
+import threading
+import sqlite3
+import json
+import time
+import os
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (endpoint, key)
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('bytes', 0);
+"""
+
+# Access times of the hits kept in memory before they are written in a single transaction
+ACCESS_BATCH = 256
+
+
+class ResponseCache:
+    """
+    On-disk cache of upstream API responses in a SQLite database, keyed by endpoint and case ID.
+
+    Entries expire `ttl` seconds after they are stored, and the least recently used ones are evicted when the stored
+    bytes go over `max_bytes`. The database is independent from the scraped data, so it survives the `reset_data`
+    of every `/api/scraper` run and is shared by all the processes that use the same file.
+
+    Only successful responses are stored, as the parsed JSON body.
+
+    A hit does not write to the database: its access time is kept in memory and written with the next `set`, which
+    is the only one evicting entries, or once `ACCESS_BATCH` hits are pending. The calls block on SQLite, so the
+    asyncio engine runs them in a thread, see `AsyncFetchServices`.
+    """
+    _local = threading.local()
+
+    def __init__(self, path=None, ttl=response_cache_ttl, max_bytes=response_cache_max_bytes,
+                 enabled=response_cache_enabled):
+        self.path = path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'responses.sqlite')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.accessed = {}
+
+    def _connection(self):
+        """
+        Returns the connection of the current thread for this database, creating it and the schema if needed.
+
+        Returns:
+            sqlite3.Connection: The connection in autocommit mode, transactions are opened explicitly.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(self.path)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            connections[self.path] = connection
+        return connection
+
+    def _count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _touch(self, endpoint, key, now):
+        with self.lock:
+            self.accessed[(endpoint, key)] = now
+            full = len(self.accessed) >= ACCESS_BATCH
+        if full:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._write_accessed(connection)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+    def _write_accessed(self, connection):
+        """
+        Writes the pending access times of the hits, inside the transaction opened by the caller.
+        """
+        with self.lock:
+            accessed, self.accessed = self.accessed, {}
+        connection.executemany(
+            'UPDATE responses SET accessed = MAX(accessed, ?) WHERE endpoint = ? AND key = ?',
+            [(at, endpoint, key) for (endpoint, key), at in accessed.items()])
+
+    def get(self, endpoint, key):
+        """
+        Returns the response stored for the endpoint and key if it has not expired.
+
+        Args:
+            endpoint (str): The name of the endpoint, for example 'getInformacionJuicio'.
+            key (str): The key of the request, usually the case ID.
+
+        Returns:
+            object or None: The stored JSON body, None if it is missing or expired.
+        """
+        if not self.enabled:
+            return None
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            'SELECT value, size, expires FROM responses WHERE endpoint = ? AND key = ?', (endpoint, key)).fetchone()
+        if row is None:
+            self._count(False)
+            return None
+        value, size, expires = row
+        if expires <= now:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                deleted = connection.execute(
+                    'DELETE FROM responses WHERE endpoint = ? AND key = ? AND expires <= ?',
+                    (endpoint, key, now)).rowcount
+                if deleted:
+                    connection.execute(
+                        "UPDATE meta SET value = value - ? WHERE key = 'bytes'", (size,))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            self._count(False)
+            return None
+        self._touch(endpoint, key, now)
+        self._count(True)
+        return json.loads(value)
+
+    def set(self, endpoint, key, value):
+        """
+        Stores a response, evicting the least recently used ones while the stored bytes are over the budget.
+        Responses bigger than the whole budget are not stored.
+
+        Args:
+            endpoint (str): The name of the endpoint.
+            key (str): The key of the request, usually the case ID.
+            value (object): The JSON body of the response.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        encoded = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        size = len(encoded.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # The recent hits count for the eviction order
+            self._write_accessed(connection)
+            previous = connection.execute(
+                'SELECT size FROM responses WHERE endpoint = ? AND key = ?', (endpoint, key)).fetchone()
+            connection.execute(
+                'INSERT OR REPLACE INTO responses (endpoint, key, value, size, expires, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?)', (endpoint, key, encoded, size, now + self.ttl, now))
+            connection.execute("UPDATE meta SET value = value + ? WHERE key = 'bytes'",
+                               (size - (previous[0] if previous else 0),))
+            total = connection.execute(
+                "SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0]
+            while total > self.max_bytes:
+                rows = connection.execute(
+                    'SELECT endpoint, key, size FROM responses ORDER BY accessed LIMIT 64').fetchall()
+                for row_endpoint, row_key, row_size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    connection.execute(
+                        'DELETE FROM responses WHERE endpoint = ? AND key = ?', (row_endpoint, row_key))
+                    total -= row_size
+                connection.execute(
+                    "UPDATE meta SET value = ? WHERE key = 'bytes'", (total,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        """
+        Removes every stored response and resets the counters.
+
+        Returns:
+            None
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute('DELETE FROM responses')
+        connection.execute("UPDATE meta SET value = 0 WHERE key = 'bytes'")
+        connection.execute('COMMIT')
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.accessed = {}
+
+    def stats(self):
+        """
+        Returns the usage counters of the cache.
+
+        Returns:
+            dict: The number of entries, the stored bytes, the budget, and the hit and miss counters of this process.
+        """
+        if not self.enabled:
+            return {'entries': 0, 'bytes': 0, 'max_bytes': self.max_bytes, 'hits': 0, 'misses': 0}
+        connection = self._connection()
+        entries = connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        stored = connection.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0]
+        with self.lock:
+            return {
+                'entries': entries,
+                'bytes': stored,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,155 @@
+from concurrent.futures import Future
+import threading
+import asyncio
+import copy
+
+
+class SingleFlight:
+    """
+    Deduplicates the API calls of a scraper run by key.
+
+    Concurrent calls with the same key wait on the one in flight instead of sending their own request, and
+    successful results are memoized until the next `reset`, so a case found by several searches (for example the
+    same ID searched as ofendido and as demandado) is fetched once per run. Results with an `error`, or case
+    details whose incidents call failed (a `subProcess` with an `error`), are not memoized, so a later call can try
+    again.
+
+    Each caller gets its own deep copy of the result, since the scraper fills the returned dictionaries in place.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.memo = {}
+        self.in_flight = {}
+        self.calls = 0
+        self.saved = 0
+
+    @staticmethod
+    def _cacheable(result):
+        if not isinstance(result, dict):
+            return True
+        sub_process = result.get('subProcess')
+        return 'error' not in result and not (isinstance(sub_process, dict) and 'error' in sub_process)
+
+    def _lookup(self, key, new_future):
+        """
+        Returns `(memoized, future, leader)` for a key, registering `new_future` as in flight if there is no call
+        for it yet.
+        """
+        with self.lock:
+            self.calls += 1
+            if key in self.memo:
+                self.saved += 1
+                return self.memo[key], None, False
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.saved += 1
+                return None, future, False
+            future = self.in_flight[key] = new_future()
+            return None, future, True
+
+    def _complete(self, key, result):
+        with self.lock:
+            self.in_flight.pop(key, None)
+            if self._cacheable(result):
+                self.memo[key] = result
+
+    def _abandon(self, key):
+        with self.lock:
+            self.in_flight.pop(key, None)
+
+    def do(self, key, function):
+        """
+        Calls `function` unless the key is memoized or already in flight in another thread.
+
+        Args:
+            key (tuple): The key of the call, for example `('case', idJuicio)`.
+            function (callable): Function without arguments that makes the call.
+
+        Returns:
+            object: A copy of the result of the call.
+        """
+        memoized, future, leader = self._lookup(key, Future)
+        if future is None:
+            return copy.deepcopy(memoized)
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            result = function()
+        except BaseException as e:
+            self._abandon(key)
+            future.set_exception(e)
+            raise
+        self._complete(key, result)
+        future.set_result(result)
+        return copy.deepcopy(result)
+
+    async def do_async(self, key, function):
+        """
+        Coroutine version of `do`, for calls made on a single event loop.
+
+        Args:
+            key (tuple): The key of the call.
+            function (coroutine function): Function without arguments that makes the call.
+
+        Returns:
+            object: A copy of the result of the call.
+        """
+        loop = asyncio.get_running_loop()
+        memoized, future, leader = self._lookup(key, loop.create_future)
+        if future is None:
+            return copy.deepcopy(memoized)
+        if not leader:
+            if isinstance(future, Future):
+                # In flight in a thread of the threaded engine
+                future = asyncio.wrap_future(future)
+            return copy.deepcopy(await asyncio.shield(future))
+        try:
+            result = await function()
+        except BaseException as e:
+            self._abandon(key)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        self._complete(key, result)
+        future.set_result(result)
+        return copy.deepcopy(result)
+
+    def reset(self):
+        """
+        Forgets the memoized results and resets the counters, called at the start of every scraper run.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.memo = {}
+            self.calls = 0
+            self.saved = 0
+
+    def forget(self):
+        """
+        Forgets the memoized results but keeps the counters of the run, called when a scraper run ends so the
+        payloads of the whole dataset are not kept in memory until the next one.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.memo = {}
+
+    def stats(self):
+        """
+        Returns the counters of the current run.
+
+        Returns:
+            dict: The number of `calls`, the duplicate calls `saved` (answered by a call in flight or a memoized
+            result) and the number of `memoized` results.
+        """
+        with self.lock:
+            return {'calls': self.calls, 'saved': self.saved, 'memoized': len(self.memo)}
+
+
+single_flight = SingleFlight()
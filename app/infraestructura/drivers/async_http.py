@@ -0,0 +1,331 @@
+from app.config import async_fetch_max_concurrency, async_fetch_per_host_limit, async_fetch_timeout
+from app.infraestructura.drivers.rate_controller import rate_controller
+from app.infraestructura.metrics.upstream import upstream_metrics, endpoint_name
+from urllib.parse import urlsplit
+import threading
+import asyncio
+import json
+import ssl
+
+
+class AsyncResponse:
+    """
+    Response of an `AsyncHttpClient` request, with the same attributes used from a `requests.Response`.
+
+    Attributes:
+        status_code (int): The HTTP status code.
+        headers (dict): The response headers, with lowercase names.
+        content (bytes): The response body.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncHttpClient:
+    """
+    Minimal asyncio HTTP/1.1 client with keep-alive connection pools.
+
+    Every request takes a slot of the global semaphore (`max_concurrency`) and one of the semaphore of its host
+    (`per_host_limit`), so the number of in-flight calls and of open connections to a host are bounded no matter how
+    many coroutines are waiting. Connections are kept open after each response and reused by the next request to
+    the same host. Every attempt also goes through `controller` (see `RateController`), which paces the calls, adapts
+    the concurrency and retries the failed ones, and is recorded in `upstream_metrics` once it has its slots.
+
+    The client must only be used from the event loop that runs its requests.
+    """
+
+    def __init__(self, max_concurrency=async_fetch_max_concurrency, per_host_limit=async_fetch_per_host_limit,
+                 timeout=async_fetch_timeout, controller=None):
+        self.controller = controller or rate_controller
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.host_semaphores = {}
+        self.idle = {}
+        self.ssl_context = ssl.create_default_context()
+        self.requests_count = 0
+        self.errors_count = 0
+        self.connections_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _host_semaphore(self, key):
+        semaphore = self.host_semaphores.get(key)
+        if semaphore is None:
+            semaphore = self.host_semaphores[key] = asyncio.Semaphore(
+                self.per_host_limit)
+        return semaphore
+
+    async def request(self, method, url, json_body=None, headers=None):
+        """
+        Sends a request, waiting for a free slot of the global and the host limits. Responses with a 429/5xx status,
+        timeouts and connection errors are retried by the rate controller.
+
+        Args:
+            method (str): The HTTP method, for example 'GET' or 'POST'.
+            url (str): The URL of the request.
+            json_body (object, optional): A value to send as JSON body.
+            headers (dict, optional): Extra request headers.
+
+        Returns:
+            AsyncResponse: The response of the last attempt.
+
+        Raises:
+            asyncio.TimeoutError: If the last attempt took more than `timeout` seconds once it had its slots.
+            OSError: If the connection of the last attempt failed.
+        """
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or '/'
+        if parts.query:
+            target += f'?{parts.query}'
+        body = b''
+        request_headers = {'Host': parts.netloc, 'Connection': 'keep-alive',
+                           'Accept': 'application/json', 'User-Agent': 'tusdatos-scraper'}
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            request_headers['Content-Type'] = 'application/json'
+        if body or method in ('POST', 'PUT', 'PATCH'):
+            request_headers['Content-Length'] = str(len(body))
+        request_headers.update(headers or {})
+        head = f'{method} {target} HTTP/1.1\r\n' + ''.join(
+            f'{name}: {value}\r\n' for name, value in request_headers.items()) + '\r\n'
+
+        endpoint = endpoint_name(url)
+        attempts = []
+        return await self.controller.call_async(
+            lambda: self._attempt(key, head.encode('latin-1') + body, endpoint, attempts),
+            (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError), attempts)
+
+    async def _attempt(self, key, data, endpoint, attempts):
+        async with self.semaphore, self._host_semaphore(key):
+            self.requests_count += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            started = upstream_metrics.begin(endpoint, retry=bool(attempts))
+            attempts.append(started)
+            response = None
+            try:
+                response = await asyncio.wait_for(self._send(key, data), self.timeout)
+                return response
+            except Exception:
+                self.errors_count += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                upstream_metrics.end(endpoint, started, response)
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self.ssl_context if scheme == 'https' else None)
+        self.connections_count += 1
+        return reader, writer
+
+    async def _send(self, key, data):
+        idle = self.idle.setdefault(key, [])
+        while True:
+            reused = bool(idle)
+            reader, writer = idle.pop() if reused else await self._connect(key)
+            try:
+                writer.write(data)
+                await writer.drain()
+                response, keep_alive = await self._read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    # The server closed the idle connection, retry on another one
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+            return response
+
+    async def _read_response(self, reader):
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' and (
+            version == 'HTTP/1.1' or connection == 'keep-alive')
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        else:
+            content = await reader.read()
+            keep_alive = False
+        return AsyncResponse(int(status), headers, content), keep_alive
+
+    def stats(self):
+        """
+        Returns the usage of the client.
+
+        Returns:
+            dict: A dictionary with the number of `requests` sent, the failed ones in `errors`, the `connections`
+            opened, the requests `in_flight` right now and the highest number of requests in flight at once.
+        """
+        return {'requests': self.requests_count, 'errors': self.errors_count,
+                'connections': self.connections_count, 'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight}
+
+    async def close(self):
+        """
+        Closes every idle connection.
+        """
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+
+class AsyncHttpEngine:
+    """
+    Runs the asyncio fetches of every scrape on a single event loop thread, shared by all the worker threads of
+    `ScraperService`, with one `AsyncHttpClient` so all of them draw from the same concurrency budget.
+    """
+    loop = None
+    thread = None
+    client = None
+    tasks = set()
+    lock = threading.Lock()
+
+    @classmethod
+    def init_loop(cls):
+        loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=loop.run_forever,
+                                      name='async-http-engine', daemon=True)
+        cls.thread.start()
+        cls.client = AsyncHttpClient()
+        cls.loop = loop
+
+    @classmethod
+    def get_loop(cls):
+        """
+        Returns the event loop of the engine, starting its thread on the first call.
+
+        Returns:
+            asyncio.AbstractEventLoop: The running event loop.
+        """
+        if cls.loop is None:
+            with cls.lock:
+                if cls.loop is None:
+                    cls.init_loop()
+        return cls.loop
+
+    @classmethod
+    def get_client(cls):
+        """
+        Returns the shared client, used by the coroutines run with `run`.
+
+        Returns:
+            AsyncHttpClient: The shared client.
+        """
+        cls.get_loop()
+        return cls.client
+
+    @classmethod
+    def run(cls, coroutine, timeout=None):
+        """
+        Runs a coroutine on the engine loop and waits for its result from the calling thread. If the wait times out or
+        the calling thread is interrupted, the coroutine is cancelled together with its pending requests.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+            timeout (float, optional): Seconds to wait for the result.
+
+        Returns:
+            object: The result of the coroutine.
+        """
+        loop = cls.get_loop()
+
+        async def tracked():
+            task = asyncio.current_task()
+            cls.tasks.add(task)
+            try:
+                return await coroutine
+            finally:
+                cls.tasks.discard(task)
+
+        future = asyncio.run_coroutine_threadsafe(tracked(), loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    @classmethod
+    def cancel_all(cls):
+        """
+        Cancels every coroutine running on the engine, the waiting callers get a `CancelledError`.
+
+        Returns:
+            None
+        """
+        if cls.loop is not None:
+            def cancel():
+                for task in list(cls.tasks):
+                    task.cancel()
+            cls.loop.call_soon_threadsafe(cancel)
+
+    @classmethod
+    def stats(cls):
+        """
+        Returns the usage of the shared client, see `AsyncHttpClient.stats`.
+        """
+        if cls.client is None:
+            return {'requests': 0, 'errors': 0, 'connections': 0, 'in_flight': 0, 'max_in_flight': 0}
+        return cls.client.stats()
+
+    @classmethod
+    def close(cls):
+        """
+        Cancels the running coroutines, closes the connections and stops the loop thread. A new loop is started on
+        the next call.
+
+        Returns:
+            None
+        """
+        with cls.lock:
+            loop, thread, client = cls.loop, cls.thread, cls.client
+            cls.loop = cls.thread = cls.client = None
+        if loop is None:
+            return
+
+        async def shutdown():
+            for task in list(cls.tasks):
+                task.cancel()
+            await client.close()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,318 @@
+from app.config import (driver_pool_size, driver_pool_checkout_timeout, driver_pool_max_uses,
+                        driver_pool_max_memory_mb)
+from app.infraestructura.drivers.selenium_driver import SeleniumDriver
+from app.infraestructura.metrics.registry import metrics
+from contextlib import contextmanager
+import threading
+import atexit
+import time
+import os
+
+
+def process_tree_memory(pid):
+    """
+    Returns the resident memory of a process and all its descendants, read from `/proc`: for a browser, chromedriver
+    and the Chrome processes it started.
+
+    Args:
+        pid (int): The ID of the root process.
+
+    Returns:
+        int or None: The resident memory in bytes, None where `/proc` is not available or the process is gone.
+    """
+    children = {}
+    try:
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    # The command name between parentheses may contain spaces
+                    ppid = int(stat.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        return None
+
+    total = 0
+    pending = [pid]
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/statm') as statm:
+                total += int(statm.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            if current == pid:
+                return None
+            continue
+        pending.extend(children.get(current, []))
+    return total
+
+
+class _PooledDriver:
+    """
+    A browser of the pool, with the number of searches it was used for.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created = time.monotonic()
+
+
+class DriverPool:
+    """
+    Bounded pool of Chrome browsers shared by the searches of the 'browser' mode.
+
+    Each search takes a browser with `checkout` (or the `driver` context manager) and gives it back with `checkin`,
+    so up to `size` searches run at the same time, each with its own browser, and the next ones reuse the open
+    browsers instead of starting Chrome again. When every browser is in use, `checkout` waits for one to be returned.
+
+    - A browser taken from the pool is health checked first, and replaced by a new one if it does not respond.
+    - A returned browser is closed instead of being kept after `max_uses` searches, when the memory of its processes
+      goes over `max_memory_mb`, or when the search failed with an error.
+    - `prewarm` starts browsers ahead of the first search, see `driver_pool_prewarm`.
+
+    Args:
+        size (int): Maximum browsers open at the same time.
+        factory (callable): Starts a new browser, `SeleniumDriver.create_driver` by default.
+        max_uses (int): Searches after which a browser is replaced, 0 for no limit.
+        max_memory_mb (int): Memory of a browser, in MB, over which it is replaced, 0 disables the check.
+        checkout_timeout (float): Seconds `checkout` waits for a free browser.
+    """
+
+    def __init__(self, size=driver_pool_size, factory=None, max_uses=driver_pool_max_uses,
+                 max_memory_mb=driver_pool_max_memory_mb, checkout_timeout=driver_pool_checkout_timeout):
+        self.size = max(1, size)
+        self.factory = factory or SeleniumDriver.create_driver
+        self.max_uses = max_uses
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.checkout_timeout = checkout_timeout
+        self.condition = threading.Condition()
+        self.idle = []
+        self.in_use = {}
+        self.opening = 0
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.health_failures = 0
+        self.waits = 0
+        self.in_use_gauge = metrics.gauge('webdriver_pool_in_use', 'Browsers of the pool used by a search')
+
+    @property
+    def open(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def _create(self, place):
+        """
+        Starts a browser for a slot already reserved with `opening`, and moves it from `opening` to the `place` list
+        or dict, releasing the slot if Chrome does not start.
+        """
+        try:
+            entry = _PooledDriver(self.factory())
+        except Exception:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opening -= 1
+            self.created += 1
+            if isinstance(place, dict):
+                place[id(entry.driver)] = entry
+            else:
+                place.append(entry)
+                self.condition.notify()
+        return entry
+
+    @staticmethod
+    def _quit(entry):
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def is_healthy(driver):
+        """
+        Checks that a browser still responds to commands.
+
+        Returns:
+            bool: False if the browser or chromedriver crashed or was closed.
+        """
+        try:
+            driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def memory(self, driver):
+        """
+        Returns the memory in bytes of the processes of a browser, None if it cannot be read.
+        """
+        process = getattr(getattr(driver, 'service', None), 'process', None)
+        return process_tree_memory(process.pid) if process is not None else None
+
+    def checkout(self, timeout=None):
+        """
+        Takes a browser of the pool, starting a new one if there is a free slot and no idle browser, or waiting for
+        one to be returned when `size` browsers are in use.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a browser, `checkout_timeout` by default.
+
+        Returns:
+            WebDriver: The browser, to give back with `checkin`.
+
+        Raises:
+            TimeoutError: If no browser was free within the timeout.
+        """
+        deadline = time.monotonic() + (self.checkout_timeout if timeout is None else timeout)
+        while True:
+            with self.condition:
+                if not self.idle and self.open >= self.size:
+                    self.waits += 1
+                while not self.idle and self.open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError('No browser of the pool was free within the checkout timeout')
+                    self.condition.wait(remaining)
+                if self.idle:
+                    # The most recently used browser is the warmest one
+                    entry = self.idle.pop()
+                    self.in_use[id(entry.driver)] = entry
+                else:
+                    self.opening += 1
+                    entry = None
+            if entry is None:
+                entry = self._create(self.in_use)
+            elif not self.is_healthy(entry.driver):
+                self._quit(entry)
+                with self.condition:
+                    del self.in_use[id(entry.driver)]
+                    self.health_failures += 1
+                    self.condition.notify()
+                continue
+            else:
+                with self.condition:
+                    self.reused += 1
+            self.in_use_gauge.inc()
+            return entry.driver
+
+    def checkin(self, driver, healthy=True):
+        """
+        Gives back a browser taken with `checkout`. The browser is kept for the next search, or closed if it was
+        used `max_uses` times, uses more than `max_memory_mb`, or `healthy` is False.
+
+        Args:
+            driver (WebDriver): The browser.
+            healthy (bool): False if the search failed with an error, so the browser is not reused.
+
+        Returns:
+            None
+        """
+        with self.condition:
+            entry = self.in_use.get(id(driver))
+        if entry is None:
+            return
+        entry.uses += 1
+        keep = healthy and not (self.max_uses and entry.uses >= self.max_uses)
+        if keep and self.max_memory:
+            memory = self.memory(driver)
+            keep = memory is None or memory <= self.max_memory
+        if keep:
+            try:
+                # Leaves the search page, so an idle browser does not keep its DOM and scripts running
+                driver.get('about:blank')
+            except Exception:
+                keep = False
+        if not keep:
+            self._quit(entry)
+        # The browser keeps its slot until it is idle or closed, so the pool never has more than `size` open
+        with self.condition:
+            del self.in_use[id(driver)]
+            if keep:
+                self.idle.append(entry)
+            else:
+                self.recycled += 1
+            self.condition.notify()
+        self.in_use_gauge.dec()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Takes a browser for the `with` block and gives it back at the end. An exception in the block closes the
+        browser instead of keeping it, while a generator closed early gives it back as usual.
+        """
+        driver = self.checkout(timeout)
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.checkin(driver, healthy)
+
+    def prewarm(self, count, background=True):
+        """
+        Starts browsers until the pool has `count` open (at most `size`), so the first searches do not wait for
+        Chrome to start.
+
+        Args:
+            count (int): The number of browsers to have ready.
+            background (bool): If True the browsers are started in a daemon thread and the call returns at once.
+
+        Returns:
+            threading.Thread or None: The thread in the background mode.
+        """
+        def warm():
+            for _ in range(min(count, self.size)):
+                with self.condition:
+                    if self.open >= min(count, self.size):
+                        return
+                    self.opening += 1
+                try:
+                    self._create(self.idle)
+                except Exception:
+                    return
+
+        if not background:
+            warm()
+            return None
+        thread = threading.Thread(target=warm, name='driver-pool-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """
+        Closes the idle browsers, at exit. The browsers in use are left to their searches.
+
+        Returns:
+            None
+        """
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.recycled += len(idle)
+        for entry in idle:
+            self._quit(entry)
+
+    def stats(self):
+        """
+        Returns the counters of the pool.
+
+        Returns:
+            dict: The pool `size`, the browsers `open`, `idle` and `in_use`, the browsers `created`, the checkouts
+            served by an open browser (`reused`), the browsers closed after use (`recycled`) or after a failed health
+            check (`health_failures`), and the checkouts that had to wait for a free browser (`waits`).
+        """
+        with self.condition:
+            return {'size': self.size, 'open': self.open, 'idle': len(self.idle), 'in_use': len(self.in_use),
+                    'created': self.created, 'reused': self.reused, 'recycled': self.recycled,
+                    'health_failures': self.health_failures, 'waits': self.waits}
+
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.close)
@@ -0,0 +1,139 @@
+from requests.adapters import HTTPAdapter
+from app.config import http_pool_connections, http_pool_maxsize, http_timeout
+from app.infraestructura.drivers.rate_controller import rate_controller
+from app.infraestructura.metrics.upstream import upstream_metrics, endpoint_name
+import threading
+import requests
+
+
+class HttpSession:
+    """
+    Shared `requests.Session` used by every `FetchServices` call, so the connections to the API are reused with
+    keep-alive instead of opening a new TCP+TLS connection for each request.
+
+    The session mounts an `HTTPAdapter` with `http_pool_maxsize` connections per host. The pool blocks when every
+    connection is in use, so the number of open connections to the upstream never goes over the pool size no
+    matter how many worker threads share the session. A request first takes a slot of `connections`, as many as the
+    pool size, so it only starts its attempt once a connection is free.
+
+    Every request goes through `controller` (see `RateController`), which paces the calls, adapts the concurrency
+    and retries the failed ones, and each attempt is recorded in `upstream_metrics`. The attempt starts once it has
+    its connection slot, so the controller does not take the wait for the pool as upstream latency.
+    """
+    session = None
+    controller = rate_controller
+    connections = threading.BoundedSemaphore(http_pool_maxsize)
+    lock = threading.Lock()
+    requests_count = 0
+    errors_count = 0
+
+    @classmethod
+    def init_session(cls):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=http_pool_connections,
+                              pool_maxsize=http_pool_maxsize, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        cls.session = session
+
+    @classmethod
+    def get_session(cls):
+        """
+        Returns the shared session instance.
+
+        This class method checks if the session is already initialized. If not, it initializes it by calling the `init_session` method.
+
+        Returns:
+            requests.Session: The shared session.
+        """
+        if cls.session is None:
+            with cls.lock:
+                if cls.session is None:
+                    cls.init_session()
+        return cls.session
+
+    @classmethod
+    def request(cls, method, url, **kwargs):
+        """
+        Sends a request through the shared session and the rate controller, with the configured timeout unless
+        another one is given. Responses with a 429/5xx status and connection errors are retried.
+
+        Args:
+            method (str): The HTTP method, for example 'GET' or 'POST'.
+            url (str): The URL of the request.
+            **kwargs: Any other argument accepted by `requests.Session.request`.
+
+        Returns:
+            requests.Response: The response of the last attempt.
+        """
+        kwargs.setdefault('timeout', http_timeout)
+        session = cls.get_session()
+        endpoint = endpoint_name(url)
+        attempts = []
+        with cls.lock:
+            cls.requests_count += 1
+
+        def send():
+            with cls.connections:
+                started = upstream_metrics.begin(endpoint, retry=bool(attempts))
+                attempts.append(started)
+                response = None
+                try:
+                    response = session.request(method, url, **kwargs)
+                    return response
+                finally:
+                    upstream_metrics.end(endpoint, started, response)
+        try:
+            return cls.controller.call(send, (requests.ConnectionError, requests.Timeout), attempts)
+        except requests.RequestException:
+            with cls.lock:
+                cls.errors_count += 1
+            raise
+
+    @classmethod
+    def get(cls, url, **kwargs):
+        return cls.request('GET', url, **kwargs)
+
+    @classmethod
+    def post(cls, url, **kwargs):
+        return cls.request('POST', url, **kwargs)
+
+    @classmethod
+    def stats(cls):
+        """
+        Returns the usage of the connection pools of the session.
+
+        Returns:
+            dict: A dictionary with the number of `requests` sent, the failed ones in `errors`, the `connections`
+            opened since the session was created, the connections kept `idle` in the pools and the `pool_maxsize`.
+        """
+        with cls.lock:
+            stats = {'requests': cls.requests_count, 'errors': cls.errors_count,
+                     'connections': 0, 'idle': 0, 'pool_maxsize': http_pool_maxsize}
+            if cls.session is None:
+                return stats
+            adapters = {id(adapter): adapter for adapter in cls.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats['connections'] += pool.num_connections
+                stats['idle'] += pool.pool.qsize() if pool.pool else 0
+        return stats
+
+    @classmethod
+    def close(cls):
+        """
+        Closes the shared session and its connections, a new session is created on the next request.
+
+        Returns:
+            None
+        """
+        with cls.lock:
+            session, cls.session = cls.session, None
+            cls.requests_count = 0
+            cls.errors_count = 0
+        if session is not None:
+            session.close()
@@ -0,0 +1,170 @@
+from app.config import readiness_timeouts, network_idle_time
+from app.infraestructura.metrics.registry import metrics
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import json
+import time
+
+
+RESULTS_COUNT = (By.CSS_SELECTOR, '.cantidadMovimiento')
+PAGINATOR_LABEL = (By.CSS_SELECTOR, '.mat-mdc-paginator-range-label')
+RESULT_ITEMS = (By.CSS_SELECTOR, '.causa-individual')
+POLL_FREQUENCY = 0.1
+
+readiness_waits = metrics.histogram(
+    'scraper_readiness_wait_seconds', 'Time waiting for each readiness condition of the search page', ('condition',))
+
+
+class NetworkIdle:
+    """
+    WebDriverWait condition that is true once the page has had no network request in flight for `idle_time` seconds,
+    read from the performance log of Chrome (`goog:loggingPrefs`, see `SeleniumDriver`).
+
+    Create it right before the action that triggers the requests: it discards the log entries written before, so only
+    the requests of the action are tracked. If the driver has no performance log, the condition is true once
+    `idle_time` seconds have passed and the other conditions of the wait decide.
+    """
+    IGNORED_TYPES = {'WebSocket', 'EventSource', 'Ping'}
+
+    def __init__(self, driver, idle_time=network_idle_time):
+        self.idle_time = idle_time
+        self.pending = set()
+        self.available = True
+        self._read(driver)
+        self.pending = set()
+        self.last_activity = time.monotonic()
+
+    def _read(self, driver):
+        if not self.available:
+            return
+        try:
+            entries = driver.get_log('performance')
+        except (WebDriverException, ValueError, AttributeError):
+            self.available = False
+            return
+        for entry in entries:
+            message = json.loads(entry['message']).get('message', {})
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.requestWillBeSent' and params.get('type') not in self.IGNORED_TYPES:
+                self.pending.add(params.get('requestId'))
+                self.last_activity = time.monotonic()
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                if params.get('requestId') in self.pending:
+                    self.pending.discard(params.get('requestId'))
+                    self.last_activity = time.monotonic()
+
+    def __call__(self, driver):
+        self._read(driver)
+        return not self.pending and time.monotonic() - self.last_activity >= self.idle_time
+
+
+def text_changed(locator, previous):
+    """
+    WebDriverWait condition that is true once the element of `locator` shows a text other than `previous`, for
+    example the label of the paginator after moving to the next page.
+
+    Returns:
+        callable: The condition, which returns the new text.
+    """
+    def condition(driver):
+        try:
+            text = driver.find_element(*locator).text
+        except WebDriverException:
+            return False
+        return text if text and text != previous else False
+    return condition
+
+
+def results_loaded(driver):
+    """
+    WebDriverWait condition that is true once the search results are rendered: the results count shows a number, and
+    if it is not 0, the paginator and the result items are present.
+
+    Returns:
+        int or bool: The number of results, or False while they are loading.
+    """
+    try:
+        total = int(driver.find_element(*RESULTS_COUNT).text.split(': ')[1])
+    except (WebDriverException, IndexError, ValueError):
+        return False
+    if total == 0:
+        return True
+    if driver.find_elements(*PAGINATOR_LABEL) and driver.find_elements(*RESULT_ITEMS):
+        return total
+    return False
+
+
+class PageReadiness:
+    """
+    Waits for the search page to be ready with DOM and network conditions instead of fixed sleeps, and keeps track of
+    the time each wait took compared to the sleep it replaces.
+
+    Each wait has a ceiling (`readiness_timeouts`); once it is reached the scraper goes on, as it did after the sleep.
+
+    Args:
+        driver (WebDriver): The browser of the search.
+        timeouts (dict): The ceiling in seconds of each wait, by name.
+        idle_time (float): Seconds without requests that count as network idle.
+    """
+
+    def __init__(self, driver, timeouts=None, idle_time=network_idle_time):
+        self.driver = driver
+        self.timeouts = {**readiness_timeouts, **(timeouts or {})}
+        self.idle_time = idle_time
+        self.waits = 0
+        self.timed_out = 0
+        self.waited = 0.0
+        self.replaced = 0.0
+
+    def network_idle(self):
+        """
+        Returns a `NetworkIdle` condition, to be created right before the action that loads the page.
+        """
+        return NetworkIdle(self.driver, self.idle_time)
+
+    def wait(self, name, *conditions, replaces=0):
+        """
+        Waits until every condition is true, at most the ceiling of `name`.
+
+        Args:
+            name (str): The name of the wait, a key of `readiness_timeouts`.
+            *conditions (callable): WebDriverWait conditions.
+            replaces (float): Seconds of the fixed sleep this wait replaces, used to report the time saved.
+
+        Returns:
+            object: The value of the first condition, or False if the ceiling was reached.
+        """
+        started = time.monotonic()
+        condition = conditions[0] if len(conditions) == 1 else EC.all_of(*conditions)
+        try:
+            result = WebDriverWait(self.driver, self.timeouts[name], poll_frequency=POLL_FREQUENCY).until(condition)
+            if isinstance(result, list):
+                result = result[0]
+        except TimeoutException:
+            result = False
+            self.timed_out += 1
+        elapsed = time.monotonic() - started
+        readiness_waits.observe(elapsed, condition=name)
+        self.waits += 1
+        self.waited += elapsed
+        self.replaced += replaces
+        return result
+
+    def stats(self, pages):
+        """
+        Returns the time spent in the waits of a search.
+
+        Args:
+            pages (int): The number of result pages of the search.
+
+        Returns:
+            dict: The number of `waits`, the ones that reached their ceiling in `timed_out`, the seconds `waited`, the
+            seconds of the fixed sleeps they replaced, and the seconds `saved` in total and per page.
+        """
+        saved = self.replaced - self.waited
+        return {'waits': self.waits, 'timed_out': self.timed_out, 'waited_seconds': round(self.waited, 3),
+                'replaced_seconds': round(self.replaced, 3), 'saved_seconds': round(saved, 3),
+                'saved_per_page': round(saved / pages, 3) if pages else 0}
@@ -0,0 +1,303 @@
+from app.config import (api_rate_limit, api_rate_burst, api_concurrency_initial, api_concurrency_min,
+                        api_concurrency_max, api_latency_tolerance, api_max_retries, api_retry_base_delay,
+                        api_retry_max_delay, api_retry_budget_ratio)
+import threading
+import asyncio
+import random
+import time
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_BUDGET_WINDOW = 10
+RETRY_BUDGET_MIN = 10
+LATENCY_ALPHA = 0.05
+
+
+class TokenBucket:
+    """
+    Paces the calls to `rate` per second with bursts of up to `burst` calls.
+
+    `reserve` takes a token and returns how long the caller must wait for it, so the same bucket paces threads
+    (`time.sleep`) and coroutines (`asyncio.sleep`). A rate of 0 disables the pacing.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token, going into debt if there is none.
+
+        Returns:
+            float: Seconds to wait before sending the call.
+        """
+        if self.rate <= 0:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateController:
+    """
+    Adaptive client-side flow control of the calls to the judicial API, shared by the threaded and the asyncio fetch
+    engines.
+
+    - Pacing: every attempt takes a token of a `TokenBucket`.
+    - Adaptive concurrency (AIMD): at most `limit` calls are in flight. The limit grows by one after a full window
+      of healthy calls and is multiplied by 0.7 when a call fails with 429/5xx or a connection error, or when its
+      latency goes over `latency_tolerance` times the moving average latency, at most once per round trip.
+    - Retries: failed attempts are retried with exponential backoff and full jitter (or the `Retry-After` header),
+      up to `max_retries` times per call and while the retries stay under `retry_budget_ratio` of the calls, so
+      retries cannot multiply the load on an upstream that is already failing.
+
+    The limit settles around the highest concurrency the upstream tolerates. The latency of an attempt is measured
+    from the moment its sender reports it got a connection (see the `attempts` argument of `call`), so the wait for a
+    connection of a pool smaller than the limit is not taken as a slow upstream.
+    """
+
+    def __init__(self, rate=api_rate_limit, burst=api_rate_burst, initial_limit=api_concurrency_initial,
+                 min_limit=api_concurrency_min, max_limit=api_concurrency_max,
+                 latency_tolerance=api_latency_tolerance, max_retries=api_max_retries,
+                 base_delay=api_retry_base_delay, max_delay=api_retry_max_delay,
+                 retry_budget_ratio=api_retry_budget_ratio):
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget_ratio = retry_budget_ratio
+        self.lock = threading.Lock()
+        self.waiters = []
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.last_decrease = 0
+        self.calls = 0
+        self.retries = 0
+        self.retries_denied = 0
+        self.failures = 0
+        self.decreases = 0
+        self.window_started = time.monotonic()
+        self.window_calls = 0
+        self.window_retries = 0
+
+    # Concurrency slots
+
+    def _try_acquire(self, waiter):
+        with self.lock:
+            if self.in_flight < int(self.limit) and not self.waiters:
+                self.in_flight += 1
+                return True
+            self.waiters.append(waiter)
+            return False
+
+    def _wake_waiters(self):
+        """
+        Hands the free slots to the waiters, must be called with the lock held.
+        """
+        wake = []
+        while self.waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            wake.append(self.waiters.pop(0))
+        return wake
+
+    def _release(self):
+        with self.lock:
+            self.in_flight -= 1
+            wake = self._wake_waiters()
+        for waiter in wake:
+            waiter()
+
+    def _acquire(self):
+        event = threading.Event()
+        if not self._try_acquire(event.set):
+            event.wait()
+
+    async def _acquire_async(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(
+                lambda: future.done() or future.set_result(True))
+        if self._try_acquire(wake):
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.lock:
+                granted = wake not in self.waiters
+                if not granted:
+                    self.waiters.remove(wake)
+            if granted:
+                self._release()
+            raise
+
+    # AIMD
+
+    def _record(self, latency, failed):
+        """
+        Updates the limit with the result of an attempt.
+
+        Returns:
+            list: The waiters to wake if the limit grew.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if failed:
+                self.failures += 1
+            slow = (not failed and self.baseline_latency is not None
+                    and latency > self.baseline_latency * self.latency_tolerance)
+            if not failed:
+                self.baseline_latency = latency if self.baseline_latency is None else (
+                    self.baseline_latency + LATENCY_ALPHA * (latency - self.baseline_latency))
+            if not failed and not slow:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                return self._wake_waiters()
+            # One decrease per round trip, the calls already in flight were sent with the old limit
+            if now - self.last_decrease >= (self.baseline_latency or latency):
+                self.limit = max(self.min_limit, self.limit * 0.7)
+                self.last_decrease = now
+                self.decreases += 1
+            return []
+
+    # Retries
+
+    def _retry_delay(self, attempt, response):
+        retry_after = getattr(response, 'headers', {}).get(
+            'retry-after') if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _can_retry(self, attempt):
+        """
+        Takes a retry of the budget: at most `retry_budget_ratio` of the calls of the last `RETRY_BUDGET_WINDOW`
+        seconds, plus a minimum of `RETRY_BUDGET_MIN` retries.
+        """
+        if attempt >= self.max_retries:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_started > RETRY_BUDGET_WINDOW:
+                self.window_started = now
+                self.window_calls = 0
+                self.window_retries = 0
+            if self.window_retries >= self.retry_budget_ratio * self.window_calls + RETRY_BUDGET_MIN:
+                self.retries_denied += 1
+                return False
+            self.window_retries += 1
+            self.retries += 1
+            return True
+
+    def _count_call(self):
+        with self.lock:
+            self.calls += 1
+            self.window_calls += 1
+
+    def _finish(self, started, attempts, response, error):
+        if attempts:
+            # The sender got its connection after the slot, the wait in between is not upstream latency
+            started = max(started, attempts[-1])
+        failed = error is not None or response.status_code in RETRY_STATUS_CODES
+        for waiter in self._record(time.monotonic() - started, failed):
+            waiter()
+        return failed
+
+    def call(self, send, retry_exceptions=(Exception,), attempts=None):
+        """
+        Sends a call from a thread, waiting for a token and a concurrency slot and retrying it when it fails.
+
+        Args:
+            send (callable): Function without arguments that sends the request and returns the response.
+            retry_exceptions (tuple): Exceptions of `send` that are retried.
+            attempts (list, optional): List where `send` appends the `time.monotonic()` of each attempt once it has a
+                connection. The latency is measured from it instead of from the concurrency slot.
+
+        Returns:
+            object: The response of the last attempt.
+
+        Raises:
+            Exception: The error of the last attempt if it raised one.
+        """
+        self._count_call()
+        attempt = 0
+        while True:
+            time.sleep(self.bucket.reserve())
+            self._acquire()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = send()
+            except retry_exceptions as e:
+                error = e
+            finally:
+                self._release()
+            if not self._finish(started, attempts, response, error) or not self._can_retry(attempt):
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    async def call_async(self, send, retry_exceptions=(Exception,), attempts=None):
+        """
+        Sends a call from a coroutine, same as `call`.
+
+        Args:
+            send (coroutine function): Function without arguments that sends the request and returns the response.
+            retry_exceptions (tuple): Exceptions of `send` that are retried.
+            attempts (list, optional): List where `send` appends the start time of each attempt, see `call`.
+
+        Returns:
+            object: The response of the last attempt.
+        """
+        self._count_call()
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.bucket.reserve())
+            await self._acquire_async()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = await send()
+            except retry_exceptions as e:
+                error = e
+            finally:
+                self._release()
+            if not self._finish(started, attempts, response, error) or not self._can_retry(attempt):
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    def stats(self):
+        """
+        Returns the state of the controller.
+
+        Returns:
+            dict: The current concurrency `limit`, the calls `in_flight`, the `calls` made, the `retries` sent and
+            the ones denied by the budget, the failed attempts and the number of times the limit was decreased.
+        """
+        with self.lock:
+            return {'limit': round(self.limit, 2), 'in_flight': self.in_flight, 'calls': self.calls,
+                    'retries': self.retries, 'retries_denied': self.retries_denied,
+                    'failures': self.failures, 'decreases': self.decreases}
+
+
+rate_controller = RateController()
@@ -4,13 +4,25 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from app.config import is_view_chrome_headless
+import threading
 
 
 class SeleniumDriver:
-    driver = None
+    """
+    Creates the Chrome browsers of the scraper. The browsers are not shared: each search takes one from `DriverPool`,
+    which creates them with `create_driver` and keeps them open between searches.
+    """
+    lock = threading.Lock()
+    _driver_path = None
 
     @classmethod
-    def init_driver(cls):
+    def create_driver(cls):
+        """
+        Starts a new Chrome browser with the options of the scraper.
+
+        Returns:
+            WebDriver: The new browser.
+        """
         options = Options()
         options.add_argument(
             "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.6422.61 Safari/537.36")
@@ -21,24 +33,23 @@ class SeleniumDriver:
         options.add_experimental_option(
             "excludeSwitches", ["enable-automation"])
         options.add_experimental_option("useAutomationExtension", False)
+        # Network events read by the network idle condition of PageReadiness
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         if is_view_chrome_headless:
             options.add_argument("--headless")
 
-        cls.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
+        return webdriver.Chrome(
+            service=Service(cls.driver_path()),
             options=options
         )
 
     @classmethod
-    def get_driver(cls):
+    def driver_path(cls):
         """
-        Returns the Selenium driver instance.
-
-        This class method checks if the driver instance is already initialized. If not, it initializes it by calling the `init_driver` method.
-
-        Returns:
-            The Selenium driver instance.
+        Returns the path of chromedriver, downloaded by `ChromeDriverManager` the first time only.
         """
-        if cls.driver is None:
-            cls.init_driver()
-        return cls.driver
+        if cls._driver_path is None:
+            with cls.lock:
+                if cls._driver_path is None:
+                    cls._driver_path = ChromeDriverManager().install()
+        return cls._driver_path
@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+import threading
+import time
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    Base class of the metrics of `MetricsRegistry`, with one value per combination of label values.
+
+    Args:
+        name (str): The name of the metric, for example 'upstream_responses_total'.
+        help (str): The description shown in the `# HELP` line.
+        labels (tuple): The names of the labels.
+    """
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} expects the labels {self.labels}')
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        """
+        Returns the lines of the metric in the text exposition format, without the `# HELP`/`# TYPE` header.
+        """
+        with self.lock:
+            return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}'
+                    for key, value in sorted(self.values.items())]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Histogram with fixed buckets: for each combination of label values it keeps the count of observations per bucket,
+    their sum and their count.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the seconds spent in the `with` block, also when it raises.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def get(self, **labels):
+        """
+        Returns the `count` and `sum` of the observations with the given label values.
+        """
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            return {'count': state['count'], 'sum': state['sum']} if state else {'count': 0, 'sum': 0.0}
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            for key, state in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['buckets']):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket'
+                                 f'{_format_labels(self.labels, key, [("le", _format_value(bound))])} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, [("le", "+Inf")])} {state["count"]}')
+                labels = _format_labels(self.labels, key)
+                lines.append(f'{self.name}_sum{labels} {round(state["sum"], 6)}')
+                lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters, gauges and histograms, rendered in the Prometheus text exposition format by
+    `GET /api/metrics`.
+
+    The metrics are created with `counter`, `gauge` and `histogram`, which return the existing metric when one with the
+    same name is already registered, so every module can declare the metrics it records without import order issues.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _register(self, metric_class, name, help, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, help, labels, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labels != tuple(labels):
+                raise ValueError(f'The metric {name} is already registered with another type or labels')
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The `# HELP` and `# TYPE` lines and the samples of each metric, sorted by name.
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,79 @@
+from app.infraestructura.metrics.registry import metrics
+from urllib.parse import urlsplit
+import time
+
+
+def endpoint_name(url):
+    """
+    Returns the name of the API endpoint of a URL, used as the `endpoint` label: the path segment after
+    'informacion' (for example 'getInformacionJuicio' for `.../informacion/getInformacionJuicio/{idJuicio}`), or the
+    last segment of the path for other URLs, so the IDs in the path do not create a label value per case.
+
+    Args:
+        url (str): The URL of the request.
+
+    Returns:
+        str: The name of the endpoint.
+    """
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+    if 'informacion' in segments[:-1]:
+        return segments[segments.index('informacion') + 1]
+    return segments[-1] if segments else '/'
+
+
+class UpstreamMetrics:
+    """
+    Records every attempt of the calls to the judicial API made by `HttpSession` and `AsyncHttpClient`, by endpoint:
+    the latency histogram, the responses by status code ('error' when the attempt raised), the bytes received, the
+    retries and the attempts in flight.
+    """
+
+    def __init__(self, registry):
+        self.duration = registry.histogram(
+            'upstream_request_duration_seconds', 'Latency of each attempt of an API call', ('endpoint',))
+        self.responses = registry.counter(
+            'upstream_responses_total', 'Attempts of API calls by status code', ('endpoint', 'status'))
+        self.bytes = registry.counter(
+            'upstream_response_bytes_total', 'Bytes of the API responses', ('endpoint',))
+        self.retries = registry.counter(
+            'upstream_retries_total', 'Attempts of API calls after the first one', ('endpoint',))
+        self.in_flight = registry.gauge(
+            'upstream_in_flight', 'Attempts of API calls waiting for their response', ('endpoint',))
+
+    def begin(self, endpoint, retry=False):
+        """
+        Records the start of an attempt.
+
+        Args:
+            endpoint (str): The name of the endpoint, see `endpoint_name`.
+            retry (bool): True if the attempt retries a failed one.
+
+        Returns:
+            float: The start time, to pass to `end`.
+        """
+        if retry:
+            self.retries.inc(endpoint=endpoint)
+        self.in_flight.inc(endpoint=endpoint)
+        return time.monotonic()
+
+    def end(self, endpoint, started, response=None):
+        """
+        Records the end of an attempt.
+
+        Args:
+            endpoint (str): The name of the endpoint.
+            started (float): The value returned by `begin`.
+            response (object, optional): The response, with `status_code` and `content`; None if the attempt raised.
+
+        Returns:
+            None
+        """
+        self.in_flight.dec(endpoint=endpoint)
+        self.duration.observe(time.monotonic() - started, endpoint=endpoint)
+        status = response.status_code if response is not None else 'error'
+        self.responses.inc(endpoint=endpoint, status=status)
+        if response is not None:
+            self.bytes.inc(len(response.content or b''), endpoint=endpoint)
+
+
+upstream_metrics = UpstreamMetrics(metrics)
@@ -0,0 +1,301 @@
+from app.config import (work_queue_path, work_queue_visibility_timeout, work_queue_max_attempts,
+                        work_queue_retry_delay, sqlite_journal_mode)
+from contextlib import contextmanager
+import threading
+import sqlite3
+import json
+import time
+import os
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    grp TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_grp ON tasks(grp, status);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    heartbeat REAL NOT NULL,
+    tasks_done INTEGER NOT NULL DEFAULT 0,
+    tasks_failed INTEGER NOT NULL DEFAULT 0,
+    cases INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+
+WORKER_COUNTERS = ('tasks_done', 'tasks_failed', 'cases', 'busy_seconds')
+
+
+class WorkQueue:
+    """
+    Work queue in a SQLite database, shared by the scrape workers of every process that opens the same file. On a
+    single host the database runs in WAL mode; workers on several machines need the file on a network filesystem
+    with working file locks and the rollback journal (`journal_mode` 'DELETE'), since WAL does not work there.
+
+    - A worker takes a task with `lease`, which hides it from the other workers for `visibility_timeout` seconds.
+      Long tasks keep their lease with `extend`; the lease of a worker that died expires and the task is taken again.
+    - A finished task is marked with `complete`. A failed one is retried with `fail` after an exponential delay,
+      until it was attempted `max_attempts` times, and then it stays `failed`.
+    - Tasks of the same `group` are never leased at the same time, so two tasks writing the same search ID do not
+      interleave their writes.
+    - Each worker records its counters with `record_worker`, read by `stats`.
+
+    Args:
+        path (str): The database file, `work_queue_path` or `work_queue.sqlite` next to this module by default.
+        visibility_timeout (float): Seconds a lease hides a task.
+        max_attempts (int): Attempts of a task before it is marked as failed.
+        retry_delay (float): Seconds before the first retry, doubled on each attempt.
+        journal_mode (str): 'WAL', or 'DELETE' for a file shared by several machines, see `sqlite_journal_mode`.
+    """
+    _local = threading.local()
+
+    def __init__(self, path=None, visibility_timeout=work_queue_visibility_timeout,
+                 max_attempts=work_queue_max_attempts, retry_delay=work_queue_retry_delay,
+                 journal_mode=sqlite_journal_mode):
+        self.path = path or work_queue_path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'work_queue.sqlite')
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.journal_mode = journal_mode
+
+    def _connection(self):
+        """
+        Returns the connection of the current thread for this database, creating it and the schema if needed.
+
+        Returns:
+            sqlite3.Connection: The connection in autocommit mode, transactions are opened explicitly.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(self.path)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None)
+            connection.execute(f'PRAGMA journal_mode={self.journal_mode}')
+            # NORMAL is only safe against power loss in WAL mode
+            synchronous = 'NORMAL' if self.journal_mode == 'WAL' else 'FULL'
+            connection.execute(f'PRAGMA synchronous={synchronous}')
+            connection.executescript(SCHEMA)
+            connections[self.path] = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def enqueue(self, tasks):
+        """
+        Adds tasks to the queue. A task with the `key` of a task still queued or leased is ignored, and one with the
+        `key` of a finished or failed task queues it again.
+
+        Args:
+            tasks (list): Dictionaries with the unique `key`, the `group` and the JSON `payload` of each task.
+
+        Returns:
+            int: The number of tasks queued.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            queued = 0
+            for task in tasks:
+                queued += connection.execute(
+                    "INSERT INTO tasks (key, grp, payload, status, available_at, created, updated) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, status = 'queued', attempts = 0, "
+                    "available_at = excluded.available_at, lease_owner = NULL, lease_expires = NULL, result = NULL, "
+                    "error = NULL, updated = excluded.updated WHERE tasks.status IN ('done', 'failed')",
+                    (task['key'], task['group'], json.dumps(task['payload']), now, now, now)).rowcount
+            return queued
+
+    def lease(self, worker_id):
+        """
+        Takes the next available task: a queued one whose retry delay passed, or a leased one whose lease expired,
+        skipping the groups with a task leased by another worker. An expired task without attempts left is marked
+        as failed instead.
+
+        Args:
+            worker_id (str): The ID of the worker taking the task.
+
+        Returns:
+            dict or None: The task `id`, its `payload` and its `attempts` (including this one), None if there is no
+            available task.
+        """
+        with self._transaction() as connection:
+            while True:
+                now = time.time()
+                row = connection.execute(
+                    "SELECT id, payload, attempts, status FROM tasks AS t "
+                    "WHERE ((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?)) "
+                    "AND NOT EXISTS (SELECT 1 FROM tasks AS o WHERE o.grp = t.grp AND o.id != t.id "
+                    "AND o.status = 'leased' AND o.lease_expires > ?) "
+                    "ORDER BY available_at, id LIMIT 1", (now, now, now)).fetchone()
+                if row is None:
+                    return None
+                task_id, payload, attempts, status = row
+                if status == 'leased' and attempts >= self.max_attempts:
+                    connection.execute(
+                        "UPDATE tasks SET status = 'failed', error = ?, lease_owner = NULL, lease_expires = NULL, "
+                        "updated = ? WHERE id = ?",
+                        (f'The lease expired after {attempts} attempts', now, task_id))
+                    continue
+                connection.execute(
+                    "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                    "updated = ? WHERE id = ?", (worker_id, now + self.visibility_timeout, now, task_id))
+                return {'id': task_id, 'payload': json.loads(payload), 'attempts': attempts + 1}
+
+    def _owned(self, connection, task_id, worker_id):
+        row = connection.execute(
+            "SELECT attempts FROM tasks WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (task_id, worker_id)).fetchone()
+        return row[0] if row else None
+
+    def extend(self, task_id, worker_id):
+        """
+        Renews the lease of a task for another `visibility_timeout` seconds.
+
+        Returns:
+            bool: False if the worker does not hold the lease anymore.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE tasks SET lease_expires = ?, updated = ? WHERE id = ? AND status = 'leased' "
+                "AND lease_owner = ?", (now + self.visibility_timeout, now, task_id, worker_id)).rowcount > 0
+
+    def complete(self, task_id, worker_id, result=None):
+        """
+        Marks a leased task as done.
+
+        Args:
+            task_id (int): The ID of the task.
+            worker_id (str): The worker holding the lease.
+            result (dict, optional): A summary of the result, kept with the task.
+
+        Returns:
+            bool: False if the lease was lost, for example because it expired and another worker took the task.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            if self._owned(connection, task_id, worker_id) is None:
+                return False
+            connection.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_owner = NULL, "
+                "lease_expires = NULL, updated = ? WHERE id = ?", (json.dumps(result), now, task_id))
+            return True
+
+    def fail(self, task_id, worker_id, error):
+        """
+        Records a failed attempt of a leased task: the task is queued again after `retry_delay` seconds, doubled on
+        each attempt, or marked as failed after `max_attempts` attempts.
+
+        Args:
+            task_id (int): The ID of the task.
+            worker_id (str): The worker holding the lease.
+            error (str): The error of the attempt.
+
+        Returns:
+            bool: False if the lease was lost.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            attempts = self._owned(connection, task_id, worker_id)
+            if attempts is None:
+                return False
+            if attempts >= self.max_attempts:
+                connection.execute(
+                    "UPDATE tasks SET status = 'failed', error = ?, lease_owner = NULL, lease_expires = NULL, "
+                    "updated = ? WHERE id = ?", (error, now, task_id))
+            else:
+                connection.execute(
+                    "UPDATE tasks SET status = 'queued', error = ?, available_at = ?, lease_owner = NULL, "
+                    "lease_expires = NULL, updated = ? WHERE id = ?",
+                    (error, now + self.retry_delay * 2 ** (attempts - 1), now, task_id))
+            return True
+
+    def record_worker(self, worker_id, host, pid, status, **counters):
+        """
+        Registers a worker or updates its status and heartbeat, adding the given amounts to its counters.
+
+        Args:
+            worker_id (str): The ID of the worker.
+            host (str): The host name of the worker.
+            pid (int): The process ID of the worker.
+            status (str): 'idle', 'busy' or 'stopped'.
+            **counters: Amounts to add to `tasks_done`, `tasks_failed`, `cases` and `busy_seconds`.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        amounts = [counters.get(name, 0) for name in WORKER_COUNTERS]
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO workers (worker_id, host, pid, status, started, heartbeat) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET status = excluded.status, heartbeat = excluded.heartbeat",
+                (worker_id, host, pid, status, now, now))
+            connection.execute(
+                'UPDATE workers SET ' + ', '.join(f'{name} = {name} + ?' for name in WORKER_COUNTERS) +
+                ' WHERE worker_id = ?', (*amounts, worker_id))
+
+    def get(self, task_id):
+        """
+        Returns a task with its status, attempts, result and error, None if there is no such task.
+        """
+        row = self._connection().execute(
+            'SELECT id, key, payload, status, attempts, result, error FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        if row is None:
+            return None
+        task_id, key, payload, status, attempts, result, error = row
+        return {'id': task_id, 'key': key, 'payload': json.loads(payload), 'status': status, 'attempts': attempts,
+                'result': json.loads(result) if result else None, 'error': error}
+
+    def stats(self):
+        """
+        Returns the state of the queue and the counters of each worker.
+
+        Returns:
+            dict: The number of tasks by status in `tasks`, and in `workers` the status, last heartbeat, tasks done
+            and failed, cases, busy seconds and cases per busy second of each worker.
+        """
+        connection = self._connection()
+        tasks = {status: 0 for status in ('queued', 'leased', 'done', 'failed')}
+        tasks.update(connection.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+        workers = []
+        for row in connection.execute(
+                'SELECT worker_id, host, pid, status, started, heartbeat, tasks_done, tasks_failed, cases, '
+                'busy_seconds FROM workers ORDER BY started'):
+            worker_id, host, pid, status, started, heartbeat, done, failed, cases, busy = row
+            workers.append({'worker_id': worker_id, 'host': host, 'pid': pid, 'status': status,
+                            'heartbeat_age': round(time.time() - heartbeat, 1), 'tasks_done': done,
+                            'tasks_failed': failed, 'cases': cases, 'busy_seconds': round(busy, 3),
+                            'cases_per_second': round(cases / busy, 2) if busy else 0})
+        return {'tasks': tasks, 'workers': workers}
@@ -0,0 +1,77 @@
+from app.infraestructura.repositories.record_index import IndexState, RecordIndex
+
+
+class AggregateState(IndexState):
+    """
+    Per search ID counters and positions of the records by type.
+
+    Attributes:
+        counts (dict): Maps each search ID to a dictionary with 'total', 'count_demandante' and 'count_demandado'.
+        partitions (dict): Maps each search ID to a dictionary with the positions of its 'demandado' and
+            'demandante' records.
+    """
+
+    def __init__(self, version):
+        super().__init__(version)
+        self.counts = {}
+        self.partitions = {}
+
+
+class AggregateIndex(RecordIndex):
+    """
+    Keeps the demandante/demandado counters and the pre-partitioned positions of every search ID up to date on each
+    write, so reads get the counters in O(1) and split the records without filtering them.
+    """
+
+    def new_state(self, version):
+        return AggregateState(version)
+
+    def add_record(self, state, key, position, record):
+        counts = state.counts.setdefault(
+            key, {'total': 0, 'count_demandante': 0, 'count_demandado': 0})
+        partitions = state.partitions.setdefault(
+            key, {'demandado': [], 'demandante': []})
+        counts['total'] += 1
+        record_type = record.get('type')
+        if record_type in partitions:
+            counts[f'count_{record_type}'] += 1
+            partitions[record_type].append(position)
+
+    def get_counts(self, repository, id):
+        """
+        Returns the counters of a search ID.
+
+        Args:
+            repository (BaseDataRepository): The repository that stores the ID.
+            id (str): The search ID.
+
+        Returns:
+            dict or None: A copy of the counters with the keys 'total', 'count_demandante' and 'count_demandado',
+            None if the ID does not exist.
+        """
+        with self.lock:
+            state = self._current_state(repository, [id])
+            if state is None and id not in repository.get_data():
+                return None
+        with self.reading(repository, [id]) as state:
+            return dict(state.counts.get(
+                id, {'total': 0, 'count_demandante': 0, 'count_demandado': 0}))
+
+    def get_partitions(self, repository, id):
+        """
+        Returns the positions of the 'demandado' and 'demandante' records of a search ID.
+
+        Args:
+            repository (BaseDataRepository): The repository that stores the ID.
+            id (str): The search ID.
+
+        Returns:
+            dict: A dictionary with a list of positions for 'demandado' and 'demandante'.
+        """
+        with self.reading(repository, [id]) as state:
+            partitions = state.partitions.get(
+                id, {'demandado': [], 'demandante': []})
+            return {key: list(value) for key, value in partitions.items()}
+
+
+aggregate_index = AggregateIndex()
@@ -0,0 +1,241 @@
+from app.infraestructura.repositories.aggregate_index import aggregate_index
+from itertools import islice
+import threading
+import os
+
+
+class BaseDataRepository:
+    """
+    Common interface shared by every storage mode of the scraped data.
+
+    The services only rely on the methods defined here, so any implementation can be selected through
+    `data_repository_mode` in `app/config.py` without touching the callers.
+
+    Components that keep derived state (caches, indexes) register themselves with `add_listener` and are notified
+    after every write through `on_update(repository, key, records, previous, version)` and `on_reset(repository)`.
+    `previous` and `version` are the versions of the storage right before and right after the write, read while no
+    other process can write, so a listener can tell whether its state missed the writes of another process.
+    Implementations hold `write_lock` while they write and notify, so listeners see the writes of a location one at a
+    time.
+    """
+    listeners = []
+    _write_locks = {}
+    _write_locks_lock = threading.Lock()
+
+    @classmethod
+    def add_listener(cls, listener):
+        """
+        Registers a listener that is notified after every `update_data` and `reset_data` call of any repository.
+
+        Args:
+            listener (object): An object with `on_update(repository, key, records, previous, version)` and
+                `on_reset(repository)` methods.
+
+        Returns:
+            None
+        """
+        if listener not in BaseDataRepository.listeners:
+            BaseDataRepository.listeners.append(listener)
+
+    def _notify_update(self, key, records, previous, version):
+        for listener in BaseDataRepository.listeners:
+            listener.on_update(self, key, records, previous, version)
+
+    def _notify_reset(self):
+        for listener in BaseDataRepository.listeners:
+            listener.on_reset(self)
+
+    @property
+    def location(self):
+        """
+        Absolute path of the storage, used to tell apart the derived state of different repositories.
+        """
+        return os.path.abspath(self.path)
+
+    @property
+    def write_lock(self):
+        """
+        Process-wide lock of the storage location, shared by every repository instance that points to it.
+        """
+        with BaseDataRepository._write_locks_lock:
+            return BaseDataRepository._write_locks.setdefault(self.location, threading.RLock())
+
+    def get_version(self):
+        """
+        Returns a value that changes every time the stored data changes, including writes made by other processes
+        when the storage allows detecting them.
+
+        Returns:
+            object: A hashable version value.
+        """
+        raise NotImplementedError
+
+    def get_data(self):
+        """
+        Retrieves the list of search IDs that have stored data.
+
+        Returns:
+            list: A list with the stored search IDs.
+        """
+        raise NotImplementedError
+
+    def get_data_id(self, id):
+        """
+        Retrieves the records stored for the given search ID.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            list or bool: The stored records if the ID exists, False otherwise.
+        """
+        raise NotImplementedError
+
+    def iter_data_id(self, id):
+        """
+        Yields the records stored for the given search ID one by one.
+
+        The default implementation loads the whole list with `get_data_id`; storages that can read the records
+        incrementally override it so memory stays flat regardless of the number of records.
+
+        Args:
+            id (str): The search ID.
+
+        Yields:
+            dict: Each stored record, in write order.
+        """
+        yield from self.get_data_id(id) or []
+
+    def iter_data_id_from(self, id, position=None):
+        """
+        Yields the records stored for the given search ID starting at a position, each one with its own position, so
+        a page can be read without reading the records before it.
+
+        A position is a JSON value defined by each storage (a row ID, a frame offset...) that it can seek to. The
+        default implementation uses the index of the record and skips the records before it; storages that can seek
+        override it.
+
+        Args:
+            id (str): The search ID.
+            position (object, optional): A position yielded by a previous call, None to start at the first record.
+
+        Yields:
+            tuple: The `(position, record)` of each stored record, in write order.
+
+        Raises:
+            ValueError: If the position is not valid for this storage.
+        """
+        start = self._check_position(position, 0)
+        yield from enumerate(islice(self.iter_data_id(id), start, None), start)
+
+    @staticmethod
+    def _check_position(position, default):
+        """
+        Validates a position made of non-negative integers, a single one or a list with the length of `default`.
+
+        Returns:
+            object: The position, or `default` when it is None.
+
+        Raises:
+            ValueError: If the position does not have the shape of `default`.
+        """
+        if position is None:
+            return default
+        values = position if isinstance(default, list) else [position]
+        size = len(default) if isinstance(default, list) else 1
+        if not isinstance(values, list) or len(values) != size or not all(
+                isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in values):
+            raise ValueError('Invalid cursor')
+        return position
+
+    def count_data_id(self, id):
+        """
+        Counts the records stored for the given search ID by type.
+
+        The counters are maintained by the aggregate index as `update_data` appends records, so after the first
+        read of an ID this is a dictionary lookup.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            dict or None: A dictionary with the keys 'total', 'count_demandante' and 'count_demandado', None if the
+            ID does not exist.
+        """
+        return aggregate_index.get_counts(self, id)
+
+    def get_partitions_id(self, id):
+        """
+        Returns the positions of the 'demandado' and 'demandante' records of the given search ID, maintained by the
+        aggregate index as `update_data` appends records.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            dict: A dictionary with a list of positions for 'demandado' and 'demandante'.
+        """
+        return aggregate_index.get_partitions(self, id)
+
+    def update_data(self, data, key):
+        """
+        Appends the records in `data[key]` to the records stored for `key`.
+
+        Args:
+            data (dict): A dictionary with the search ID as key and a list of records as value.
+            key (str): The search ID to update.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def replace_data(self, key, records, record_type=None):
+        """
+        Replaces the records stored for `key`, used by the incremental scraper to merge the refreshed records in
+        place.
+
+        When `record_type` is given only the records of that type ('demandado' or 'demandante') are replaced, so the
+        two searches of the same ID (as ofendido and as demandado) can be refreshed independently; the records of the
+        other type are kept before the new ones.
+
+        The listeners are notified as after a reset, since the positions of the records change.
+
+        Args:
+            key (str): The search ID to replace.
+            records (list): The new records.
+            record_type (str, optional): The type of the records to replace, all of them if None.
+
+        Returns:
+            None
+        """
+        with self.write_lock:
+            kept = [record for record in self.iter_data_id(key)
+                    if record_type is not None and record.get('type') != record_type]
+            self._write_key(key, kept + list(records))
+            self._notify_reset()
+
+    def _write_key(self, key, records):
+        """
+        Overwrites every record stored for `key` with `records`. Called holding `write_lock`.
+
+        Args:
+            key (str): The search ID.
+            records (list): The records to store.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def reset_data(self):
+        """
+        Removes every stored record.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+
+BaseDataRepository.add_listener(aggregate_index)
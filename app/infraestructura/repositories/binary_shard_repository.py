@@ -0,0 +1,364 @@
+from app.config import binary_shard_compression
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from urllib.parse import quote, unquote
+import struct
+import mmap
+import zlib
+import os
+
+
+MAGIC = b'TDB1'
+SHARD_EXTENSION = '.tdb'
+FLAG_COMPRESSED = 1
+FRAME_HEADER = struct.Struct('<IB')
+
+TAG_NONE, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_FLOAT, TAG_STR, TAG_LIST, TAG_DICT = range(8)
+
+
+def write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+class FrameEncoder:
+    """
+    Encodes a list of records into a frame body: a table with every distinct string (keys and values) followed by
+    the records, where each string is written as its position in the table.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.values = bytearray()
+
+    def _string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        write_varint(self.values, index)
+
+    def _value(self, value):
+        buffer = self.values
+        if value is None:
+            buffer.append(TAG_NONE)
+        elif value is True:
+            buffer.append(TAG_TRUE)
+        elif value is False:
+            buffer.append(TAG_FALSE)
+        elif isinstance(value, int):
+            buffer.append(TAG_INT)
+            write_varint(buffer, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            buffer.append(TAG_FLOAT)
+            buffer.extend(struct.pack('<d', value))
+        elif isinstance(value, str):
+            buffer.append(TAG_STR)
+            self._string(value)
+        elif isinstance(value, (list, tuple)):
+            buffer.append(TAG_LIST)
+            write_varint(buffer, len(value))
+            for item in value:
+                self._value(item)
+        elif isinstance(value, dict):
+            buffer.append(TAG_DICT)
+            write_varint(buffer, len(value))
+            for key, item in value.items():
+                self._string(key)
+                self._value(item)
+        else:
+            raise TypeError(f'Unsupported type {type(value).__name__}')
+
+    def encode(self, records):
+        self._value(list(records))
+        table = bytearray()
+        write_varint(table, len(self.strings))
+        for string in self.strings:
+            encoded = string.encode('utf-8')
+            write_varint(table, len(encoded))
+            table.extend(encoded)
+        return bytes(table + self.values)
+
+
+def decode_frame(body):
+    """
+    Decodes a frame body created by `FrameEncoder.encode`.
+
+    Args:
+        body (bytes or memoryview): The uncompressed frame body.
+
+    Returns:
+        list: The decoded records.
+    """
+    count, position = read_varint(body, 0)
+    strings = []
+    for _ in range(count):
+        length, position = read_varint(body, position)
+        strings.append(bytes(body[position:position + length]).decode('utf-8'))
+        position += length
+
+    def value(position):
+        tag = body[position]
+        position += 1
+        if tag == TAG_STR:
+            index, position = read_varint(body, position)
+            return strings[index], position
+        if tag == TAG_DICT:
+            size, position = read_varint(body, position)
+            item = {}
+            for _ in range(size):
+                index, position = read_varint(body, position)
+                item[strings[index]], position = value(position)
+            return item, position
+        if tag == TAG_LIST:
+            size, position = read_varint(body, position)
+            items = []
+            for _ in range(size):
+                element, position = value(position)
+                items.append(element)
+            return items, position
+        if tag == TAG_INT:
+            raw, position = read_varint(body, position)
+            return (raw >> 1) ^ -(raw & 1), position
+        if tag == TAG_FLOAT:
+            return struct.unpack_from('<d', body, position)[0], position + 8
+        return {TAG_NONE: None, TAG_FALSE: False, TAG_TRUE: True}[tag], position
+
+    return value(position)[0]
+
+
+class BinaryShardDataRepository(BaseDataRepository):
+    """
+    Stores the records of each search ID in its own shard file with a compact binary encoding.
+
+    A shard is the magic `TDB1` followed by frames, one per `update_data` call. Each frame is
+    `<u32 length><u8 flags><body>`, where the body has a string table with every distinct key and value of the page,
+    so repeated keys, 'No disponible' values and court names are stored once, and it is zlib compressed when
+    `binary_shard_compression` is enabled. Writes append one frame to the shard of the ID and reads memory-map only
+    that shard, so reading an ID never touches the bytes of the others.
+
+    A frame left incomplete by a crash is ignored on read and overwritten by the next append.
+    """
+
+    def __init__(self, path=None, compression=binary_shard_compression):
+        self.path = path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'shards_bin')
+        self.compression = compression
+        self.version_path = os.path.join(self.path, 'VERSION')
+
+    def _shard_path(self, id):
+        return os.path.join(self.path, quote(id, safe='') + SHARD_EXTENSION)
+
+    def get_version(self):
+        """
+        Returns the write counter stored in the `VERSION` file of the shards directory, incremented on every write.
+
+        Returns:
+            int: The current version, 0 if nothing was written.
+        """
+        try:
+            with open(self.version_path, 'r') as file:
+                return int(file.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _bump_version(self):
+        version = self.get_version() + 1
+        tmp_path = self.version_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(str(version))
+        os.replace(tmp_path, self.version_path)
+        return version
+
+    def get_data(self):
+        """
+        Retrieves the list of search IDs that have a shard, without reading any shard.
+
+        Returns:
+            list: A list with the stored search IDs.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(unquote(name[:-len(SHARD_EXTENSION)])
+                      for name in os.listdir(self.path) if name.endswith(SHARD_EXTENSION))
+
+    def _iter_frames(self, data, first=len(MAGIC)):
+        """
+        Yields the offset and the records of every complete frame of a memory-mapped shard, from the frame at the
+        offset `first`. The headers of the frames before it are read to check that it is the start of a frame, but
+        their bodies are not decoded.
+        """
+        if first < len(MAGIC):
+            raise ValueError('Invalid cursor')
+        position = len(MAGIC)
+        while position + FRAME_HEADER.size <= len(data):
+            length, flags = FRAME_HEADER.unpack_from(data, position)
+            start = position + FRAME_HEADER.size
+            if start + length > len(data):
+                break
+            if position >= first:
+                raw = data[start:start + length]
+                try:
+                    records = decode_frame(
+                        zlib.decompress(raw) if flags & FLAG_COMPRESSED else raw)
+                finally:
+                    raw.release()
+                yield position, records
+            position = start + length
+            if position > first and start - FRAME_HEADER.size < first:
+                # `first` falls inside this frame
+                raise ValueError('Invalid cursor')
+        if position < first:
+            raise ValueError('Invalid cursor')
+
+    def _valid_size(self, file):
+        """
+        Returns the size of the complete frames of an open shard, used to drop a torn frame before appending.
+        """
+        size = os.fstat(file.fileno()).st_size
+        if size < len(MAGIC):
+            return 0
+        position = len(MAGIC)
+        while position + FRAME_HEADER.size <= size:
+            file.seek(position)
+            length, _ = FRAME_HEADER.unpack(file.read(FRAME_HEADER.size))
+            if position + FRAME_HEADER.size + length > size:
+                break
+            position += FRAME_HEADER.size + length
+        return position
+
+    def iter_data_id(self, id):
+        """
+        Yields the records stored for the given search ID, decoding the memory-mapped shard one frame at a time.
+
+        Args:
+            id (str): The search ID.
+
+        Yields:
+            dict: Each stored record, in write order.
+        """
+        for _, record in self.iter_data_id_from(id):
+            yield record
+
+    def iter_data_id_from(self, id, position=None):
+        """
+        Yields the records stored for the given search ID starting at a position, see
+        `BaseDataRepository.iter_data_id_from`.
+
+        The position is the offset of the frame in the shard and the index of the record inside the frame, so only
+        the frames from the position onwards are decoded.
+
+        Args:
+            id (str): The search ID.
+            position (list, optional): The `[frame offset, record index]`, None to start at the first record.
+
+        Yields:
+            tuple: The `(position, record)` of each stored record, in write order.
+        """
+        first, skip = self._check_position(position, [len(MAGIC), 0])
+        try:
+            file = open(self._shard_path(id), 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            if os.fstat(file.fileno()).st_size <= len(MAGIC):
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data)
+                try:
+                    for offset, records in self._iter_frames(view, first):
+                        for index, record in enumerate(records):
+                            if offset > first or index >= skip:
+                                yield [offset, index], record
+                finally:
+                    view.release()
+
+    def get_data_id(self, id):
+        """
+        Retrieves the records stored for the given search ID from its shard.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            list or bool: The stored records if the ID exists, False otherwise.
+        """
+        if not os.path.exists(self._shard_path(id)):
+            return False
+        return list(self.iter_data_id(id))
+
+    def update_data(self, data, key):
+        """
+        Appends the records in `data[key]` as a new frame at the end of the shard of `key`.
+
+        Args:
+            data (dict): A dictionary with the search ID as key and a list of records as value.
+            key (str): The search ID to update.
+
+        Returns:
+            None
+        """
+        body = FrameEncoder().encode(data[key])
+        flags = 0
+        if self.compression:
+            body = zlib.compress(body)
+            flags |= FLAG_COMPRESSED
+        frame = FRAME_HEADER.pack(len(body), flags) + body
+
+        with self.write_lock:
+            previous = self.get_version()
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._shard_path(key), 'a+b') as file:
+                size = self._valid_size(file)
+                if size == 0:
+                    file.truncate(0)
+                    file.write(MAGIC)
+                elif size < os.fstat(file.fileno()).st_size:
+                    file.truncate(size)
+                file.write(frame)
+            version = self._bump_version()
+            self._notify_update(key, data[key], previous, version)
+
+    def _write_key(self, key, records):
+        """
+        Writes a new shard for `key` with the records in a single frame and swaps it in with `os.replace`, so
+        readers see either the old or the new shard.
+        """
+        body = FrameEncoder().encode(records)
+        flags = 0
+        if self.compression:
+            body = zlib.compress(body)
+            flags |= FLAG_COMPRESSED
+        os.makedirs(self.path, exist_ok=True)
+        path = self._shard_path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(MAGIC + FRAME_HEADER.pack(len(body), flags) + body)
+        os.replace(tmp_path, path)
+        self._bump_version()
+
+    def reset_data(self):
+        """
+        Removes every shard.
+
+        Returns:
+            None
+        """
+        with self.write_lock:
+            for id in self.get_data():
+                os.remove(self._shard_path(id))
+            if os.path.isdir(self.path):
+                self._bump_version()
+            self._notify_reset()
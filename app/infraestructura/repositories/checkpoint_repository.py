@@ -0,0 +1,184 @@
+from app.config import scrape_resume_max_attempts, scrape_resume_max_age
+from contextlib import contextmanager
+import threading
+import sqlite3
+import json
+import time
+import os
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    mode TEXT NOT NULL,
+    listing TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    attempts INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    process_type TEXT NOT NULL,
+    process_id TEXT NOT NULL,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (process_type, process_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_cases (
+    process_type TEXT NOT NULL,
+    process_id TEXT NOT NULL,
+    id_juicio TEXT NOT NULL,
+    PRIMARY KEY (process_type, process_id, id_juicio)
+);
+"""
+
+
+class CheckpointRepository:
+    """
+    Checkpoints of the scraper runs in a SQLite database, so a run interrupted by a crash or a cancellation can be
+    resumed instead of starting again from `reset_data`.
+
+    - runs: the current run, with its mode, the listing it used (search mode and page size, since the page numbers
+      depend on them), whether it finished and the number of times it was started (`attempts`).
+    - checkpoints: for each search (process type and ID), the last result page whose cases are all stored, and
+      whether the search finished.
+    - checkpoint_cases: the IDs of the cases of each search already stored with their details.
+
+    Like `ResponseCache`, the database is independent from the scraped data and each thread uses its own connection.
+    """
+    _local = threading.local()
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'checkpoints.sqlite')
+
+    def _connection(self):
+        """
+        Returns the connection of the current thread for this database, creating it and the schema if needed.
+
+        Returns:
+            sqlite3.Connection: The connection in autocommit mode, transactions are opened explicitly.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(self.path)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            columns = [column[1] for column in connection.execute('PRAGMA table_info(runs)')]
+            if 'attempts' not in columns:
+                # Database created before the attempts were counted
+                connection.execute('ALTER TABLE runs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 1')
+            connections[self.path] = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def begin_run(self, mode, listing, fresh=False, max_attempts=scrape_resume_max_attempts,
+                  max_age=scrape_resume_max_age):
+        """
+        Starts a run, resuming the current one if it did not finish, used the same mode and listing, was started less
+        than `max_attempts` times and less than `max_age` seconds ago. Otherwise the checkpoints of the previous run
+        are removed.
+
+        Args:
+            mode (str): 'full' or 'incremental'.
+            listing (dict): The settings the page numbers depend on, for example the search mode and page size.
+            fresh (bool): If True, never resumes the unfinished run.
+            max_attempts (int): The times a run can be started, counting the first one.
+            max_age (float): The seconds since the start of a run after which it is not resumed.
+
+        Returns:
+            bool: True if the unfinished run is resumed, False if a new run starts.
+        """
+        listing = json.dumps(listing, sort_keys=True)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT mode, listing, status, started, attempts FROM runs WHERE id = 1').fetchone()
+            if (not fresh and row is not None and row[:3] == (mode, listing, 'running')
+                    and row[4] < max_attempts and time.time() - row[3] < max_age):
+                connection.execute('UPDATE runs SET attempts = attempts + 1 WHERE id = 1')
+                return True
+            connection.execute('DELETE FROM checkpoints')
+            connection.execute('DELETE FROM checkpoint_cases')
+            connection.execute(
+                "INSERT OR REPLACE INTO runs (id, mode, listing, status, started, finished, attempts) "
+                "VALUES (1, ?, ?, 'running', ?, NULL, 1)", (mode, listing, time.time()))
+            return False
+
+    def finish_run(self):
+        """
+        Marks the current run as finished, so the next one starts from scratch, and removes its checkpoints.
+
+        Returns:
+            None
+        """
+        with self._transaction() as connection:
+            connection.execute("UPDATE runs SET status = 'finished', finished = ? WHERE id = 1", (time.time(),))
+            connection.execute('DELETE FROM checkpoints')
+            connection.execute('DELETE FROM checkpoint_cases')
+
+    def load(self, process_type, process_id):
+        """
+        Returns the checkpoint of a search of the current run.
+
+        Args:
+            process_type (str): The type of the process, "ofendido" or "demandado".
+            process_id (str): The search ID.
+
+        Returns:
+            dict: The `last_page` stored (0 if none), whether the search is `done`, and the set of stored case IDs in
+            `cases`.
+        """
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT last_page, done FROM checkpoints WHERE process_type = ? AND process_id = ?',
+            (process_type, process_id)).fetchone()
+        cases = {case for case, in connection.execute(
+            'SELECT id_juicio FROM checkpoint_cases WHERE process_type = ? AND process_id = ?',
+            (process_type, process_id))}
+        last_page, done = row if row else (0, 0)
+        return {'last_page': last_page, 'done': bool(done), 'cases': cases}
+
+    def save(self, process_type, process_id, cases=(), last_page=None, done=False):
+        """
+        Records the progress of a search in a single transaction.
+
+        Args:
+            process_type (str): The type of the process.
+            process_id (str): The search ID.
+            cases (iterable): IDs of cases stored with their details.
+            last_page (int, optional): The last result page whose cases are all stored.
+            done (bool): True once the search finished.
+
+        Returns:
+            None
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO checkpoints (process_type, process_id, updated) VALUES (?, ?, ?)',
+                (process_type, process_id, time.time()))
+            connection.executemany(
+                'INSERT OR IGNORE INTO checkpoint_cases (process_type, process_id, id_juicio) VALUES (?, ?, ?)',
+                [(process_type, process_id, case) for case in cases])
+            connection.execute(
+                'UPDATE checkpoints SET last_page = MAX(last_page, COALESCE(?, last_page)), done = MAX(done, ?), '
+                'updated = ? WHERE process_type = ? AND process_id = ?',
+                (last_page, int(done), time.time(), process_type, process_id))
@@ -1,12 +1,40 @@
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from app.infraestructura.cache.read_cache import read_cache
 import json
 import os
 
 
-class DataRepository:
-    def __init__(self):
-        self.path = os.path.join(os.path.dirname(
+class DataRepository(BaseDataRepository):
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.path.dirname(
             os.path.abspath(__file__)), 'data.json')
 
+    def get_version(self):
+        """
+        Returns the modification time and size of the JSON file, which change on every write.
+
+        Returns:
+            tuple or None: `(mtime_ns, size)` of the file, None if it does not exist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        """
+        Returns the parsed JSON file, served from the shared read cache while the file version does not change.
+
+        Returns:
+            dict: The parsed data.
+        """
+        def parse():
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+
+        return read_cache.get_or_load((self.location, 'dataset'), self.get_version(), parse)
+
     def get_data(self):
         """
         Retrieves the data from the JSON file at the specified path.
@@ -19,8 +47,7 @@ class DataRepository:
             if not os.path.exists(self.path):
                 return []
 
-            with open(self.path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
+            data = self._load()
             return list(data.keys()) or []
         except Exception as e:
             return e
@@ -37,8 +64,10 @@ class DataRepository:
         Returns:
             None
         """
-        if os.path.exists(self.path):
-            os.remove(self.path)
+        with self.write_lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._notify_reset()
 
     def update_data(self, data, key):
         """
@@ -53,23 +82,41 @@ class DataRepository:
 
         This function checks if the JSON file at the specified path exists. If it does not exist, the function creates an empty dictionary and writes it to the file. If the file exists, the function reads the existing JSON data and updates it with the given key-value pair. If the key already exists in the JSON data, the function appends the value to the existing list. If the key does not exist, the function adds the key-value pair to the JSON data. Finally, the function writes the updated JSON data back to the file.
         """
-        if not os.path.exists(self.path):
-            data_json = {}
+        with self.write_lock:
+            previous = self.get_version()
+            if not os.path.exists(self.path):
+                data_json = {}
+                with open(self.path, 'w', encoding='utf-8') as file:
+                    json.dump(data_json, file, ensure_ascii=False, indent=4)
+            else:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as file:
+                        data_json = json.load(file)
+                except json.JSONDecodeError:
+                    data_json = {}
+
+            if key in data_json:
+                data_json[key].extend(data[key])
+            else:
+                data_json[key] = data[key]
+
+            # Guardar el archivo JSON actualizado
             with open(self.path, 'w', encoding='utf-8') as file:
                 json.dump(data_json, file, ensure_ascii=False, indent=4)
-        else:
+            self._notify_update(key, data[key], previous, self.get_version())
+
+    def _write_key(self, key, records):
+        """
+        Overwrites the list of `key` in the JSON file with the given records.
+        """
+        data_json = {}
+        if os.path.exists(self.path):
             try:
                 with open(self.path, 'r', encoding='utf-8') as file:
                     data_json = json.load(file)
             except json.JSONDecodeError:
-                pass
-
-        if key in data_json:
-            data_json[key].extend(data[key])
-        else:
-            data_json[key] = data[key]
-
-        # Guardar el archivo JSON actualizado
+                data_json = {}
+        data_json[key] = records
         with open(self.path, 'w', encoding='utf-8') as file:
             json.dump(data_json, file, ensure_ascii=False, indent=4)
 
@@ -89,8 +136,7 @@ class DataRepository:
         try:
             if not os.path.exists(self.path):
                 return False
-            with open(self.path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
+            data = self._load()
 
             if id in data:
                 return data[id]
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+import threading
+
+
+class IndexState:
+    """
+    Derived state of a record index for one repository location.
+
+    Attributes:
+        version (object): The repository version the state was built from.
+        keys (dict): Maps each indexed search ID to the number of its records already indexed.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.keys = {}
+
+
+class RecordIndex:
+    """
+    Base of the indexes derived from the stored records and maintained as `update_data` appends them.
+
+    Each search ID is indexed lazily from the repository the first time it is needed, and from then on only the new
+    records of every write are added, with their position inside the ID. If the repository version changes without
+    a write notified in this process (another process wrote the data), the state of that repository is dropped and
+    rebuilt on demand, also when it is noticed by a write of this process, since the positions of the new records
+    may be shifted by the records of the other process.
+
+    Reads go through `reading`: when the state is current and has the IDs they need indexed they only hold the
+    index lock. Building a search ID holds the repository `write_lock`, so a write can not happen between the scan
+    and the moment the ID is marked as indexed. The lock order is always `write_lock` first, then the index lock.
+
+    Subclasses extend `IndexState` through `new_state` and implement `add_record`.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.states = {}
+
+    def new_state(self, version):
+        return IndexState(version)
+
+    def add_record(self, state, key, position, record):
+        raise NotImplementedError
+
+    def _state(self, repository):
+        """
+        Returns the state of the repository, creating an empty one if it does not exist or its version is stale.
+        Must be called holding `repository.write_lock` and `self.lock`.
+        """
+        version = repository.get_version()
+        state = self.states.get(repository.location)
+        if state is None or state.version != version:
+            state = self.states[repository.location] = self.new_state(version)
+        return state
+
+    def _current_state(self, repository, keys):
+        """
+        Returns the state of the repository if it is at the current version and has every key indexed, None
+        otherwise. Must be called holding `self.lock`.
+        """
+        state = self.states.get(repository.location)
+        if state is None or state.version != repository.get_version():
+            return None
+        if keys is None:
+            keys = repository.get_data()
+        return state if all(key in state.keys for key in keys) else None
+
+    @contextmanager
+    def reading(self, repository, keys=None):
+        """
+        Holds the index lock and yields the state of the repository with the given search IDs indexed, building the
+        missing ones first under `repository.write_lock`.
+
+        Args:
+            repository (BaseDataRepository): The repository to read.
+            keys (list, optional): The search IDs the read needs, every stored ID if None.
+
+        Yields:
+            IndexState: The state of the repository.
+        """
+        with self.lock:
+            state = self._current_state(repository, keys)
+            if state is not None:
+                yield state
+                return
+        with repository.write_lock, self.lock:
+            state = self._state(repository)
+            if keys is None:
+                self._ensure_all(repository, state)
+            for key in keys or ():
+                self._ensure_key(repository, state, key)
+            yield state
+
+    def _index_records(self, state, key, records):
+        position = state.keys.get(key, 0)
+        for record in records:
+            self.add_record(state, key, position, record)
+            position += 1
+        state.keys[key] = position
+
+    def _ensure_key(self, repository, state, key):
+        if key not in state.keys:
+            self._index_records(state, key, repository.iter_data_id(key))
+
+    def _ensure_all(self, repository, state):
+        for key in repository.get_data():
+            self._ensure_key(repository, state, key)
+
+    def on_update(self, repository, key, records, previous, version):
+        with self.lock:
+            state = self.states.get(repository.location)
+            if state is None:
+                return
+            if state.version != previous:
+                # Another process wrote since the state was built, its records are not indexed
+                del self.states[repository.location]
+                return
+            if key in state.keys:
+                self._index_records(state, key, records)
+            state.version = version
+
+    def on_reset(self, repository):
+        with self.lock:
+            self.states.pop(repository.location, None)
@@ -0,0 +1,26 @@
+from app import config
+from app.infraestructura.repositories.binary_shard_repository import BinaryShardDataRepository
+from app.infraestructura.repositories.data_repository import DataRepository
+from app.infraestructura.repositories.segment_log_repository import SegmentLogDataRepository
+from app.infraestructura.repositories.sharded_json_repository import ShardedJsonDataRepository
+from app.infraestructura.repositories.sqlite_repository import SqliteDataRepository
+
+
+def get_data_repository():
+    """
+    Returns the data repository for the storage mode configured in `data_repository_mode`.
+
+    Returns:
+        BaseDataRepository: `SegmentLogDataRepository` for 'segment_log', `SqliteDataRepository` for 'sqlite',
+        `BinaryShardDataRepository` for 'binary_shards', `ShardedJsonDataRepository` for 'json_shards',
+        `DataRepository` (data.json) otherwise.
+    """
+    if config.data_repository_mode == 'segment_log':
+        return SegmentLogDataRepository()
+    if config.data_repository_mode == 'sqlite':
+        return SqliteDataRepository()
+    if config.data_repository_mode == 'binary_shards':
+        return BinaryShardDataRepository()
+    if config.data_repository_mode == 'json_shards':
+        return ShardedJsonDataRepository()
+    return DataRepository()
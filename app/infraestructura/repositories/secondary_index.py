@@ -0,0 +1,105 @@
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from app.infraestructura.repositories.record_index import IndexState, RecordIndex
+from app.utils.utils import Utils
+from bisect import bisect_left, bisect_right
+
+
+INDEXED_FIELDS = ('judicatura', 'materia', 'tipo_accion', 'ciudad')
+
+
+def normalize(value):
+    return str(value).strip().casefold()
+
+
+class SecondaryState(IndexState):
+    """
+    Secondary indexes of the records of one repository.
+
+    Attributes:
+        fields (dict): Maps each indexed field to a dictionary from normalized value to the set of
+            `(search ID, position)` references of the records with that value.
+        fechas (list): List of `(fechaIngreso, search ID, position)` tuples, with the date in the sortable format
+            of `Utils.parse_fecha`. New entries are appended and the list is sorted again before the next query.
+        fechas_sorted (bool): False when entries were appended since the last sort.
+    """
+
+    def __init__(self, version):
+        super().__init__(version)
+        self.fields = {field: {} for field in INDEXED_FIELDS}
+        self.fechas = []
+        self.fechas_sorted = True
+
+
+class SecondaryIndex(RecordIndex):
+    """
+    Indexes the stored records by court (`idJudicatura` and `nombreJudicatura`), subject (`details.nombreMateria`),
+    action type (`details.nombreTipoAccion`), city (`ciudad`) and entry date (`fechaIngreso`), and keeps them up to
+    date as `update_data` appends records.
+
+    Court and city come from the `subProcess` list, so a record is referenced once for every distinct value of its
+    subprocesses. Text values are matched without case distinction.
+    """
+
+    def new_state(self, version):
+        return SecondaryState(version)
+
+    def add_record(self, state, key, position, record):
+        ref = (key, position)
+        details = record.get('details') or {}
+        values = {
+            'materia': {details.get('nombreMateria')},
+            'tipo_accion': {details.get('nombreTipoAccion')},
+            'judicatura': set(),
+            'ciudad': set(),
+        }
+        sub_processes = details.get('subProcess')
+        for sub_process in sub_processes if isinstance(sub_processes, list) else []:
+            values['judicatura'].add(sub_process.get('idJudicatura'))
+            values['judicatura'].add(sub_process.get('nombreJudicatura'))
+            values['ciudad'].add(sub_process.get('ciudad'))
+
+        for field, field_values in values.items():
+            for value in field_values:
+                if value is not None:
+                    state.fields[field].setdefault(
+                        normalize(value), set()).add(ref)
+
+        fecha = Utils.parse_fecha(record.get('fechaIngreso'))
+        if fecha:
+            state.fechas.append((fecha, key, position))
+            state.fechas_sorted = False
+
+    def query(self, repository, filters, desde=None, hasta=None):
+        """
+        Returns the references of the records that match every given filter.
+
+        Args:
+            repository (BaseDataRepository): The repository to query.
+            filters (dict): Maps indexed fields ('judicatura', 'materia', 'tipo_accion', 'ciudad') to the value to
+                match.
+            desde (str, optional): Lower bound of `fechaIngreso`, in the sortable format of `Utils.parse_fecha`.
+            hasta (str, optional): Upper bound of `fechaIngreso`, inclusive, in the same format.
+
+        Returns:
+            list: The sorted list of `(search ID, position)` references.
+        """
+        with self.reading(repository) as state:
+
+            result = None
+            for field, value in filters.items():
+                refs = state.fields[field].get(normalize(value), set())
+                result = set(refs) if result is None else result & refs
+            if desde or hasta:
+                if not state.fechas_sorted:
+                    state.fechas.sort()
+                    state.fechas_sorted = True
+                start = bisect_left(state.fechas, (desde,)) if desde else 0
+                end = bisect_right(state.fechas, (hasta, chr(0x10FFFF))) if hasta else len(state.fechas)
+                refs = {(key, position) for _, key, position in state.fechas[start:end]}
+                result = refs if result is None else result & refs
+
+        return sorted(result or [])
+
+
+secondary_index = SecondaryIndex()
+BaseDataRepository.add_listener(secondary_index)
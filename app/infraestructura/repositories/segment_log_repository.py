@@ -0,0 +1,434 @@
+from app.config import segment_log_max_bytes, segment_log_compaction_threshold
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from contextlib import contextmanager
+import threading
+import fcntl
+import json
+import os
+
+
+class SegmentLogState:
+    """
+    In-memory state of a segment log directory, shared by every repository instance that points to it.
+
+    Attributes:
+        lock (threading.RLock): Guards the index, the active segment and the segment files.
+        file_locks (int): Depth of the `flock` of the directory held by this process, see `_file_lock`.
+        index (dict): Maps each search ID to a list of `(segment, offset, length, count)` entries, in write order,
+            with the number of records of each line.
+        active_segment (int): Number of the segment that receives the appends.
+        active_size (int): Size in bytes of the active segment.
+        generation (int): Incremented on every reset, so a running compaction can detect it is stale.
+        scanned (dict): Maps each segment to the `(inode, offset)` of the file up to which its lines are indexed.
+        loaded (bool): True once the index has been rebuilt from the files on disk.
+        compacting (bool): True while a background compaction is running.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.file_locks = 0
+        self.index = {}
+        self.active_segment = 1
+        self.active_size = 0
+        self.generation = 0
+        self.scanned = {}
+        self.loaded = False
+        self.compacting = False
+
+
+class SegmentLogDataRepository(BaseDataRepository):
+    """
+    Stores the scraped records in append-only log segments with an in-memory offset index per search ID.
+
+    Each call to `update_data` appends a single line `{"k": key, "r": records}` to the active segment, so a write
+    costs the size of the new records instead of the size of the whole dataset. `replace_data` appends a line with
+    `"x": 1`, which replaces every previous line of the key. When the active segment grows over
+    `max_segment_bytes` a new one is opened, and once `compaction_threshold` sealed segments exist they are merged in
+    a background thread into one line per search ID.
+
+    Several processes can share the directory: the appends, the truncation of torn lines, the swap of a compaction
+    and the resets hold an exclusive `flock` on its `.lock` file, and each process indexes the lines appended by the
+    others on its next read.
+    """
+    _states = {}
+    _states_lock = threading.Lock()
+
+    def __init__(self, path=None, max_segment_bytes=segment_log_max_bytes,
+                 compaction_threshold=segment_log_compaction_threshold):
+        self.path = path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'segments')
+        self.max_segment_bytes = max_segment_bytes
+        self.compaction_threshold = compaction_threshold
+        with self._states_lock:
+            self.state = self._states.setdefault(
+                os.path.abspath(self.path), SegmentLogState())
+
+    def get_version(self):
+        """
+        Returns the inode, size and modification time of every segment file, which change on every append, reset
+        and compaction, including the ones made by other processes.
+
+        Returns:
+            tuple: A `(segment, inode, size, mtime_ns)` tuple per segment.
+        """
+        return tuple((segment, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                     for segment, stat in self._stat_segments().items())
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, f'segment-{segment:06d}.log')
+
+    def _list_segments(self):
+        if not os.path.isdir(self.path):
+            return []
+        segments = []
+        for name in os.listdir(self.path):
+            if name.startswith('segment-') and name.endswith('.log'):
+                segments.append(int(name[len('segment-'):-len('.log')]))
+        return sorted(segments)
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Holds the exclusive `flock` of the directory, shared by every process. Must be called holding `state.lock`;
+        nested calls of the same process only take it once, since two `flock` of one process on different file
+        descriptors block each other.
+        """
+        state = self.state
+        if state.file_locks:
+            state.file_locks += 1
+            try:
+                yield
+            finally:
+                state.file_locks -= 1
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, '.lock'), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            state.file_locks = 1
+            try:
+                yield
+            finally:
+                state.file_locks = 0
+
+    def _stat_segments(self):
+        files = {}
+        for segment in self._list_segments():
+            try:
+                files[segment] = os.stat(self._segment_path(segment))
+            except FileNotFoundError:
+                # Removed by a compaction or reset after listing the directory
+                pass
+        return files
+
+    def _load(self):
+        """
+        Brings the offset index up to date with the segments on disk.
+
+        The first call of the process scans every segment. The next ones only scan the bytes appended since the last
+        scan, so the lines written by other processes are indexed as well; when a segment was removed or replaced
+        (a reset or a compaction of another process) the index is rebuilt from scratch.
+
+        On the first scan a torn line at the end of a segment, left by a crash in the middle of a write, is truncated
+        so the next append starts on a clean line. That scan holds the file lock, so the line can not be the append of
+        another process still being written. Later scans stop before an incomplete line and read it on the next call.
+        """
+        state = self.state
+        if not state.loaded and not state.file_locks and os.path.isdir(self.path):
+            with self._file_lock():
+                return self._load()
+        files = self._stat_segments()
+        recover = not state.loaded
+        replaced = not all(
+            segment in files and files[segment].st_ino == inode and files[segment].st_size >= offset
+            for segment, (inode, offset) in state.scanned.items())
+        if recover or replaced:
+            state.index = {}
+            state.scanned = {}
+        for segment, stat in files.items():
+            inode, offset = state.scanned.get(segment, (stat.st_ino, 0))
+            if stat.st_size == offset:
+                continue
+            with open(self._segment_path(segment), 'r+b') as file:
+                file.seek(offset)
+                for line in file:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('Incomplete line')
+                        entry = json.loads(line)
+                        key = entry['k']
+                        count = len(entry['r'])
+                    except (ValueError, TypeError, KeyError):
+                        if recover:
+                            file.truncate(offset)
+                        break
+                    if entry.get('x'):
+                        state.index[key] = []
+                    state.index.setdefault(key, []).append(
+                        (segment, offset, len(line), count))
+                    offset += len(line)
+            state.scanned[segment] = (inode, offset)
+        state.active_segment = max(files) if files else 1
+        state.active_size = state.scanned.get(state.active_segment, (None, 0))[1]
+        state.loaded = True
+
+    def _read_entries(self, entries):
+        records = []
+        files = {}
+        try:
+            for segment, offset, length, _ in entries:
+                if segment not in files:
+                    files[segment] = open(self._segment_path(segment), 'rb')
+                file = files[segment]
+                file.seek(offset)
+                records.extend(json.loads(file.read(length))['r'])
+        finally:
+            for file in files.values():
+                file.close()
+        return records
+
+    def get_data(self):
+        """
+        Retrieves the list of search IDs present in the offset index.
+
+        Returns:
+            list: A list with the stored search IDs, an empty list if nothing has been written.
+        """
+        with self.state.lock:
+            self._load()
+            return list(self.state.index.keys())
+
+    def get_data_id(self, id):
+        """
+        Retrieves the records stored for the given search ID.
+
+        The offset index gives the exact byte ranges of the ID, so only those bytes are read and parsed.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            list or bool: The stored records if the ID exists, False otherwise.
+        """
+        with self.state.lock:
+            self._load()
+            entries = self.state.index.get(id)
+            if not entries:
+                return False
+            return self._read_entries(entries)
+
+    def iter_data_id(self, id):
+        """
+        Yields the records stored for the given search ID, reading one indexed line at a time.
+
+        Args:
+            id (str): The search ID.
+
+        Yields:
+            dict: Each stored record, in write order.
+        """
+        for _, record in self.iter_data_id_from(id):
+            yield record
+
+    def iter_data_id_from(self, id, position=None):
+        """
+        Yields the records stored for the given search ID starting at a position, see
+        `BaseDataRepository.iter_data_id_from`.
+
+        The position is the index of the record. The offset index keeps the number of records of every line, so the
+        lines before the position are skipped without reading them, and the position stays valid after a compaction.
+        The segment files are opened while holding the lock, so a compaction that replaces them afterwards does not
+        affect the records being streamed.
+
+        Args:
+            id (str): The search ID.
+            position (int, optional): The index of the first record, None to start at the first one.
+
+        Yields:
+            tuple: The `(position, record)` of each stored record, in write order.
+        """
+        start = self._check_position(position, 0)
+        files = {}
+        entries = []
+        index = 0
+        with self.state.lock:
+            self._load()
+            for entry in self.state.index.get(id) or []:
+                if entries or index + entry[3] > start:
+                    entries.append(entry)
+                else:
+                    index += entry[3]
+            for segment, _, _, _ in entries:
+                if segment not in files:
+                    files[segment] = open(self._segment_path(segment), 'rb')
+        try:
+            for segment, offset, length, _ in entries:
+                file = files[segment]
+                file.seek(offset)
+                for record in json.loads(file.read(length))['r']:
+                    if index >= start:
+                        yield index, record
+                    index += 1
+        finally:
+            for file in files.values():
+                file.close()
+
+    def update_data(self, data, key):
+        """
+        Appends the records in `data[key]` to the active segment and indexes the new line.
+
+        Args:
+            data (dict): A dictionary with the search ID as key and a list of records as value.
+            key (str): The search ID to update.
+
+        Returns:
+            None
+        """
+        line = (json.dumps({'k': key, 'r': data[key]},
+                           ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self.write_lock:
+            previous, version = self._append(key, line, len(data[key]), replace=False)
+            self._notify_update(key, data[key], previous, version)
+
+    def _write_key(self, key, records):
+        """
+        Appends a replacement line for `key`, the previous lines of the key are dropped by the next compaction.
+        """
+        line = (json.dumps({'k': key, 'r': records, 'x': 1},
+                           ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        self._append(key, line, len(records), replace=True)
+
+    def _append(self, key, line, count, replace):
+        """
+        Appends a line to the active segment holding the file lock, and indexes it.
+
+        Returns:
+            tuple: The versions of the segments right before and right after the append, see `get_version`.
+        """
+        state = self.state
+        with state.lock, self._file_lock():
+            previous = self.get_version()
+            self._load()
+            if state.active_size and state.active_size + len(line) > self.max_segment_bytes:
+                state.active_segment += 1
+                state.active_size = 0
+                self._schedule_compaction()
+
+            # Unbuffered, so the position after the write gives the offset the line got in the file. Holding the file
+            # lock, so another process can not be appending at the same time
+            with open(self._segment_path(state.active_segment), 'ab', buffering=0) as file:
+                file.write(line)
+                offset = file.tell() - len(line)
+                inode = os.fstat(file.fileno()).st_ino
+            if state.scanned.get(state.active_segment, (inode, 0)) != (inode, offset):
+                # Another process appended to the segment since the last scan, the scan indexes its lines and this
+                # one in write order
+                self._load()
+            else:
+                entries = state.index.setdefault(key, [])
+                if replace:
+                    entries.clear()
+                entries.append((state.active_segment, offset, len(line), count))
+                state.scanned[state.active_segment] = (inode, offset + len(line))
+                state.active_size = offset + len(line)
+            return previous, self.get_version()
+
+    def reset_data(self):
+        """
+        Removes every segment and clears the offset index.
+
+        Returns:
+            None
+        """
+        with self.write_lock:
+            state = self.state
+            with state.lock, self._file_lock():
+                for segment in self._list_segments():
+                    os.remove(self._segment_path(segment))
+                state.index = {}
+                state.scanned = {}
+                state.active_segment = 1
+                state.active_size = 0
+                state.generation += 1
+                state.loaded = True
+            self._notify_reset()
+
+    def _schedule_compaction(self):
+        state = self.state
+        sealed = [segment for segment in self._list_segments()
+                  if segment < state.active_segment]
+        if state.compacting or len(sealed) < self.compaction_threshold:
+            return
+        state.compacting = True
+        threading.Thread(target=self.compact, daemon=True,
+                         name='segment-log-compaction').start()
+
+    def compact(self):
+        """
+        Merges every sealed segment into a single segment with one line per search ID.
+
+        The sealed segments are immutable, so they are read and rewritten without holding the lock. The locks are only
+        taken to swap the files and the index entries, and the result is discarded if a reset happened meanwhile or
+        any sealed segment was replaced or removed, by a reset or a compaction of another process. The merged segment
+        takes the number of the newest sealed segment, so the write order is preserved.
+
+        Returns:
+            None
+        """
+        state = self.state
+        try:
+            with state.lock:
+                self._load()
+                generation = state.generation
+                files = self._stat_segments()
+                sealed = [segment for segment in files if segment < state.active_segment]
+                if len(sealed) < 2:
+                    return
+                sealed_files = {segment: (files[segment].st_ino, files[segment].st_size) for segment in sealed}
+
+            merged = {}
+            for segment in sealed:
+                with open(self._segment_path(segment), 'rb') as file:
+                    for line in file:
+                        entry = json.loads(line)
+                        if entry.get('x'):
+                            merged[entry['k']] = []
+                        merged.setdefault(entry['k'], []).extend(entry['r'])
+
+            target = sealed[-1]
+            tmp_path = f'{self._segment_path(target)}.compact-{os.getpid()}'
+            new_entries = {}
+            offset = 0
+            with open(tmp_path, 'wb') as file:
+                for key, records in merged.items():
+                    line = (json.dumps({'k': key, 'r': records}, ensure_ascii=False,
+                                       separators=(',', ':')) + '\n').encode('utf-8')
+                    file.write(line)
+                    new_entries[key] = [(target, offset, len(line), len(records))]
+                    offset += len(line)
+
+            with state.lock, self._file_lock():
+                files = self._stat_segments()
+                current = {segment: (files[segment].st_ino, files[segment].st_size)
+                           for segment in sealed if segment in files}
+                if state.generation != generation or current != sealed_files:
+                    os.remove(tmp_path)
+                    return
+                self._load()
+                os.replace(tmp_path, self._segment_path(target))
+                for segment in sealed[:-1]:
+                    os.remove(self._segment_path(segment))
+                    state.scanned.pop(segment, None)
+                state.scanned[target] = (os.stat(self._segment_path(target)).st_ino, offset)
+                sealed_set = set(sealed)
+                for key in list(state.index.keys()):
+                    remaining = [entry for entry in state.index[key]
+                                 if entry[0] not in sealed_set]
+                    if len(remaining) == len(state.index[key]):
+                        # Replaced after the sealed segments, the merged line is stale
+                        continue
+                    state.index[key] = new_entries.get(key, []) + remaining
+        except OSError:
+            # The segments were removed by a concurrent reset, nothing left to compact.
+            pass
+        finally:
+            state.compacting = False
@@ -0,0 +1,298 @@
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from urllib.parse import quote, unquote
+import threading
+import errno
+import uuid
+import json
+import time
+import os
+
+
+MANIFEST_NAME = 'manifest.json'
+VERSION_NAME = 'VERSION'
+PAGE_EXTENSION = '.json'
+BASE_EXTENSION = '.base.json'
+TMP_PREFIX = '.tmp-'
+
+
+class ShardedJsonDataRepository(BaseDataRepository):
+    """
+    Stores the records of each search ID in its own shard directory, with one immutable JSON file per written page.
+
+    Every page is written to a temporary file and published with `os.replace`, so concurrent writers never share a
+    file, not even two `scrape_process` workers of the same ID (one searching it as ofendido and the other as
+    demandado), and readers only ever see complete pages. Page files are named by write time, so listing the
+    directory gives the write order.
+
+    `get_data` reads the list of IDs from `manifest.json`, which is only rewritten when a new ID appears. The
+    manifest is replaced atomically and checked again after the replacement, so an ID dropped by a concurrent
+    writer of another process is added back.
+
+    Encoding the page and writing it to disk happen outside of any lock. The rest of a write (naming and publishing
+    the page, adding a new ID to the manifest, touching `VERSION` and notifying the listeners) holds the `write_lock`
+    of the location, shared by every ID, so the page names and the notifications follow the publish order.
+    """
+    _writes = {}
+    _writes_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'shards')
+        self.manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        self.version_path = os.path.join(self.path, VERSION_NAME)
+
+    def _shard_dir(self, id):
+        return os.path.join(self.path, quote(id, safe=''))
+
+    def _all_page_files(self, id):
+        try:
+            names = os.listdir(self._shard_dir(id))
+        except FileNotFoundError:
+            return None
+        return sorted(name for name in names
+                      if name.endswith(PAGE_EXTENSION) and not name.startswith(TMP_PREFIX))
+
+    def _page_files(self, id):
+        """
+        Returns the current pages of a shard: from the last base page written by `replace_data` onwards.
+        """
+        names = self._all_page_files(id)
+        if names is None:
+            return None
+        bases = [index for index, name in enumerate(names) if name.endswith(BASE_EXTENSION)]
+        return names[bases[-1]:] if bases else names
+
+    def _write_tmp(self, directory, content):
+        """
+        Writes the content to a new temporary file of the directory and syncs it to disk, so once the caller
+        publishes it with `os.replace` a crash can not leave an empty or partial file under the final name.
+
+        Returns:
+            str: The path of the temporary file.
+        """
+        tmp_path = os.path.join(directory, f'{TMP_PREFIX}{uuid.uuid4().hex}')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        return tmp_path
+
+    def get_version(self):
+        """
+        Returns the number of writes made in this process and the modification time of the `VERSION` file, which
+        every writer of any process touches after publishing a page.
+
+        Returns:
+            tuple: `(writes, mtime_ns)`.
+        """
+        with self._writes_lock:
+            writes = self._writes.get(self.location, 0)
+        try:
+            mtime = os.stat(self.version_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        return (writes, mtime)
+
+    def _touch_version(self):
+        with self._writes_lock:
+            self._writes[self.location] = self._writes.get(
+                self.location, 0) + 1
+        with open(self.version_path, 'a'):
+            os.utime(self.version_path)
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                return json.load(file)['ids']
+        except FileNotFoundError:
+            return None
+
+    def rebuild_manifest(self):
+        """
+        Rebuilds `manifest.json` from the shard directories on disk.
+
+        Returns:
+            list: The list of stored search IDs.
+        """
+        ids = []
+        if os.path.isdir(self.path):
+            # A directory left by a reset with only the temporary file of a writer in flight holds no ID
+            ids = sorted(unquote(name) for name in os.listdir(self.path)
+                         if os.path.isdir(os.path.join(self.path, name)) and self._all_page_files(unquote(name)))
+        os.makedirs(self.path, exist_ok=True)
+        os.replace(self._write_tmp(self.path, json.dumps(
+            {'ids': ids}, ensure_ascii=False)), self.manifest_path)
+        return ids
+
+    def _add_to_manifest(self, key):
+        for _ in range(10):
+            ids = self._read_manifest()
+            if ids is None:
+                ids = self.rebuild_manifest()
+            if key in ids:
+                return
+            os.replace(self._write_tmp(self.path, json.dumps(
+                {'ids': ids + [key]}, ensure_ascii=False)), self.manifest_path)
+
+    def get_data(self):
+        """
+        Retrieves the list of search IDs from the manifest, without reading any shard.
+
+        Returns:
+            list: A list with the stored search IDs.
+        """
+        ids = self._read_manifest()
+        if ids is None:
+            return self.rebuild_manifest() if os.path.isdir(self.path) else []
+        return ids
+
+    def iter_data_id(self, id):
+        """
+        Yields the records stored for the given search ID, reading one page file at a time.
+
+        Args:
+            id (str): The search ID.
+
+        Yields:
+            dict: Each stored record, in write order.
+        """
+        for _, record in self.iter_data_id_from(id):
+            yield record
+
+    def iter_data_id_from(self, id, position=None):
+        """
+        Yields the records stored for the given search ID starting at a position, see
+        `BaseDataRepository.iter_data_id_from`.
+
+        The position is the name of the page file and the index of the record inside the page. Page names follow the
+        write order, so the pages before the position are skipped without reading them. If the page was hidden by a
+        later `replace_data`, the records start at the next current page.
+
+        Args:
+            id (str): The search ID.
+            position (list, optional): The `[page name, record index]`, None to start at the first record.
+
+        Yields:
+            tuple: The `(position, record)` of each stored record, in write order.
+        """
+        if position is None:
+            position = ['', 0]
+        if not isinstance(position, list) or len(position) != 2 or not isinstance(position[0], str) or \
+                not isinstance(position[1], int) or isinstance(position[1], bool) or position[1] < 0:
+            raise ValueError('Invalid cursor')
+        first, skip = position
+        directory = self._shard_dir(id)
+        for name in self._page_files(id) or []:
+            if name < first:
+                continue
+            try:
+                with open(os.path.join(directory, name), 'r', encoding='utf-8') as file:
+                    records = json.load(file)
+            except FileNotFoundError:
+                # Removed by a concurrent reset
+                return
+            for index, record in enumerate(records):
+                if name != first or index >= skip:
+                    yield [name, index], record
+
+    def get_data_id(self, id):
+        """
+        Retrieves the records stored for the given search ID from its shard directory.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            list or bool: The stored records if the ID exists, False otherwise.
+        """
+        if not self._page_files(id):
+            # No directory, or only the temporary files kept by a reset
+            return False
+        return list(self.iter_data_id(id))
+
+    def update_data(self, data, key):
+        """
+        Writes the records in `data[key]` as a new page file of the shard of `key`.
+
+        Args:
+            data (dict): A dictionary with the search ID as key and a list of records as value.
+            key (str): The search ID to update.
+
+        Returns:
+            None
+        """
+        directory = self._shard_dir(key)
+        content = json.dumps(data[key], ensure_ascii=False, separators=(',', ':'))
+        while True:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                tmp_path = self._write_tmp(directory, content)
+                break
+            except FileNotFoundError:
+                # The empty directory was removed by a concurrent reset
+                pass
+
+        with self.write_lock:
+            previous = self.get_version()
+            # Named inside the lock so the names follow the publish order
+            name = f'{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}{PAGE_EXTENSION}'
+            os.replace(tmp_path, os.path.join(directory, name))
+            self._add_to_manifest(key)
+            self._touch_version()
+            self._notify_update(key, data[key], previous, self.get_version())
+
+    def _write_key(self, key, records):
+        """
+        Publishes the records as a base page, which hides every older page of the shard from the readers.
+
+        The pages hidden by the previous base page are removed now; the ones hidden by this one are kept until the
+        next replacement, so a reader that listed them just before does not lose records.
+        """
+        directory = self._shard_dir(key)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self._write_tmp(directory, json.dumps(
+            records, ensure_ascii=False, separators=(',', ':')))
+        names = self._all_page_files(key) or []
+        bases = [index for index, name in enumerate(names) if name.endswith(BASE_EXTENSION)]
+        name = f'{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}{BASE_EXTENSION}'
+        os.replace(tmp_path, os.path.join(directory, name))
+        for old_name in names[:bases[-1]] if bases else []:
+            try:
+                os.remove(os.path.join(directory, old_name))
+            except FileNotFoundError:
+                pass
+        self._add_to_manifest(key)
+        self._touch_version()
+
+    def reset_data(self):
+        """
+        Removes every shard directory and the manifest.
+
+        The temporary files of the writers in flight are kept, since they publish them once they take the lock, and
+        so is the directory that holds them.
+
+        Returns:
+            None
+        """
+        with self.write_lock:
+            for id in self.get_data():
+                directory = self._shard_dir(id)
+                for name in os.listdir(directory) if os.path.isdir(directory) else []:
+                    if name.startswith(TMP_PREFIX):
+                        continue
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except FileNotFoundError:
+                        pass
+                try:
+                    os.rmdir(directory)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    if e.errno != errno.ENOTEMPTY:
+                        raise
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+            if os.path.isdir(self.path):
+                self._touch_version()
+            self._notify_reset()
@@ -0,0 +1,457 @@
+from app.config import sqlite_data_path, sqlite_journal_mode
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+import threading
+import sqlite3
+import json
+import os
+
+
+PROCESS_COLUMNS = [
+    ('type', 'type'),
+    ('fechaIngreso', 'fecha_ingreso'),
+    ('idJuicio', 'id_juicio'),
+]
+
+DETAILS_COLUMNS = [
+    ('nombreDelito', 'nombre_delito'),
+    ('nombreTipoAccion', 'nombre_tipo_accion'),
+    ('nombreMateria', 'nombre_materia'),
+]
+
+SUB_PROCESS_COLUMNS = [
+    ('ciudad', 'ciudad'),
+    ('demandantes', 'demandantes'),
+    ('demandados', 'demandados'),
+    ('idJudicatura', 'id_judicatura'),
+    ('idIncidenteJudicatura', 'id_incidente_judicatura'),
+    ('idMovimientoJuicioIncidente', 'id_movimiento_juicio_incidente'),
+    ('incidente', 'incidente'),
+    ('nombreJudicatura', 'nombre_judicatura'),
+]
+
+ACTUACION_COLUMNS = [
+    ('codigo', 'codigo'),
+    ('fecha', 'fecha'),
+    ('hour', 'hour'),
+    ('idJudicatura', 'id_judicatura'),
+    ('nombreArchivo', 'nombre_archivo'),
+    ('tipo', 'tipo'),
+]
+
+JSON_COLUMNS = {'demandantes', 'demandados'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS searches (
+    search_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS processes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    search_id TEXT NOT NULL REFERENCES searches(search_id) ON DELETE CASCADE,
+    type TEXT,
+    fecha_ingreso TEXT,
+    id_juicio TEXT,
+    nombre_delito TEXT,
+    nombre_tipo_accion TEXT,
+    nombre_materia TEXT,
+    has_sub_process INTEGER NOT NULL DEFAULT 0,
+    extra TEXT,
+    details_extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_processes_search ON processes(search_id, id);
+CREATE INDEX IF NOT EXISTS idx_processes_juicio ON processes(id_juicio);
+CREATE TABLE IF NOT EXISTS sub_processes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    process_id INTEGER NOT NULL REFERENCES processes(id) ON DELETE CASCADE,
+    search_id TEXT NOT NULL,
+    ciudad,
+    demandantes TEXT,
+    demandados TEXT,
+    id_judicatura,
+    id_incidente_judicatura,
+    id_movimiento_juicio_incidente,
+    incidente,
+    nombre_judicatura,
+    has_actuaciones INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sub_processes_search ON sub_processes(search_id, id);
+CREATE INDEX IF NOT EXISTS idx_sub_processes_process ON sub_processes(process_id);
+CREATE TABLE IF NOT EXISTS actuaciones_judiciales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sub_process_id INTEGER NOT NULL REFERENCES sub_processes(id) ON DELETE CASCADE,
+    search_id TEXT NOT NULL,
+    codigo,
+    fecha,
+    hour,
+    id_judicatura,
+    nombre_archivo,
+    tipo,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_actuaciones_search ON actuaciones_judiciales(search_id, id);
+CREATE INDEX IF NOT EXISTS idx_actuaciones_sub_process ON actuaciones_judiciales(sub_process_id);
+"""
+
+
+class SqliteDataRepository(BaseDataRepository):
+    """
+    Stores the scraped records in a SQLite database with one table per level of the record:
+    `processes`, `sub_processes` (the `subProcess` list) and `actuaciones_judiciales`.
+
+    Every table keeps the search ID and is indexed by it, so `get_data_id` costs three indexed range reads that grow
+    with the size of the result and not with the size of the dataset. The database runs in WAL mode, so readers are
+    not blocked by the scraper, and each `update_data` call is written in a single transaction. A database shared by
+    several machines uses the rollback journal instead (`sqlite_journal_mode`), where readers and writers wait for
+    each other.
+
+    Keys without a dedicated column are kept in the `extra` JSON columns so records round-trip unchanged.
+
+    Args:
+        path (str, optional): The database file, `sqlite_data_path` or `data.sqlite` next to this module by default.
+        journal_mode (str): 'WAL', or 'DELETE' for a file on a network filesystem.
+    """
+    _local = threading.local()
+
+    def __init__(self, path=None, journal_mode=sqlite_journal_mode):
+        self.path = path or sqlite_data_path or os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), 'data.sqlite')
+        self.journal_mode = journal_mode
+
+    def _connection(self):
+        """
+        Returns the connection of the current thread for this database, creating it and the schema if needed.
+
+        Returns:
+            sqlite3.Connection: The connection in autocommit mode, transactions are opened explicitly.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(self.path)
+        if connection is None:
+            connection = connections[self.path] = self._open()
+        return connection
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        # NORMAL is only safe against power loss in WAL mode
+        synchronous = 'NORMAL' if self.journal_mode == 'WAL' else 'FULL'
+        connection.execute(f'PRAGMA synchronous={synchronous}')
+        connection.execute('PRAGMA foreign_keys=ON')
+        try:
+            initialized = connection.execute("SELECT 1 FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            initialized = None
+        if initialized is None:
+            # Only the first connection to a new database writes, the next ones just read the version row
+            connection.executescript(SCHEMA)
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+        return connection
+
+    def get_version(self):
+        """
+        Returns the version counter of the database, incremented in the same transaction as every write so writes
+        from other processes are detected too.
+
+        Returns:
+            int: The current version.
+        """
+        return self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @staticmethod
+    def _split(item, columns):
+        """
+        Splits a dictionary into the values of the given columns and a JSON string with the remaining keys.
+
+        Args:
+            item (dict): The dictionary to split.
+            columns (list): A list of `(key, column)` tuples.
+
+        Returns:
+            tuple: A list with the column values (None when the key is missing) and the JSON of the extra keys, or
+            None if there are no extra keys. Keys of the columns whose value is None are kept in the extra keys, so
+            they are rebuilt as None instead of missing.
+        """
+        known = {key for key, _ in columns}
+        values = []
+        for key, column in columns:
+            value = item.get(key)
+            if column in JSON_COLUMNS and value is not None:
+                value = json.dumps(value, ensure_ascii=False)
+            values.append(value)
+        extra = {key: value for key, value in item.items() if key not in known or value is None}
+        return values, json.dumps(extra, ensure_ascii=False) if extra else None
+
+    @staticmethod
+    def _join(row, columns, extra):
+        """
+        Rebuilds a dictionary from the column values of a row and its extra JSON.
+
+        Args:
+            row (sqlite3.Row): The row with the column values.
+            columns (list): A list of `(key, column)` tuples.
+            extra (str): The JSON with the extra keys, or None.
+
+        Returns:
+            dict: The rebuilt dictionary.
+        """
+        item = {}
+        for key, column in columns:
+            value = row[column]
+            if value is None:
+                continue
+            item[key] = json.loads(value) if column in JSON_COLUMNS else value
+        if extra:
+            item.update(json.loads(extra))
+        return item
+
+    def get_data(self):
+        """
+        Retrieves the list of search IDs stored in the database.
+
+        Returns:
+            list: A list with the stored search IDs in insertion order, an empty list if there are none.
+        """
+        rows = self._connection().execute(
+            'SELECT search_id FROM searches ORDER BY rowid').fetchall()
+        return [row[0] for row in rows]
+
+    def get_data_id(self, id):
+        """
+        Retrieves the records stored for the given search ID, rebuilding the nested `subProcess` and
+        `actuacionesJudiciales` lists from their tables.
+
+        Args:
+            id (str): The search ID.
+
+        Returns:
+            list or bool: The stored records if the ID exists, False otherwise.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN')
+        try:
+            exists = connection.execute(
+                'SELECT 1 FROM searches WHERE search_id = ?', (id,)).fetchone()
+            if not exists:
+                return False
+            return [record for _, record in self._iter_records(connection, id)]
+        finally:
+            connection.execute('COMMIT')
+
+    def iter_data_id(self, id):
+        """
+        Yields the records stored for the given search ID one by one, from a dedicated connection that keeps a read
+        snapshot open until the iteration ends.
+
+        Args:
+            id (str): The search ID.
+
+        Yields:
+            dict: Each stored record, in insertion order.
+        """
+        for _, record in self.iter_data_id_from(id):
+            yield record
+
+    def iter_data_id_from(self, id, position=None):
+        """
+        Yields the records stored for the given search ID starting at a position, see
+        `BaseDataRepository.iter_data_id_from`, from a dedicated connection that keeps a read snapshot open until the
+        iteration ends.
+
+        The position is the row ID of the process and the last row IDs of the subprocesses and judicial acts read
+        before it, so the three cursors start right at the record through the search ID indexes.
+
+        Args:
+            id (str): The search ID.
+            position (list, optional): The `[process, sub_process, actuacion]` row IDs, None to start at the first
+                record.
+
+        Yields:
+            tuple: The `(position, record)` of each stored record, in insertion order.
+        """
+        start = self._check_position(position, [0, 0, 0])
+        connection = self._open()
+        try:
+            connection.execute('BEGIN')
+            yield from self._iter_records(connection, id, start)
+        finally:
+            connection.close()
+
+    def _iter_records(self, connection, id, start=(0, 0, 0)):
+        """
+        Rebuilds the records of a search ID by merging three cursors ordered by primary key.
+
+        Children are always inserted right after their parent, so the `sub_processes` and `actuaciones_judiciales`
+        rows of a search ID come in the same order as their parents and each cursor is read only once.
+
+        Args:
+            connection (sqlite3.Connection): A connection with an open read transaction.
+            id (str): The search ID.
+            start (tuple): The row ID of the first process and the row IDs of the subprocesses and judicial acts
+                read before it.
+
+        Yields:
+            tuple: The `[process, sub_process, actuacion]` position and each rebuilt record.
+        """
+        first_process, last_sub, last_act = start
+        processes = connection.execute(
+            'SELECT * FROM processes WHERE search_id = ? AND id >= ? ORDER BY id', (id, first_process))
+        sub_processes = connection.execute(
+            'SELECT * FROM sub_processes WHERE search_id = ? AND id > ? ORDER BY id', (id, last_sub))
+        actuaciones = connection.execute(
+            'SELECT * FROM actuaciones_judiciales WHERE search_id = ? AND id > ? ORDER BY id', (id, last_act))
+        sub_row = sub_processes.fetchone()
+        act_row = actuaciones.fetchone()
+
+        for row in processes:
+            position = [row['id'], last_sub, last_act]
+            children = []
+            while sub_row is not None and sub_row['process_id'] == row['id']:
+                sub_process = self._join(
+                    sub_row, SUB_PROCESS_COLUMNS, sub_row['extra'])
+                acts = []
+                while act_row is not None and act_row['sub_process_id'] == sub_row['id']:
+                    acts.append(self._join(
+                        act_row, ACTUACION_COLUMNS, act_row['extra']))
+                    last_act = act_row['id']
+                    act_row = actuaciones.fetchone()
+                if sub_row['has_actuaciones']:
+                    sub_process['actuacionesJudiciales'] = acts
+                children.append(sub_process)
+                last_sub = sub_row['id']
+                sub_row = sub_processes.fetchone()
+
+            record = self._join(row, PROCESS_COLUMNS, None)
+            details = self._join(row, DETAILS_COLUMNS, None)
+            if row['has_sub_process']:
+                details['subProcess'] = children
+            if row['details_extra']:
+                details.update(json.loads(row['details_extra']))
+            record['details'] = details
+            if row['extra']:
+                record.update(json.loads(row['extra']))
+            yield position, record
+
+    def update_data(self, data, key):
+        """
+        Inserts the records in `data[key]` for the search ID `key` in a single transaction.
+
+        Args:
+            data (dict): A dictionary with the search ID as key and a list of records as value.
+            key (str): The search ID to update.
+
+        Returns:
+            None
+        """
+        with self.write_lock:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                previous = connection.execute(
+                    "SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+                connection.execute(
+                    'INSERT OR IGNORE INTO searches (search_id) VALUES (?)', (key,))
+                for record in data[key]:
+                    self._insert_record(connection, key, record)
+                connection.execute(
+                    "UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            self._notify_update(key, data[key], previous, previous + 1)
+
+    def _insert_record(self, connection, key, record):
+        record = dict(record)
+        details = dict(record.pop('details', None) or {})
+        sub_processes = details.pop('subProcess', None)
+        has_sub_process = isinstance(sub_processes, list)
+        if sub_processes is not None and not has_sub_process:
+            # The incident fetch failed and left its error dict instead of a list
+            details['subProcess'] = sub_processes
+
+        process_values, extra = self._split(record, PROCESS_COLUMNS)
+        details_values, details_extra = self._split(details, DETAILS_COLUMNS)
+        process_id = connection.execute(
+            'INSERT INTO processes (search_id, type, fecha_ingreso, id_juicio, nombre_delito, nombre_tipo_accion, '
+            'nombre_materia, has_sub_process, extra, details_extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [key, *process_values, *details_values, int(has_sub_process), extra, details_extra]).lastrowid
+
+        for sub_process in sub_processes if has_sub_process else []:
+            sub_process = dict(sub_process)
+            actuaciones = sub_process.pop('actuacionesJudiciales', None)
+            has_actuaciones = isinstance(actuaciones, list)
+            if actuaciones is not None and not has_actuaciones:
+                sub_process['actuacionesJudiciales'] = actuaciones
+            values, extra = self._split(sub_process, SUB_PROCESS_COLUMNS)
+            sub_process_id = connection.execute(
+                'INSERT INTO sub_processes (process_id, search_id, ciudad, demandantes, demandados, id_judicatura, '
+                'id_incidente_judicatura, id_movimiento_juicio_incidente, incidente, nombre_judicatura, '
+                'has_actuaciones, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [process_id, key, *values, int(has_actuaciones), extra]).lastrowid
+
+            rows = []
+            for actuacion in actuaciones if has_actuaciones else []:
+                values, extra = self._split(actuacion, ACTUACION_COLUMNS)
+                rows.append([sub_process_id, key, *values, extra])
+            connection.executemany(
+                'INSERT INTO actuaciones_judiciales (sub_process_id, search_id, codigo, fecha, hour, id_judicatura, '
+                'nombre_archivo, tipo, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def _write_key(self, key, records):
+        """
+        Deletes the rows of `key` and inserts the given records in a single transaction.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM actuaciones_judiciales WHERE search_id = ?', (key,))
+            connection.execute(
+                'DELETE FROM sub_processes WHERE search_id = ?', (key,))
+            connection.execute(
+                'DELETE FROM processes WHERE search_id = ?', (key,))
+            connection.execute(
+                'INSERT OR IGNORE INTO searches (search_id) VALUES (?)', (key,))
+            for record in records:
+                self._insert_record(connection, key, record)
+            connection.execute(
+                "UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def reset_data(self):
+        """
+        Removes every stored record in a single transaction, keeping the database file and its schema.
+
+        Returns:
+            None
+        """
+        with self.write_lock:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('DELETE FROM actuaciones_judiciales')
+                connection.execute('DELETE FROM sub_processes')
+                connection.execute('DELETE FROM processes')
+                connection.execute('DELETE FROM searches')
+                connection.execute(
+                    "UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            self._notify_reset()
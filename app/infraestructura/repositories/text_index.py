@@ -0,0 +1,111 @@
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from app.infraestructura.repositories.record_index import IndexState, RecordIndex
+from app.utils.utils import Utils
+from bisect import bisect_left
+
+
+TEXT_FIELDS = ('delito', 'litigante', 'actuacion')
+
+
+class TextState(IndexState):
+    """
+    Inverted index of the records of one repository.
+
+    Attributes:
+        postings (dict): Maps each text field to a dictionary from token to the set of `(search ID, position)`
+            references of the records that contain it.
+        vocabulary (list): Sorted list of every indexed token, used to expand prefixes. It is sorted again before
+            the next search when new tokens were added.
+        vocabulary_sorted (bool): False when tokens were added since the last sort.
+    """
+
+    def __init__(self, version):
+        super().__init__(version)
+        self.postings = {field: {} for field in TEXT_FIELDS}
+        self.vocabulary = []
+        self.vocabulary_sorted = True
+
+
+class TextIndex(RecordIndex):
+    """
+    Accent-folding inverted index over the offense name (`details.nombreDelito`), the litigant names
+    (`demandantes` and `demandados` of each subprocess, as built by `Utils.format_data_sub_process`) and the type of
+    every judicial act (`actuacionesJudiciales.tipo`), updated incrementally as `update_data` appends records.
+    """
+
+    def new_state(self, version):
+        return TextState(version)
+
+    def add_record(self, state, key, position, record):
+        ref = (key, position)
+        details = record.get('details') or {}
+        texts = {'delito': [details.get('nombreDelito')],
+                 'litigante': [], 'actuacion': []}
+        sub_processes = details.get('subProcess')
+        for sub_process in sub_processes if isinstance(sub_processes, list) else []:
+            texts['litigante'].extend(sub_process.get('demandantes') or [])
+            texts['litigante'].extend(sub_process.get('demandados') or [])
+            actuaciones = sub_process.get('actuacionesJudiciales')
+            for actuacion in actuaciones if isinstance(actuaciones, list) else []:
+                texts['actuacion'].append(actuacion.get('tipo'))
+
+        for field, values in texts.items():
+            postings = state.postings[field]
+            for value in values:
+                for token in Utils.tokenize(value):
+                    refs = postings.get(token)
+                    if refs is None:
+                        refs = postings[token] = set()
+                        state.vocabulary.append(token)
+                        state.vocabulary_sorted = False
+                    refs.add(ref)
+
+    def _expand(self, state, token):
+        """
+        Returns the indexed tokens that start with the given token.
+        """
+        if not state.vocabulary_sorted:
+            state.vocabulary = sorted(set(state.vocabulary))
+            state.vocabulary_sorted = True
+        tokens = []
+        index = bisect_left(state.vocabulary, token)
+        while index < len(state.vocabulary) and state.vocabulary[index].startswith(token):
+            tokens.append(state.vocabulary[index])
+            index += 1
+        return tokens
+
+    def search(self, repository, text, fields=TEXT_FIELDS):
+        """
+        Returns the references of the records that contain every token of the text in any of the given fields.
+        The last token also matches as a prefix, so partial names can be searched while typing.
+
+        Args:
+            repository (BaseDataRepository): The repository to search.
+            text (str): The text to search.
+            fields (tuple): The text fields to search in: 'delito', 'litigante' and/or 'actuacion'.
+
+        Returns:
+            list: The sorted list of `(search ID, position)` references.
+        """
+        tokens = Utils.tokenize(text)
+        if not tokens:
+            return []
+        with self.reading(repository) as state:
+
+            result = None
+            for index, token in enumerate(tokens):
+                candidates = self._expand(state, token) if index == len(tokens) - 1 else [token]
+                refs = set()
+                for field in fields:
+                    postings = state.postings[field]
+                    for candidate in candidates:
+                        refs |= postings.get(candidate, set())
+                result = refs if result is None else result & refs
+                if not result:
+                    break
+
+        return sorted(result)
+
+
+text_index = TextIndex()
+BaseDataRepository.add_listener(text_index)
@@ -1,5 +1,9 @@
 from selenium.webdriver.common.by import By
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import unicodedata
+import base64
+import json
+import re
 from app.config import is_get_activity_for_actuaciones_judiciales
 
 
@@ -46,6 +50,102 @@ class Utils:
 
         return {process_id: datos_procesos}
 
+    @staticmethod
+    def format_search_results(data, process_id, process_type):
+        """
+        Formats the cases returned by the listing endpoint of the search (`buscarCausas`) into the same records built by `format_init` from the result page.
+
+        :param data: The cases of a page of the listing.
+        :type data: list[dict]
+        :param process_id: The ID of the process.
+        :type process_id: str
+        :param process_type: The type of the process. Can be either "demandado" or "demandante".
+        :type process_type: str
+        :return: A dictionary with the process ID as the key and the list of process details as the value, see `format_init`.
+        :rtype: dict
+        """
+        datos_procesos = []
+        for process in data:
+            id_juicio = (process.get('idJuicio') or '').strip()
+            if not id_juicio:
+                continue
+            datos_procesos.append({
+                'type': 'demandado' if process_type == 'demandado' else 'demandante',
+                'fechaIngreso': Utils.format_fecha_listado(process.get('fechaIngreso')),
+                'idJuicio': id_juicio,
+                'details': {
+                    'nombreDelito': (process.get('nombreDelito') or '').strip(),
+                }
+            })
+
+        return {process_id: datos_procesos}
+
+    @staticmethod
+    def format_fecha_listado(value):
+        """
+        Formats an ISO date of the API as the result page shows it (`dd/mm/yyyy HH:MM`, in the time of continental Ecuador), so the records of both search modes can be compared.
+
+        :param value: The ISO date, for example `2024-05-20T15:00:00.000+00:00`.
+        :type value: str
+        :return: The formatted date, or the value unchanged if it is not an ISO date.
+        :rtype: str
+        """
+        try:
+            fecha = datetime.fromisoformat((value or '').replace('Z', '+00:00'))
+        except ValueError:
+            return value or ''
+        if fecha.tzinfo is not None:
+            fecha = fecha.astimezone(timezone(timedelta(hours=-5)))
+        return fecha.strftime('%d/%m/%Y %H:%M')
+
+    @staticmethod
+    def format_search_payload(process_type, process_id, page, size):
+        """
+        Builds the body of the listing endpoint of the search, with the identification as actor/ofendido or as demandado/procesado.
+
+        :param process_type: The type of the search. Can be either "ofendido" or "demandado".
+        :type process_type: str
+        :param process_id: The identification to search for.
+        :type process_id: str
+        :param page: The page to fetch, starting at 1.
+        :type page: int
+        :param size: The number of cases per page.
+        :type size: int
+        :return: The body of the request.
+        :rtype: dict
+        """
+        is_actor = process_type == 'ofendido'
+        return {
+            'numeroCausa': '',
+            'actor': {'cedulaActor': process_id if is_actor else '', 'nombreActor': ''},
+            'demandado': {'cedulaDemandado': '' if is_actor else process_id, 'nombreDemandado': ''},
+            'provincia': '',
+            'numeroFiscalia': '',
+            'recaptcha': 'verdad',
+            'first': page,
+            'pageSize': size,
+        }
+
+    @staticmethod
+    def format_case_info(data):
+        """
+        Extracts the general information of a judicial case from the body of `getInformacionJuicio`.
+
+        Args:
+            data (list): The body of the response, a list with the information of the case.
+
+        Returns:
+            dict: The 'nombreTipoAccion' and 'nombreMateria' of the case, 'No disponible' if missing.
+
+        Raises:
+            IndexError, KeyError, TypeError, AttributeError: If the body does not hold the information of a case.
+        """
+        data = data[0]
+        return {
+            'nombreTipoAccion': data.get('nombreTipoAccion', 'No disponible'),
+            'nombreMateria': data.get('nombreMateria', 'No disponible')
+        }
+
     @staticmethod
     def format_data_sub_process(data):
         """
@@ -179,3 +279,173 @@ class Utils:
             1 for item in data if item['type'] == 'demandado')
 
         return {"count_demandante": count_demandante, "count_demandado": count_demandado}
+
+    @staticmethod
+    def latest_actuacion_date(record):
+        """
+        Returns the date of the latest judicial act of a record, across all its subprocesses.
+
+        :param record: A stored record.
+        :type record: dict
+
+        :return: The latest `fecha` in ISO format (YYYY-MM-DD), or None if the record has no judicial acts.
+        """
+        latest = None
+        sub_processes = (record.get('details') or {}).get('subProcess')
+        for sub_process in sub_processes if isinstance(sub_processes, list) else []:
+            actuaciones = sub_process.get('actuacionesJudiciales')
+            for actuacion in actuaciones if isinstance(actuaciones, list) else []:
+                fecha = actuacion.get('fecha')
+                if isinstance(fecha, str) and (latest is None or fecha > latest):
+                    latest = fecha
+        return latest
+
+    @staticmethod
+    def is_case_fetched(record):
+        """
+        Checks if the details and incidents of a case were fetched without errors.
+
+        :param record: A case with its `details`, as written by the scraper.
+        :type record: dict
+
+        :return: False if the details carry an `error` or the incidents are not a list (their call failed).
+        """
+        details = record.get('details') or {}
+        return 'error' not in details and isinstance(details.get('subProcess'), list)
+
+    @staticmethod
+    def encode_cursor(offset):
+        """
+        Encodes a position of a result list into an opaque pagination cursor.
+
+        :param offset: The position of the first item of the next page.
+        :type offset: int
+        :return: The cursor as a URL-safe string.
+        :rtype: str
+        """
+        return base64.urlsafe_b64encode(f'o:{offset}'.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decodes a pagination cursor created by `encode_cursor`.
+
+        :param cursor: The cursor received from the client, or None for the first page.
+        :type cursor: str
+        :return: The position of the first item of the page.
+        :rtype: int
+        :raises ValueError: If the cursor is not valid.
+        """
+        if not cursor:
+            return 0
+        try:
+            prefix, offset = base64.urlsafe_b64decode(
+                cursor.encode()).decode().split(':')
+            offset = int(offset)
+        except Exception:
+            raise ValueError('Invalid cursor')
+        if prefix != 'o' or offset < 0:
+            raise ValueError('Invalid cursor')
+        return offset
+
+    @staticmethod
+    def encode_position_cursor(position):
+        """
+        Encodes a position of a repository (see `BaseDataRepository.iter_data_id_from`) into an opaque pagination
+        cursor.
+
+        :param position: The position of the first item of the next page, a JSON value.
+        :type position: object
+        :return: The cursor as a URL-safe string.
+        :rtype: str
+        """
+        return base64.urlsafe_b64encode(
+            ('p:' + json.dumps(position, separators=(',', ':'))).encode()).decode()
+
+    @staticmethod
+    def decode_position_cursor(cursor):
+        """
+        Decodes a pagination cursor created by `encode_position_cursor`.
+
+        :param cursor: The cursor received from the client, or None for the first page.
+        :type cursor: str
+        :return: The repository position of the first item of the page, None for the first page.
+        :rtype: object
+        :raises ValueError: If the cursor is not valid.
+        """
+        if not cursor:
+            return None
+        try:
+            prefix, position = base64.urlsafe_b64decode(
+                cursor.encode()).decode().split(':', 1)
+            position = json.loads(position)
+        except Exception:
+            raise ValueError('Invalid cursor')
+        if prefix != 'p' or position is None:
+            raise ValueError('Invalid cursor')
+        return position
+
+    @staticmethod
+    def project_fields(item, fields):
+        """
+        Keeps only the given fields of an item. Nested fields are written with dots, for example `details.nombreMateria`,
+        and lists found along the path are projected item by item.
+
+        :param item: The item to project.
+        :type item: dict
+        :param fields: The list of field paths to keep.
+        :type fields: list[str]
+        :return: A new dictionary with the selected fields, missing fields are skipped.
+        :rtype: dict
+        """
+        tree = {}
+        for field in fields:
+            node = tree
+            for part in field.split('.'):
+                node = node.setdefault(part, {})
+
+        def apply(value, node):
+            if not node:
+                return value
+            if isinstance(value, list):
+                return [apply(element, node) for element in value]
+            if not isinstance(value, dict):
+                return value
+            return {key: apply(value[key], child) for key, child in node.items() if key in value}
+
+        return apply(item, tree)
+
+    @staticmethod
+    def parse_fecha(value):
+        """
+        Converts a date as shown by the judicial site (`dd/mm/yyyy` with an optional time) or in ISO format
+        (`yyyy-mm-dd` with an optional time) into a sortable `yyyy-mm-dd HH:MM` string.
+
+        :param value: The date to convert.
+        :type value: str
+        :return: The sortable date, or None if the value is not a valid date.
+        :rtype: str or None
+        """
+        value = (value or '').strip().replace('T', ' ')
+        for date_format in ('%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+            try:
+                return datetime.strptime(value[:19], date_format).strftime('%Y-%m-%d %H:%M')
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def tokenize(text):
+        """
+        Splits a text into search tokens: accents are removed, the text is lowercased and split on any character that is not a letter or a digit.
+
+        :param text: The text to split.
+        :type text: str
+        :return: The list of tokens, for example `['perez', 'nunez', 'jose']` for `'PÉREZ NÚÑEZ, José'`.
+        :rtype: list[str]
+        """
+        if not text:
+            return []
+        decomposed = unicodedata.normalize('NFKD', str(text))
+        folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+        return re.findall(r'[^\W_]+', folded)
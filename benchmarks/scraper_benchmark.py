@@ -0,0 +1,248 @@
+"""
+Measures the throughput of the scraper against the local stand-in of the judicial site and its API.
+
+Usage:
+    python -m benchmarks.scraper_benchmark --searches 4 --cases 200 --latency 0.05
+    python -m benchmarks.scraper_benchmark --workload fetch --cases 500 --error-rate 0.05
+    python -m benchmarks.scraper_benchmark --search-mode browser --cases 30   # needs Chrome
+    python -m benchmarks.scraper_benchmark --workload queue --searches 8 --processes 4
+
+Reports the cases per second, the upstream calls per second and the peak RSS of `ScraperService.init_scraper` and of
+`FetchServices` with a thread pool, and with `--workload queue` of `--processes` scrape workers sharing a work queue
+and a SQLite data file. The stub server runs in its own process, so it does not compete for the GIL with
+the code being measured, and so does each workload, so its peak RSS is not mixed with the one of the others. Nothing is written to the data file or the response cache of the app: the data and the
+checkpoints go to a temporary directory and the response cache is disabled.
+"""
+from tests.stub_server import StubServer, STATS_PATH, SITE_PATH
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+from time import perf_counter
+import multiprocessing
+import argparse
+import resource
+import tempfile
+import json
+import os
+
+HTML_ENDPOINTS = ('busqueda-filtros', 'movimientos')
+
+
+def serve(options, urls):
+    server = StubServer(**options).start()
+    urls.put(server.url)
+    server.thread.join()
+
+
+def start_server(options):
+    """
+    Starts the stub server in a child process.
+
+    Returns:
+        tuple: The process and the URL of the server.
+    """
+    urls = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(options, urls), daemon=True)
+    process.start()
+    return process, urls.get(timeout=10)
+
+
+def server_stats(url):
+    with urlopen(f'{url}{STATS_PATH}') as response:
+        return json.loads(response.read())
+
+
+def configure(args, url):
+    """
+    Points the app to the stub server. `app.config` reads the environment on import, so the app modules are imported
+    after calling this function.
+    """
+    os.environ.update({
+        'API_URL': url,
+        'URL_SCRAPER': f'{url}{SITE_PATH}',
+        'SEARCH_MODE': args.search_mode,
+        'SEARCH_PAGE_SIZE': str(args.page_size),
+        'FETCH_ENGINE': args.engine,
+        'SCRAPE_PIPELINE': '1' if args.pipeline else '0',
+        'API_RATE_LIMIT': str(args.rate),
+        'RESPONSE_CACHE_ENABLED': '0',
+    })
+
+
+def upstream_calls(stats):
+    return sum(count for endpoint, count in stats['calls'].items() if endpoint not in HTML_ENDPOINTS)
+
+
+def run_fetch(args, url):
+    """
+    Fetches the details, incidents and judicial acts of `cases` cases with `FetchServices` and a thread pool, the
+    same way the page-by-page flow of the scraper does.
+
+    Returns:
+        tuple: The number of cases and the elapsed seconds.
+    """
+    from app.application.services.fetch_service import FetchServices
+    from app.infraestructura.cache.response_cache import ResponseCache
+    from app.utils.utils import Utils
+
+    fetch_services = FetchServices(url=url, cache=ResponseCache(enabled=False))
+    case_ids = [f'0933220240{i:05d}' for i in range(args.cases)]
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        details = list(executor.map(fetch_services.fetch_case_details, case_ids))
+        processes = [{'idJuicio': case_id, 'details': detail} for case_id, detail in zip(case_ids, details)
+                     if isinstance(detail.get('subProcess'), list)]
+        list(executor.map(fetch_services.fetch_actuaciones_judiciales, Utils.extract_info_sub_process(processes)))
+    return len(case_ids), perf_counter() - started
+
+
+def run_scraper(args, url, tmp):
+    """
+    Runs `ScraperService.init_scraper` for `searches` searches of `cases` cases each.
+
+    Returns:
+        tuple: The number of cases stored and the elapsed seconds.
+    """
+    from app.application.services.async_fetch_service import AsyncFetchServices
+    from app.application.services.fetch_service import FetchServices
+    from app.application.services.scraper_service import ScraperService
+    from app.infraestructura.cache.response_cache import ResponseCache
+    from app.infraestructura.repositories.data_repository import DataRepository
+    from app.infraestructura.repositories.checkpoint_repository import CheckpointRepository
+
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=url, cache=ResponseCache(enabled=False))
+    service.async_fetch_services = AsyncFetchServices(url=url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=os.path.join(tmp, 'data.json'))
+    service.checkpoints = CheckpointRepository(path=os.path.join(tmp, 'checkpoints.sqlite'))
+    service.arr_process_search = [{'type': 'ofendido' if i % 2 else 'demandado', 'id': f'17{i:08d}001'}
+                                  for i in range(args.searches)]
+    started = perf_counter()
+    response = service.init_scraper()
+    elapsed = perf_counter() - started
+    if isinstance(response, tuple):
+        for search in response[0]['searches']:
+            if search.get('status') != 'success':
+                print(f"search {search.get('process_id')} failed: {search.get('error')}")
+    cases = sum(len(service.data_repository.get_data_id(key) or [])
+                for key in service.data_repository.get_data())
+    return cases, elapsed
+
+
+def queue_service():
+    """
+    Creates the `ScraperService` of a worker of the queue workload, writing to the SQLite data file of the temporary
+    directory in `QUEUE_BENCHMARK_DIR`.
+    """
+    from app.application.services.scraper_service import ScraperService
+    from app.application.services.fetch_service import FetchServices
+    from app.infraestructura.cache.response_cache import ResponseCache
+    from app.infraestructura.repositories.sqlite_repository import SqliteDataRepository
+
+    service = ScraperService()
+    service.fetch_services = FetchServices(cache=ResponseCache(enabled=False))
+    service.data_repository = SqliteDataRepository(path=os.path.join(os.environ['QUEUE_BENCHMARK_DIR'], 'data.sqlite'))
+    return service
+
+
+def run_queue(args, url, tmp):
+    """
+    Queues `searches` searches of `cases` cases each and runs `processes` scrape workers until the queue is empty.
+
+    Returns:
+        tuple: The number of cases stored and the elapsed seconds.
+    """
+    from app.application.services.worker_service import run_workers, search_tasks
+    from app.infraestructura.queue.work_queue import WorkQueue
+    from app.infraestructura.repositories.sqlite_repository import SqliteDataRepository
+
+    os.environ['QUEUE_BENCHMARK_DIR'] = tmp
+    queue = WorkQueue(path=os.path.join(tmp, 'queue.sqlite'))
+    queue.enqueue(search_tasks([{'type': 'ofendido' if i % 2 else 'demandado', 'id': f'17{i:08d}001'}
+                                for i in range(args.searches)]))
+    started = perf_counter()
+    run_workers(args.processes, queue.path, exit_when_empty=True, service_factory=queue_service)
+    elapsed = perf_counter() - started
+    stats = queue.stats()
+    for worker in stats['workers']:
+        print(f"worker {worker['worker_id']}: {worker['tasks_done']} tasks, {worker['cases']} cases, "
+              f"{worker['cases_per_second']} cases/s busy")
+    if stats['tasks']['failed']:
+        print(f"{stats['tasks']['failed']} searches failed")
+    repository = SqliteDataRepository(path=os.path.join(tmp, 'data.sqlite'))
+    cases = sum(len(repository.get_data_id(key) or []) for key in repository.get_data())
+    return cases, elapsed
+
+
+def run_workload(args, url, tmp, workload, results):
+    """
+    Runs one workload in a child process started by `main` and puts its row of results in the `results` queue, with
+    the peak RSS of the process and of its children (the worker processes of the queue workload, the driver in the
+    browser mode).
+    """
+    from app.infraestructura.drivers.rate_controller import rate_controller
+
+    before = server_stats(url)
+    if workload == 'fetch':
+        cases, elapsed = run_fetch(args, url)
+    elif workload == 'queue':
+        cases, elapsed = run_queue(args, url, tmp)
+    else:
+        cases, elapsed = run_scraper(args, url, tmp)
+    after = server_stats(url)
+    results.put((workload, cases, elapsed, upstream_calls(after) - upstream_calls(before),
+                 after['errors'] - before['errors'],
+                 resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, rate_controller.stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workload', choices=('scraper', 'fetch', 'queue', 'all'), default='all')
+    parser.add_argument('--searches', type=int, default=4)
+    parser.add_argument('--cases', type=int, default=100, help='cases per search')
+    parser.add_argument('--incidents', type=int, default=1, help='incidents per case')
+    parser.add_argument('--actuaciones', type=int, default=5, help='judicial acts per incident')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per upstream response')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of API calls answered with 503')
+    parser.add_argument('--search-mode', choices=('http', 'browser'), default='http')
+    parser.add_argument('--page-size', type=int, default=50, help='cases per page of the http search mode')
+    parser.add_argument('--engine', choices=('threads', 'asyncio'), default='threads')
+    parser.add_argument('--pipeline', type=int, choices=(0, 1), default=1)
+    parser.add_argument('--rate', type=float, default=0, help='API calls per second, 0 disables the pacing')
+    parser.add_argument('--workers', type=int, default=10, help='threads of the fetch workload')
+    parser.add_argument('--processes', type=int, default=2, help='worker processes of the queue workload')
+    args = parser.parse_args()
+
+    process, url = start_server({'latency': args.latency, 'search_total': args.cases, 'error_rate': args.error_rate,
+                                 'incidents': args.incidents, 'actuaciones': args.actuaciones})
+    configure(args, url)
+
+    results = []
+    # Spawned, so the workload starts from a fresh interpreter instead of a copy of this one
+    context = multiprocessing.get_context('spawn')
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            workloads = ('fetch', 'scraper') if args.workload == 'all' else (args.workload,)
+            for workload in workloads:
+                queue = context.Queue()
+                child = context.Process(target=run_workload, args=(args, url, tmp, workload, queue))
+                child.start()
+                results.append(queue.get())
+                child.join()
+    finally:
+        process.terminate()
+        process.join()
+
+    print(f'{args.searches} searches x {args.cases} cases, {args.incidents} incidents x {args.actuaciones} acts, '
+          f'latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%}, search mode {args.search_mode}, '
+          f'engine {args.engine}, pipeline {"on" if args.pipeline else "off"}')
+    print(f"{'workload':<12}{'cases':>8}{'seconds':>10}{'cases/s':>10}{'calls':>8}{'calls/s':>10}{'503s':>7}"
+          f"{'RSS MB':>9}{'children MB':>13}")
+    for workload, cases, elapsed, calls, errors, rss, children_rss, _ in results:
+        print(f'{workload:<12}{cases:>8}{elapsed:>10.2f}{cases / elapsed:>10.1f}'
+              f'{calls:>8}{calls / elapsed:>10.1f}{errors:>7}{rss:>9.1f}{children_rss:>13.1f}')
+    for workload, *_, controller in results:
+        print(f'rate controller ({workload}): {controller}')
+
+if __name__ == '__main__':
+    main()
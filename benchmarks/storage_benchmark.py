@@ -0,0 +1,129 @@
+"""
+Compares the disk use and the cold read time of one ID between the `data.json` layout and the binary shards.
+
+Usage:
+    python -m benchmarks.storage_benchmark --ids 20 --cases 200
+"""
+from app.infraestructura.cache.read_cache import read_cache
+from app.infraestructura.repositories.binary_shard_repository import BinaryShardDataRepository
+from app.infraestructura.repositories.data_repository import DataRepository
+from time import perf_counter
+import argparse
+import tempfile
+import random
+import json
+import os
+
+COURTS = [
+    ('09332', 'UNIDAD JUDICIAL CIVIL CON SEDE EN EL CANTÓN GUAYAQUIL', 'GUAYAQUIL'),
+    ('17230', 'UNIDAD JUDICIAL DE TRABAJO CON SEDE EN LA PARROQUIA IÑAQUITO DEL DISTRITO METROPOLITANO DE QUITO', 'QUITO'),
+    ('01333', 'UNIDAD JUDICIAL MULTICOMPETENTE CON SEDE EN EL CANTÓN CUENCA', 'CUENCA'),
+]
+ACTS = ['RAZON', 'PROVIDENCIA GENERAL', 'ESCRITO', 'AUTO GENERAL', 'NOTIFICACION', 'CITACION']
+
+
+def build_dataset(ids, cases, seed=7):
+    """
+    Builds a synthetic dataset with the same shape and value repetition as the scraped data.
+
+    Args:
+        ids (int): Number of search IDs.
+        cases (int): Number of cases per search ID.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: The dataset, with the search ID as key and a list of records as value.
+    """
+    rnd = random.Random(seed)
+    dataset = {}
+    for i in range(ids):
+        records = []
+        for c in range(cases):
+            court_id, court_name, city = rnd.choice(COURTS)
+            id_juicio = f'{court_id}2024{i:03d}{c:05d}'
+            actuaciones = [{
+                'codigo': rnd.randint(1, 10 ** 7),
+                'fecha': f'2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}',
+                'hour': f'{rnd.randint(8, 17):02d}:{rnd.randint(0, 59):02d}:00',
+                'idJudicatura': court_id,
+                'nombreArchivo': 'No disponible',
+                'tipo': rnd.choice(ACTS),
+            } for _ in range(rnd.randint(3, 15))]
+            records.append({
+                'type': rnd.choice(['demandado', 'demandante']),
+                'fechaIngreso': f'{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024 10:00',
+                'idJuicio': id_juicio,
+                'details': {
+                    'nombreDelito': rnd.choice(['COBRO DE DINERO', 'DESPIDO INTEMPESTIVO', 'DAÑOS Y PERJUICIOS']),
+                    'nombreTipoAccion': 'PROCEDIMIENTO ORDINARIO',
+                    'nombreMateria': rnd.choice(['CIVIL', 'LABORAL']),
+                    'subProcess': [{
+                        'ciudad': city,
+                        'demandantes': ['No disponible'],
+                        'demandados': [f'EMPRESA {i} S.A.'],
+                        'idJudicatura': court_id,
+                        'idIncidenteJudicatura': rnd.randint(10 ** 6, 10 ** 7),
+                        'idMovimientoJuicioIncidente': rnd.randint(10 ** 6, 10 ** 7),
+                        'incidente': 'No disponible',
+                        'nombreJudicatura': court_name,
+                        'actuacionesJudiciales': actuaciones,
+                    }]
+                }
+            })
+        dataset[f'{i:010d}001'] = records
+    return dataset
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def measure_read(repository, id, rounds):
+    best = None
+    for _ in range(rounds):
+        read_cache.invalidate()
+        start = perf_counter()
+        repository.get_data_id(id)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ids', type=int, default=20)
+    parser.add_argument('--cases', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    dataset = build_dataset(args.ids, args.cases)
+    target = next(iter(dataset))
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'data.json')
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(dataset, file, ensure_ascii=False, indent=4)
+        results = [('json (data.json, indent=4)', os.path.getsize(json_path),
+                    measure_read(DataRepository(path=json_path), target, args.rounds))]
+
+        for label, compression in (('binary shards', False), ('binary shards + zlib', True)):
+            path = os.path.join(tmp, label.replace(' ', '_').replace('+', ''))
+            repository = BinaryShardDataRepository(path=path, compression=compression)
+            for key, records in dataset.items():
+                for start in range(0, len(records), args.page_size):
+                    repository.update_data(
+                        {key: records[start:start + args.page_size]}, key)
+            assert repository.get_data_id(target) == dataset[target]
+            results.append((label, directory_size(path),
+                            measure_read(repository, target, args.rounds)))
+
+    print(f'{args.ids} ids x {args.cases} cases, pages of {args.page_size}, reading one id')
+    print(f"{'layout':<30}{'disk (KB)':>12}{'vs json':>10}{'read (ms)':>12}{'vs json':>10}")
+    base_size, base_time = results[0][1], results[0][2]
+    for label, size, elapsed in results:
+        print(f'{label:<30}{size / 1024:>12.1f}{size / base_size:>10.2f}'
+              f'{elapsed * 1000:>12.2f}{elapsed / base_time:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
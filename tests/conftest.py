@@ -0,0 +1,35 @@
+from app.application.services import data_service, scraper_service
+from app.infraestructura.cache.response_cache import response_cache
+from app.infraestructura.repositories.checkpoint_repository import CheckpointRepository
+from app.infraestructura.repositories.data_repository import DataRepository
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_response_cache(monkeypatch, tmp_path):
+    """
+    Fixture that points the shared response cache to a temporary database, so the tests that use the default
+    `FetchServices` do not leave `responses.sqlite` inside the app package.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(response_cache, 'path', str(tmp_path / 'responses.sqlite'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_repositories(monkeypatch, tmp_path):
+    """
+    Fixture that points the data repository and the checkpoints created by default by `ScraperService` and
+    `DataService` to a temporary directory, so the tests that run the scraper through the API do not write
+    `data.json` or leave an unfinished run in `checkpoints.sqlite` inside the app package, which the next real run
+    would resume.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'data.json')
+    monkeypatch.setattr(scraper_service, 'get_data_repository', lambda: DataRepository(path=path))
+    monkeypatch.setattr(data_service, 'get_data_repository', lambda: DataRepository(path=path))
+    monkeypatch.setattr(scraper_service, 'CheckpointRepository',
+                        lambda path=None: CheckpointRepository(path=path or str(tmp_path / 'checkpoints.sqlite')))
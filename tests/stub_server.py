@@ -0,0 +1,243 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+from html import escape
+import threading
+import resource
+import random
+import json
+import time
+
+
+CASE_PATH = '/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/getInformacionJuicio/'
+INCIDENT_PATH = '/EXPEL-CONSULTA-CAUSAS-CLEX-SERVICE/api/consulta-causas-clex/informacion/getIncidenteJudicatura/'
+ACTUACIONES_PATH = '/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/actuacionesJudiciales'
+SEARCH_PATH = '/EXPEL-CONSULTA-CAUSAS-SERVICE/api/consulta-causas/informacion/buscarCausas'
+SITE_PATH = '/busqueda-filtros'
+MOVEMENTS_PATH = '/movimientos/'
+STATS_PATH = '/__stats'
+SITE_PAGE_SIZE = 10
+NEXT_BUTTON_CLASS = ('mat-mdc-tooltip-trigger mat-mdc-paginator-navigation-next mdc-icon-button mat-mdc-icon-button '
+                     'mat-unthemed mat-mdc-button-base')
+
+
+def case_response(case_id):
+    return [{'idJuicio': case_id, 'nombreTipoAccion': 'PROCEDIMIENTO ORDINARIO', 'nombreMateria': 'CIVIL'}]
+
+
+def incident_response(case_id, incidents=1):
+    return [{
+        'ciudad': 'GUAYAQUIL',
+        'idJudicatura': f'{9332 + i:05d}',
+        'nombreJudicatura': 'UNIDAD JUDICIAL CIVIL',
+        'lstIncidenteJudicatura': [{
+            'idIncidenteJudicatura': 1,
+            'idMovimientoJuicioIncidente': 2,
+            'incidente': case_id,
+            'lstLitiganteActor': [{'nombresLitigante': 'EMPRESA S.A.'}],
+            'lstLitiganteDemandado': [{'nombresLitigante': 'PEREZ JOSE'}],
+        }],
+    } for i in range(incidents)]
+
+
+def actuaciones_response(payload, actuaciones=1):
+    return [{'codigo': i + 1, 'fecha': '2024-05-20T10:30:00Z', 'idJudicatura': payload.get('idJudicatura'),
+             'nombreArchivo': 'archivo ', 'tipo': 'PROVIDENCIA GENERAL '} for i in range(actuaciones)]
+
+
+def search_cases(identification, first, last, total):
+    return [{'id': i, 'idJuicio': f'09332{identification[-7:-3]}{i:05d}', 'nombreDelito': 'COBRO DE DINERO ',
+             'fechaIngreso': '2024-05-20T15:00:00.000+00:00', 'idJudicatura': '09332'}
+            for i in range(first, min(last, total))]
+
+
+def search_response(payload, page, size, total):
+    identification = payload['actor']['cedulaActor'] or payload['demandado']['cedulaDemandado']
+    return search_cases(identification, (page - 1) * size, page * size, total)
+
+
+def search_form():
+    inputs = ''.join(
+        f'<input placeholder="Ingrese la identificación del {label}" data-tipo="{tipo}">'
+        for tipo, label in (('ofendido', 'Actor/Ofendido'), ('demandado', 'Demandado/Procesado')))
+    return f'''<!DOCTYPE html><html><body>{inputs}
+<script>
+document.querySelectorAll('input').forEach(function (input) {{
+  input.addEventListener('keydown', function (event) {{
+    if (event.key === 'Enter') {{
+      location.href = '{SITE_PATH}?tipo=' + input.dataset.tipo + '&id=' + encodeURIComponent(input.value) + '&page=1';
+    }}
+  }});
+}});
+</script></body></html>'''
+
+
+def results_page(identification, tipo, page, total):
+    pages = max(1, -(-total // SITE_PAGE_SIZE))
+    cases = ''.join(f'''<div class="causa-individual">
+<a class="numero-proceso" href="{MOVEMENTS_PATH}{case['idJuicio']}"
+   aria-label="Vínculo para ingresar a los movimientos del proceso {case['idJuicio']}">{case['idJuicio']}</a>
+<span class="fecha">20/05/2024 10:00</span>
+<span class="accion-infraccion">{escape(case['nombreDelito'])}</span>
+</div>''' for case in search_cases(identification, (page - 1) * SITE_PAGE_SIZE, page * SITE_PAGE_SIZE, total))
+    next_url = f'{SITE_PATH}?' + urlencode({'tipo': tipo, 'id': identification, 'page': min(page + 1, pages)})
+    return f'''<!DOCTYPE html><html><body>
+<div class="cantidadMovimiento">Resultados: {total}</div>
+{cases}
+<div class="mat-mdc-paginator-range-label">Página {page} de {pages}</div>
+<button class="{NEXT_BUTTON_CLASS}" onclick="location.href='{next_url}'">Siguiente</button>
+</body></html>'''
+
+
+def movements_page():
+    return '<!DOCTYPE html><html><body><button class="btn-regresar" onclick="history.back()">Regresar</button></body></html>'
+
+
+class StubServer:
+    """
+    Local HTTP/1.1 server with keep-alive that stands in for the judicial site and its API, so the fetch engines and
+    the scraper can be tested and benchmarked offline.
+
+    It answers the API endpoints used by `FetchServices` (the case information, the incidents, the judicial acts and
+    the listing of a search) with generated data, and the search page (`/busqueda-filtros`) with the markup read by
+    `ScraperService` in the browser mode: the search inputs, the `.causa-individual` results with `.numero-proceso`,
+    `.fecha` and `.accion-infraccion`, and the paginator.
+
+    Attributes:
+        latency (float): Seconds to wait before each response.
+        error_rate (float): Share of the API calls answered with a 503 error, from 0 to 1.
+        search_total (int): Number of cases listed by a search for every identification.
+        incidents (int): Number of incidents of each case.
+        actuaciones (int): Number of judicial acts of each incident.
+        requests (int): Number of requests answered.
+        errors (int): Number of 503 errors answered.
+        calls (dict): Number of requests answered by endpoint.
+        connections (set): Client addresses of every connection opened.
+        in_flight (int): Requests being answered right now.
+        max_in_flight (int): Highest number of requests answered at once.
+    """
+
+    def __init__(self, latency=0, search_total=25, error_rate=0, incidents=1, actuaciones=1, seed=7):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.search_total = search_total
+        self.incidents = incidents
+        self.actuaciones = actuaciones
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.calls = {}
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.site_url = f'{self.url}{SITE_PATH}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, without this every keep-alive response waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def _reply(self, endpoint, payload, content_type='application/json'):
+                with server.lock:
+                    server.requests += 1
+                    server.calls[endpoint] = server.calls.get(endpoint, 0) + 1
+                    server.connections.add(self.client_address)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    failed = (content_type == 'application/json' and payload is not None
+                              and server.random.random() < server.error_rate)
+                    if failed:
+                        server.errors += 1
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if failed:
+                        status, payload = 503, {'error': 'Service Unavailable'}
+                    else:
+                        status = 200 if payload is not None else 404
+                    if content_type == 'application/json':
+                        body = json.dumps(payload).encode('utf-8') if payload is not None else b'{}'
+                    else:
+                        body = payload.encode('utf-8')
+                    self.send_response(status)
+                    self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                path = parts.path
+                if path == STATS_PATH:
+                    body = json.dumps(server.stats()).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif path.startswith(CASE_PATH):
+                    self._reply('getInformacionJuicio', case_response(path[len(CASE_PATH):]))
+                elif path.startswith(INCIDENT_PATH):
+                    self._reply('getIncidenteJudicatura',
+                                incident_response(path[len(INCIDENT_PATH):], server.incidents))
+                elif path == SITE_PATH:
+                    query = parse_qs(parts.query)
+                    if 'id' in query:
+                        page = results_page(query['id'][0], query.get('tipo', ['ofendido'])[0],
+                                            int(query.get('page', ['1'])[0]), server.search_total)
+                    else:
+                        page = search_form()
+                    self._reply('busqueda-filtros', page, 'text/html')
+                elif path.startswith(MOVEMENTS_PATH):
+                    self._reply('movimientos', movements_page(), 'text/html')
+                else:
+                    self._reply('not_found', None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                parts = urlsplit(self.path)
+                if parts.path == ACTUACIONES_PATH:
+                    self._reply('actuacionesJudiciales', actuaciones_response(payload, server.actuaciones))
+                elif parts.path == SEARCH_PATH:
+                    query = parse_qs(parts.query)
+                    self._reply('buscarCausas', search_response(payload, int(query['page'][0]),
+                                                                int(query['size'][0]), server.search_total))
+                else:
+                    self._reply('not_found', None)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stats(self):
+        """
+        Returns the counters of the server, also served on `/__stats` for a server running in another process.
+
+        Returns:
+            dict: The `requests`, `errors`, `calls` by endpoint and `max_in_flight` counters, and the peak RSS of the
+            server process in MB.
+        """
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors, 'calls': dict(self.calls),
+                    'max_in_flight': self.max_in_flight,
+                    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
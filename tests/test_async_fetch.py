@@ -0,0 +1,127 @@
+from app.application.services.async_fetch_service import AsyncFetchServices
+from app.infraestructura.cache.response_cache import ResponseCache
+from app.infraestructura.drivers.async_http import AsyncHttpClient, AsyncHttpEngine
+from app.infraestructura.drivers.rate_controller import RateController
+from tests.stub_server import StubServer
+import concurrent.futures
+import threading
+import pytest
+import time
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Fixture that starts the local stub of the API and stops the engine loop afterwards.
+
+    Returns:
+        StubServer: The running stub server.
+    """
+    server = StubServer().start()
+    yield server
+    AsyncHttpEngine.close()
+    server.stop()
+
+
+def test_async_fetch_case_details_with_bounded_concurrency(stub_server, tmp_path):
+    """
+    Test case to verify that `AsyncFetchServices` returns the same formatted results as `FetchServices` and that the
+    calls in flight and the connections opened never go over the per host limit, with the connections reused.
+
+    Parameters:
+    - stub_server: A fixture with the local stub of the API.
+    - tmp_path: A temporary directory for the response cache.
+
+    Returns:
+        None
+    """
+    client = AsyncHttpClient(max_concurrency=50, per_host_limit=8,
+                             controller=RateController(rate=0, initial_limit=50))
+    fetch_services = AsyncFetchServices(url=stub_server.url, client=client,
+                                        cache=ResponseCache(path=str(tmp_path / 'responses.sqlite')))
+    case_ids = [f'0933220240{i:04d}' for i in range(300)]
+
+    results = fetch_services.fetch_all(fetch_services.fetch_case_details, case_ids)
+
+    assert len(results) == 300
+    assert results[7] == {
+        'nombreTipoAccion': 'PROCEDIMIENTO ORDINARIO',
+        'nombreMateria': 'CIVIL',
+        'subProcess': [{
+            'ciudad': 'GUAYAQUIL', 'demandantes': ['EMPRESA S.A.'], 'demandados': ['PEREZ JOSE'],
+            'idJudicatura': '09332', 'idIncidenteJudicatura': 1, 'idMovimientoJuicioIncidente': 2,
+            'incidente': case_ids[7], 'nombreJudicatura': 'UNIDAD JUDICIAL CIVIL'}],
+    }
+    actuaciones = fetch_services.fetch_all(fetch_services.fetch_actuaciones_judiciales, [
+        {'idJudicatura': '09332', 'idJuicio': case_ids[0], 'ciudad': 'GUAYAQUIL'}])
+    assert actuaciones[0]['09332'][0]['tipo'] == 'PROVIDENCIA GENERAL'
+
+    stats = client.stats()
+    assert stats['requests'] == 601
+    assert stats['errors'] == 0
+    assert stats['max_in_flight'] <= 8
+    assert stats['connections'] <= 8
+    assert len(stub_server.connections) == stats['connections']
+
+
+def test_async_fetch_cancels_pending_calls_on_timeout(stub_server, tmp_path):
+    """
+    Test case to verify that when the caller stops waiting, the pending calls are cancelled and release their slots.
+
+    Parameters:
+    - stub_server: A fixture with the local stub of the API.
+    - tmp_path: A temporary directory for the response cache.
+
+    Returns:
+        None
+    """
+    stub_server.latency = 1
+    client = AsyncHttpClient(max_concurrency=4, per_host_limit=4,
+                             controller=RateController(rate=0, initial_limit=50))
+    fetch_services = AsyncFetchServices(url=stub_server.url, client=client,
+                                        cache=ResponseCache(path=str(tmp_path / 'responses.sqlite')))
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        fetch_services.fetch_all(fetch_services.fetch_case_details, list(range(40)), timeout=0.2)
+
+    deadline = time.time() + 2
+    while client.stats()['in_flight'] and time.time() < deadline:
+        time.sleep(0.01)
+    assert client.stats()['in_flight'] == 0
+    assert client.stats()['requests'] == 4
+
+
+def test_async_fetch_reads_the_response_cache_off_the_loop(stub_server, tmp_path):
+    """
+    Test case to verify that the asyncio engine calls the blocking response cache in the executor of the loop and
+    not on the loop thread, and that a hit does not write its access time until the next store.
+
+    Parameters:
+    - stub_server: A fixture with the local stub of the API.
+    - tmp_path: A temporary directory for the response cache.
+
+    Returns:
+        None
+    """
+    cache = ResponseCache(path=str(tmp_path / 'responses.sqlite'))
+    threads = []
+
+    class RecordingCache:
+        enabled = True
+
+        def get(self, endpoint, key):
+            threads.append(threading.current_thread())
+            return cache.get(endpoint, key)
+
+        def set(self, endpoint, key, value):
+            threads.append(threading.current_thread())
+            cache.set(endpoint, key, value)
+
+    client = AsyncHttpClient(controller=RateController(rate=0, initial_limit=10))
+    fetch_services = AsyncFetchServices(url=stub_server.url, client=client, cache=RecordingCache())
+    first = fetch_services.fetch_all(fetch_services.fetch_case_details, ['09332202400001'])
+    assert fetch_services.fetch_all(fetch_services.fetch_case_details, ['09332202400001']) == first
+
+    assert threads and all(thread is not AsyncHttpEngine.thread for thread in threads)
+    assert cache.stats()['hits'] >= 1
+    assert cache.accessed
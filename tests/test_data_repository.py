@@ -0,0 +1,533 @@
+import os
+import json
+import fcntl
+import threading
+import pytest
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from app.infraestructura.repositories.base_repository import BaseDataRepository
+from app.infraestructura.repositories.data_repository import DataRepository
+from app.infraestructura.repositories.binary_shard_repository import BinaryShardDataRepository
+from app.infraestructura.repositories import segment_log_repository
+from app.infraestructura.repositories.segment_log_repository import SegmentLogDataRepository, SegmentLogState
+from app.infraestructura.repositories.sharded_json_repository import ShardedJsonDataRepository
+from app.infraestructura.repositories.sqlite_repository import SqliteDataRepository
+from app.infraestructura.repositories.secondary_index import secondary_index
+
+
+def build_records(process_type, total, prefix='0001'):
+    """
+    Builds a list of records with the same shape produced by the scraper.
+
+    Parameters:
+        process_type (str): The type of the records, 'demandado' or 'demandante'.
+        total (int): The number of records to build.
+        prefix (str): Prefix used to build the `idJuicio` of each record.
+
+    Returns:
+        list: A list of records.
+    """
+    return [{
+        'type': process_type,
+        'fechaIngreso': '20/05/2024 10:00',
+        'idJuicio': f'{prefix}-{i}',
+        'details': {'nombreDelito': 'COBRO DE DINERO', 'subProcess': []}
+    } for i in range(total)]
+
+
+def test_segment_log_append_and_read(tmp_path):
+    """
+    Test case to verify that the pages appended for an ID are returned in write order, and that other IDs are not mixed in.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    repository = SegmentLogDataRepository(path=str(tmp_path / 'segments'))
+    first_page = build_records('demandado', 3, 'A')
+    second_page = build_records('demandado', 2, 'B')
+    repository.update_data({'0968599020001': first_page}, '0968599020001')
+    repository.update_data({'1791251237001': build_records('demandante', 1)}, '1791251237001')
+    repository.update_data({'0968599020001': second_page}, '0968599020001')
+
+    assert repository.get_data() == ['0968599020001', '1791251237001']
+    assert repository.get_data_id('0968599020001') == first_page + second_page
+    assert repository.get_data_id('1') is False
+
+
+def test_segment_log_rebuilds_index_and_recovers_torn_write(tmp_path):
+    """
+    Test case to verify that a new process rebuilds the index from disk and drops a line left incomplete by a crash.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'segments')
+    records = build_records('demandante', 2)
+    SegmentLogDataRepository(path=path).update_data({'0992339411001': records}, '0992339411001')
+    with open(os.path.join(path, 'segment-000001.log'), 'ab') as file:
+        file.write(b'{"k":"0992339411001","r":[{"type"')
+
+    SegmentLogDataRepository._states.clear()
+    repository = SegmentLogDataRepository(path=path)
+    assert repository.get_data_id('0992339411001') == records
+
+    repository.update_data({'0992339411001': records}, '0992339411001')
+    SegmentLogDataRepository._states.clear()
+    assert SegmentLogDataRepository(path=path).get_data_id('0992339411001') == records + records
+
+
+def test_segment_log_sees_the_appends_of_other_processes(tmp_path):
+    """
+    Test case to verify that the offset index picks up the lines appended by another process, which has its own
+    index, and that a line that is valid JSON without a key is dropped as a torn write.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'segments')
+    first = SegmentLogDataRepository(path=path)
+    other = SegmentLogDataRepository(path=path)
+    other.state = SegmentLogState()
+    pages = [build_records('demandado', 2, f'P{page}') for page in range(3)]
+
+    first.update_data({'0968599020001': pages[0]}, '0968599020001')
+    assert other.get_data_id('0968599020001') == pages[0]
+    version = other.get_version()
+    first.update_data({'0968599020001': pages[1]}, '0968599020001')
+    other.update_data({'0968599020001': pages[2]}, '0968599020001')
+    assert other.get_version() != version
+    assert other.get_data_id('0968599020001') == pages[0] + pages[1] + pages[2]
+    assert first.get_data_id('0968599020001') == pages[0] + pages[1] + pages[2]
+
+    with open(os.path.join(path, 'segment-000001.log'), 'ab') as file:
+        file.write(b'[1]\n')
+    SegmentLogDataRepository._states.clear()
+    repository = SegmentLogDataRepository(path=path)
+    assert repository.get_data_id('0968599020001') == pages[0] + pages[1] + pages[2]
+    repository.update_data({'1791251237001': pages[0]}, '1791251237001')
+    assert first.get_data() == ['0968599020001', '1791251237001']
+
+
+
+def test_segment_log_first_scan_waits_for_the_append_of_another_process(tmp_path):
+    """
+    Test case to verify that the first scan of a process does not truncate a line that another process, holding the
+    file lock, is still writing: it waits for the lock and then indexes the whole line.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'segments')
+    writer = SegmentLogDataRepository(path=path)
+    records = build_records('demandado', 2, 'P0')
+    writer.update_data({'0968599020001': records}, '0968599020001')
+    line = (json.dumps({'k': '1791251237001', 'r': records}) + '\n').encode('utf-8')
+    reader = SegmentLogDataRepository(path=path)
+    reader.state = SegmentLogState()
+    result = {}
+
+    with open(os.path.join(path, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with open(os.path.join(path, 'segment-000001.log'), 'ab') as file:
+            file.write(line[:10])
+            file.flush()
+            thread = threading.Thread(target=lambda: result.update(keys=reader.get_data()))
+            thread.start()
+            thread.join(0.2)
+            assert thread.is_alive()
+            file.write(line[10:])
+    thread.join(5)
+
+    assert result['keys'] == ['0968599020001', '1791251237001']
+    assert reader.get_data_id('1791251237001') == records
+
+
+def test_segment_log_compaction_is_discarded_after_a_reset_of_another_process(tmp_path, monkeypatch):
+    """
+    Test case to verify that a compaction whose sealed segments were removed by a reset of another process while it
+    was merging them is discarded, instead of bringing the wiped records back or removing the new segments.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+    - monkeypatch: Used to run the reset while the compaction writes its merged segment.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'segments')
+    repository = SegmentLogDataRepository(path=path, max_segment_bytes=1, compaction_threshold=1000)
+    other = SegmentLogDataRepository(path=path, max_segment_bytes=1, compaction_threshold=1000)
+    other.state = SegmentLogState()
+    for page in range(3):
+        repository.update_data({'0968599020001': build_records('demandado', 2, f'P{page}')}, '0968599020001')
+    records = build_records('ofendido', 3, 'N')
+    getpid = os.getpid
+
+    def reset_by_other_process():
+        # Only called to name the merged segment, once the sealed segments were read
+        other.reset_data()
+        other.update_data({'1791251237001': records}, '1791251237001')
+        return getpid()
+
+    monkeypatch.setattr(segment_log_repository.os, 'getpid', reset_by_other_process)
+    repository.compact()
+    monkeypatch.undo()
+
+    assert sorted(os.listdir(path)) == ['.lock', 'segment-000001.log']
+    assert repository.get_data() == ['1791251237001']
+    assert repository.get_data_id('1791251237001') == records
+
+def test_segment_log_compaction_keeps_order(tmp_path):
+    """
+    Test case to verify that compacting the sealed segments keeps every record in write order and removes the merged segments.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'segments')
+    repository = SegmentLogDataRepository(
+        path=path, max_segment_bytes=1, compaction_threshold=1000)
+    expected = []
+    for page in range(5):
+        records = build_records('demandado', 2, f'P{page}')
+        expected.extend(records)
+        repository.update_data({'0968599020001': records}, '0968599020001')
+
+    repository.compact()
+
+    assert repository.get_data_id('0968599020001') == expected
+    assert sorted(os.listdir(path)) == ['.lock', 'segment-000004.log', 'segment-000005.log']
+
+    repository.reset_data()
+    assert repository.get_data() == []
+    assert repository.get_data_id('0968599020001') is False
+
+
+def test_sqlite_round_trip_nested_records(tmp_path):
+    """
+    Test case to verify that the SQLite repository returns the nested `subProcess` and `actuacionesJudiciales`
+    lists unchanged, including the error dicts left by failed fetches and None values, that a page is appended in
+    order, and that opening a connection to an existing database does not wait for the writers.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    repository = SqliteDataRepository(path=str(tmp_path / 'data.sqlite'))
+    records = [{
+        'type': 'demandado',
+        'fechaIngreso': '20/05/2024 10:00',
+        'idJuicio': '09332202400123',
+        'details': {
+            'nombreDelito': 'COBRO DE DINERO',
+            'nombreTipoAccion': 'PROCEDIMIENTO ORDINARIO',
+            'nombreMateria': 'CIVIL',
+            'subProcess': [{
+                'ciudad': 'GUAYAQUIL',
+                'demandantes': ['PÉREZ JUAN'],
+                'demandados': ['EMPRESA S.A.'],
+                'idJudicatura': '09332',
+                'idIncidenteJudicatura': 2931234,
+                'idMovimientoJuicioIncidente': 3154123,
+                'incidente': 'INCIDENTE',
+                'nombreJudicatura': 'UNIDAD JUDICIAL CIVIL',
+                'actuacionesJudiciales': [{
+                    'codigo': 1, 'fecha': '2024-05-20', 'hour': '10:00:00', 'idJudicatura': '09332',
+                    'nombreArchivo': 'RAZON', 'tipo': 'RAZON', 'actividad': 'Texto'
+                }]
+            }]
+        }
+    }, {
+        'type': 'demandado',
+        'fechaIngreso': '21/05/2024 11:00',
+        'idJuicio': '09332202400124',
+        'details': {'nombreDelito': 'DAÑOS', 'nombreMateria': None, 'error': 'Failed to fetch data',
+                    'status_code': 500}
+    }]
+
+    repository.update_data({'0968599020001': records[:1]}, '0968599020001')
+    repository.update_data({'0968599020001': records[1:]}, '0968599020001')
+
+    assert repository.get_data() == ['0968599020001']
+    assert repository.get_data_id('0968599020001') == records
+    assert repository.get_data_id('1') is False
+
+    # A new connection to an existing database does not write, so it opens while another one holds the write lock
+    writer = sqlite3.connect(str(tmp_path / 'data.sqlite'), isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(repository.get_data).result(timeout=5) == ['0968599020001']
+    writer.execute('ROLLBACK')
+    writer.close()
+
+    repository.reset_data()
+    assert repository.get_data() == []
+
+
+def test_binary_shards_round_trip_and_torn_frame(tmp_path):
+    """
+    Test case to verify that the binary shards return every record unchanged, including accents, integers, nulls
+    and booleans, that each ID has its own shard, and that a frame left incomplete by a crash is dropped.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'shards_bin')
+    repository = BinaryShardDataRepository(path=path)
+    first_page = build_records('demandado', 3, 'A')
+    first_page[0]['details']['subProcess'] = [{
+        'ciudad': 'GUAYAQUIL', 'demandantes': ['PÉREZ JUAN'], 'idIncidenteJudicatura': -2931234,
+        'actividad': None, 'activo': True, 'monto': 10.5}]
+    second_page = build_records('demandado', 2, 'B')
+    repository.update_data({'0968599020001': first_page}, '0968599020001')
+    repository.update_data({'1791251237001': build_records('demandante', 1)}, '1791251237001')
+    with open(os.path.join(path, '0968599020001.tdb'), 'ab') as file:
+        file.write(b'\xff\x00\x00\x00\x01garbage')
+    repository.update_data({'0968599020001': second_page}, '0968599020001')
+
+    assert repository.get_data() == ['0968599020001', '1791251237001']
+    assert repository.get_data_id('0968599020001') == first_page + second_page
+    assert repository.get_data_id('1') is False
+
+    repository.reset_data()
+    assert repository.get_data() == []
+
+
+
+def test_json_shards_reset_keeps_the_pages_of_writers_in_flight(tmp_path, monkeypatch):
+    """
+    Test case to verify that a reset that happens while a writer is writing its temporary page keeps that file, so
+    the writer still publishes the page, and that a writer whose shard directory was removed by a reset before it
+    wrote the page creates it again.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+    - monkeypatch: Used to run the resets while the pages are written.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'shards')
+    repository = ShardedJsonDataRepository(path=path)
+    repository.update_data({'0968599020001': build_records('demandado', 1, 'A')}, '0968599020001')
+    write_tmp = repository._write_tmp
+    calls = []
+
+    def reset_after_writing(directory, content):
+        calls.append(directory)
+        tmp_path = write_tmp(directory, content)
+        if len(calls) == 1:
+            repository.reset_data()
+        return tmp_path
+
+    monkeypatch.setattr(repository, '_write_tmp', reset_after_writing)
+    records = build_records('demandado', 2, 'B')
+    repository.update_data({'0968599020001': records}, '0968599020001')
+    assert repository.get_data() == ['0968599020001']
+    assert repository.get_data_id('0968599020001') == records
+
+    def remove_directory_before_writing(directory, content):
+        calls.append(directory)
+        if len(calls) == 1:
+            os.rmdir(directory)
+        return write_tmp(directory, content)
+
+    calls.clear()
+    monkeypatch.setattr(repository, '_write_tmp', remove_directory_before_writing)
+    repository.update_data({'1791251237001': records}, '1791251237001')
+    assert calls[:2] == [os.path.join(path, '1791251237001')] * 2
+    assert repository.get_data_id('1791251237001') == records
+
+def test_json_shards_concurrent_writers(tmp_path):
+    """
+    Test case to verify that concurrent writers of the same and of different IDs do not lose pages, that the IDs
+    are listed from the manifest, and that temporary files are never read as pages.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'shards')
+    repository = ShardedJsonDataRepository(path=path)
+    ids = ['0968599020001', '0992339411001', '1791251237001']
+
+    def write(index):
+        key = ids[index % len(ids)]
+        repository.update_data({key: build_records('demandado', 2, f'W{index}')}, key)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(30)))
+
+    with open(os.path.join(path, '0968599020001', '.tmp-partial'), 'w') as file:
+        file.write('[{"type"')
+
+    assert sorted(repository.get_data()) == ids
+    assert all(len(repository.get_data_id(key)) == 20 for key in ids)
+    with open(os.path.join(path, 'manifest.json')) as file:
+        assert sorted(json.load(file)['ids']) == ids
+
+    repository.reset_data()
+    assert repository.get_data() == []
+    assert repository.get_data_id('0968599020001') is False
+
+
+@pytest.mark.parametrize('build_repository', [
+    lambda path: DataRepository(path=str(path / 'data.json')),
+    lambda path: SegmentLogDataRepository(path=str(path / 'segments'), max_segment_bytes=200,
+                                          compaction_threshold=1000),
+    lambda path: SqliteDataRepository(path=str(path / 'data.sqlite')),
+    lambda path: BinaryShardDataRepository(path=str(path / 'shards_bin')),
+    lambda path: ShardedJsonDataRepository(path=str(path / 'shards')),
+], ids=['json', 'segment_log', 'sqlite', 'binary_shards', 'json_shards'])
+def test_replace_data_by_type(tmp_path, build_repository):
+    """
+    Test case to verify that `replace_data` replaces only the records of the given type in every storage mode, that
+    the counters follow, and that a new repository instance reads the replaced records from disk.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+    - build_repository: Builds the repository of one storage mode.
+
+    Returns:
+        None
+    """
+    repository = build_repository(tmp_path)
+    demandados = build_records('demandado', 3, 'A')
+    demandantes = build_records('demandante', 2, 'B')
+    repository.update_data({'0968599020001': demandados[:2]}, '0968599020001')
+    repository.update_data({'0968599020001': demandantes}, '0968599020001')
+    repository.update_data({'0968599020001': demandados[2:]}, '0968599020001')
+    assert repository.count_data_id('0968599020001')['count_demandado'] == 3
+
+    refreshed = build_records('demandado', 1, 'C')
+    repository.replace_data('0968599020001', refreshed, 'demandado')
+    repository.replace_data('0968599020001', refreshed, 'demandado')
+
+    assert repository.get_data_id('0968599020001') == demandantes + refreshed
+    assert repository.count_data_id('0968599020001') == {
+        'total': 3, 'count_demandante': 2, 'count_demandado': 1}
+    if isinstance(repository, SegmentLogDataRepository):
+        repository.state.loaded = False
+    assert build_repository(tmp_path).get_data_id('0968599020001') == demandantes + refreshed
+
+
+@pytest.mark.parametrize('build_repository', [
+    lambda path: DataRepository(path=str(path / 'data.json')),
+    lambda path: SegmentLogDataRepository(path=str(path / 'segments'), max_segment_bytes=200,
+                                          compaction_threshold=1000),
+    lambda path: SqliteDataRepository(path=str(path / 'data.sqlite')),
+    lambda path: BinaryShardDataRepository(path=str(path / 'shards_bin')),
+    lambda path: ShardedJsonDataRepository(path=str(path / 'shards')),
+], ids=['json', 'segment_log', 'sqlite', 'binary_shards', 'json_shards'])
+def test_iter_data_id_from_seeks_to_each_position(tmp_path, build_repository):
+    """
+    Test case to verify that every storage mode yields the position of each record, that reading from any of those
+    positions starts right at its record, including records with nested subprocesses written in several pages, and
+    that a position of another shape is rejected.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+    - build_repository: Builds the repository of one storage mode.
+
+    Returns:
+        None
+    """
+    repository = build_repository(tmp_path)
+    records = []
+    for page in range(3):
+        records_page = build_records('demandado', 3, f'P{page}')
+        records_page[1]['details']['subProcess'] = [{
+            'ciudad': 'QUITO', 'demandados': [f'PERSONA {page}'],
+            'actuacionesJudiciales': [{'codigo': page, 'tipo': 'RAZON'}, {'codigo': page + 10, 'tipo': 'AUTO'}]
+        }, {'ciudad': 'GUAYAQUIL'}]
+        records.extend(records_page)
+        repository.update_data({'0968599020001': records_page}, '0968599020001')
+    repository.update_data({'1791251237001': build_records('demandante', 2)}, '1791251237001')
+
+    positions = [position for position, _ in repository.iter_data_id_from('0968599020001')]
+    assert len(positions) == len(records)
+    for index, position in enumerate(positions):
+        position = json.loads(json.dumps(position))
+        assert [record for _, record in repository.iter_data_id_from('0968599020001', position)] == records[index:]
+
+    with pytest.raises(ValueError):
+        next(repository.iter_data_id_from('0968599020001', {'offset': 1}))
+
+
+def test_index_reads_do_not_take_the_write_lock(tmp_path):
+    """
+    Test case to verify that once a search ID is indexed, the counters, the partitions and the index queries are
+    answered while another thread holds the write lock of the repository, and that a write is still seen by the
+    next read.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    repository = SqliteDataRepository(str(tmp_path / 'data.sqlite'))
+    repository.update_data({'0968599020001': build_records('demandado', 3)}, '0968599020001')
+    assert repository.count_data_id('0968599020001')['total'] == 3
+    secondary_index.query(repository, {'materia': 'PENAL'})
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with repository.write_lock:
+            counts = executor.submit(repository.count_data_id, '0968599020001').result(timeout=5)
+            partitions = executor.submit(repository.get_partitions_id, '0968599020001').result(timeout=5)
+            executor.submit(secondary_index.query, repository, {'materia': 'PENAL'}).result(timeout=5)
+
+    assert counts['count_demandado'] == 3
+    assert partitions['demandado'] == [0, 1, 2]
+    repository.update_data({'0968599020001': build_records('demandante', 1)}, '0968599020001')
+    assert repository.count_data_id('0968599020001')['count_demandante'] == 1
+
+
+def test_index_drops_its_state_after_a_write_of_another_process(tmp_path, monkeypatch):
+    """
+    Test case to verify that a write of this process does not stamp an index state that missed the writes of
+    another process to the same database: the state is rebuilt, so the records of both are counted and get their
+    positions in write order.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+    - monkeypatch: Used to write without notifying the listeners, as another process does.
+
+    Returns:
+        None
+    """
+    repository = SqliteDataRepository(str(tmp_path / 'data.sqlite'))
+    other = SqliteDataRepository(str(tmp_path / 'data.sqlite'))
+    repository.update_data({'0968599020001': build_records('demandado', 3)}, '0968599020001')
+    assert repository.count_data_id('0968599020001')['total'] == 3
+
+    with monkeypatch.context() as patch:
+        patch.setattr(BaseDataRepository, 'listeners', [])
+        other.update_data({'0968599020001': build_records('demandante', 2)}, '0968599020001')
+    repository.update_data({'0968599020001': build_records('demandado', 1, '0002')}, '0968599020001')
+
+    counts = repository.count_data_id('0968599020001')
+    assert (counts['total'], counts['count_demandado'], counts['count_demandante']) == (6, 4, 2)
+    assert repository.get_partitions_id('0968599020001') == {'demandado': [0, 1, 2, 5], 'demandante': [3, 4]}
@@ -1,5 +1,8 @@
+import json
 import pytest
 from app import create_app
+from app.application.services import data_service
+from app.infraestructura.repositories.segment_log_repository import SegmentLogDataRepository
 
 
 @pytest.fixture
@@ -33,6 +36,33 @@ def create_token(client):
     return response.get_json()['token']
 
 
+@pytest.fixture
+def data_repository(tmp_path, monkeypatch):
+    """
+    Fixture that points the data service to a temporary repository with two demandados and one demandante
+    stored for the ID 0968599020001.
+
+    Parameters:
+        tmp_path: The pytest temporary directory fixture.
+        monkeypatch: The pytest monkeypatch fixture.
+
+    Returns:
+        SegmentLogDataRepository: The temporary repository.
+    """
+    repository = SegmentLogDataRepository(path=str(tmp_path / 'segments'))
+    records = [
+        {'type': 'demandado', 'fechaIngreso': '20/05/2024 10:00', 'idJuicio': '09332202400123',
+         'details': {'nombreDelito': 'COBRO DE DINERO', 'nombreMateria': 'CIVIL', 'subProcess': []}},
+        {'type': 'demandante', 'fechaIngreso': '21/05/2024 11:00', 'idJuicio': '09332202400124',
+         'details': {'nombreDelito': 'DAÑOS', 'nombreMateria': 'PENAL', 'subProcess': []}},
+        {'type': 'demandado', 'fechaIngreso': '22/05/2024 12:00', 'idJuicio': '09332202400125',
+         'details': {'nombreDelito': 'ESTAFA', 'nombreMateria': 'PENAL', 'subProcess': []}},
+    ]
+    repository.update_data({'0968599020001': records}, '0968599020001')
+    monkeypatch.setattr(data_service, 'get_data_repository', lambda: repository)
+    return repository
+
+
 def test_get_data_without_token(client):
     """
     Test case to verify the behavior of the API when accessed without a token.
@@ -97,3 +127,214 @@ def test_get_data_with_invalid_id(client, create_token):
 
     assert response.status_code == 404
     assert response.get_json()['msg'] == 'ID not found'
+
+
+def test_get_data_stream_ndjson(client, create_token, data_repository):
+    """
+    Test case to verify the streaming mode of the `/api/data/<id>` endpoint.
+
+    This test case checks that `?stream=1` returns a NDJSON body whose first line is the header record with the
+    counters and whose following lines are the cases, and that an unknown ID still returns 404.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - create_token: A fixture that creates a token for testing the API authentication.
+    - data_repository: A fixture with a temporary repository.
+
+    Returns:
+        None
+    """
+    headers = {
+        'Authorization': f'Bearer {create_token}'
+    }
+    response = client.get('/api/data/0968599020001?stream=1', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {'id': '0968599020001', 'total': 3, 'count_demandados': 2, 'count_demandante': 1}
+    assert [line['idJuicio'] for line in lines[1:]] == ['09332202400123', '09332202400124', '09332202400125']
+
+    headers['Accept'] = 'application/x-ndjson'
+    response = client.get('/api/data/1', headers=headers)
+    assert response.status_code == 404
+
+
+def test_get_data_pagination_projection_and_summary(client, create_token, data_repository):
+    """
+    Test case to verify the `limit`, `cursor`, `fields` and `summary` query parameters of the `/api/data/<id>` endpoint.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - create_token: A fixture that creates a token for testing the API authentication.
+    - data_repository: A fixture with a temporary repository.
+
+    Returns:
+        None
+    """
+    headers = {
+        'Authorization': f'Bearer {create_token}'
+    }
+    response = client.get(
+        '/api/data/0968599020001?limit=2&fields=idJuicio,details.nombreMateria', headers=headers)
+    first_page = response.get_json()
+    assert response.status_code == 200
+    assert first_page['total'] == 3
+    assert first_page['data'] == [
+        {'idJuicio': '09332202400123', 'details': {'nombreMateria': 'CIVIL'}},
+        {'idJuicio': '09332202400124', 'details': {'nombreMateria': 'PENAL'}},
+    ]
+
+    response = client.get(
+        f"/api/data/0968599020001?limit=2&fields=idJuicio&cursor={first_page['next_cursor']}", headers=headers)
+    assert response.get_json()['data'] == [{'idJuicio': '09332202400125'}]
+    assert response.get_json()['next_cursor'] is None
+
+    response = client.get('/api/data/0968599020001?summary=1', headers=headers)
+    assert response.get_json() == {
+        'id': '0968599020001', 'total': 3, 'count_demandados': 2, 'count_demandante': 1}
+
+    response = client.get('/api/data/0968599020001?cursor=invalid', headers=headers)
+    assert response.status_code == 400
+
+
+def test_get_data_stats_follow_writes(client, create_token, data_repository):
+    """
+    Test case to verify that the `/api/data/<id>/stats` endpoint returns the counters of the ID and that they are
+    updated by new writes, and that the full response is split with the same counters.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - create_token: A fixture that creates a token for testing the API authentication.
+    - data_repository: A fixture with a temporary repository.
+
+    Returns:
+        None
+    """
+    headers = {
+        'Authorization': f'Bearer {create_token}'
+    }
+    response = client.get('/api/data/0968599020001/stats', headers=headers)
+    assert response.get_json() == {
+        'id': '0968599020001', 'total': 3, 'count_demandados': 2, 'count_demandante': 1}
+
+    data_repository.update_data({'0968599020001': [{'type': 'demandante', 'idJuicio': '09332202400126'}]},
+                                '0968599020001')
+    response = client.get('/api/data/0968599020001/stats', headers=headers)
+    assert response.get_json()['count_demandante'] == 2
+
+    response = client.get('/api/data/0968599020001', headers=headers).get_json()
+    assert [item['idJuicio'] for item in response['data_demandantes']] == ['09332202400124', '09332202400126']
+    assert response['count_demandados'] == 2
+
+    response = client.get('/api/data/1/stats', headers=headers)
+    assert response.status_code == 404
+
+
+def test_query_data_by_indexed_fields(client, create_token, data_repository):
+    """
+    Test case to verify the `/api/data/query` endpoint with the subject and entry date filters, and that a query
+    without filters is rejected.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - create_token: A fixture that creates a token for testing the API authentication.
+    - data_repository: A fixture with a temporary repository.
+
+    Returns:
+        None
+    """
+    headers = {
+        'Authorization': f'Bearer {create_token}'
+    }
+    response = client.get('/api/data/query?materia=penal&fields=idJuicio', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['data'] == [
+        {'id': '0968599020001', 'idJuicio': '09332202400124'},
+        {'id': '0968599020001', 'idJuicio': '09332202400125'},
+    ]
+
+    response = client.get('/api/data/query?desde=2024-05-21&hasta=21/05/2024&fields=idJuicio', headers=headers)
+    assert response.get_json()['total'] == 1
+    assert response.get_json()['data'][0]['idJuicio'] == '09332202400124'
+
+    data_repository.update_data({'0992339411001': [{
+        'type': 'demandante', 'fechaIngreso': '23/05/2024 09:00', 'idJuicio': '09332202400200',
+        'details': {'nombreMateria': 'PENAL', 'subProcess': []}}]}, '0992339411001')
+    response = client.get('/api/data/query?materia=PENAL&desde=22/05/2024&fields=idJuicio', headers=headers)
+    assert response.get_json()['data'] == [
+        {'id': '0968599020001', 'idJuicio': '09332202400125'},
+        {'id': '0992339411001', 'idJuicio': '09332202400200'},
+    ]
+
+    response = client.get('/api/data/query', headers=headers)
+    assert response.status_code == 400
+
+
+def test_query_data_reads_each_id_up_to_the_last_match(client, create_token, data_repository, monkeypatch):
+    """
+    Test case to verify that the `/api/data/query` endpoint stops reading the records of an ID once it reaches the
+    last position of the page, instead of reading every record of the ID.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - create_token: A fixture that creates a token for testing the API authentication.
+    - data_repository: A fixture with a temporary repository.
+    - monkeypatch: Used to count the records read from the repository.
+
+    Returns:
+        None
+    """
+    headers = {
+        'Authorization': f'Bearer {create_token}'
+    }
+    assert client.get('/api/data/query?materia=civil', headers=headers).get_json()['total'] == 1
+    iter_data_id = data_repository.iter_data_id
+    read = []
+
+    def counting_iter_data_id(id):
+        for record in iter_data_id(id):
+            read.append(record)
+            yield record
+
+    monkeypatch.setattr(data_repository, 'iter_data_id', counting_iter_data_id)
+    response = client.get('/api/data/query?materia=civil&fields=idJuicio', headers=headers)
+
+    assert response.get_json()['data'] == [{'id': '0968599020001', 'idJuicio': '09332202400123'}]
+    assert len(read) == 1
+
+
+def test_search_data_by_litigant_name(client, create_token, data_repository):
+    """
+    Test case to verify the `/api/data/search` endpoint: accents and case are ignored, the last word matches as a
+    prefix, the search can be limited to some fields, and new writes are searchable.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - create_token: A fixture that creates a token for testing the API authentication.
+    - data_repository: A fixture with a temporary repository.
+
+    Returns:
+        None
+    """
+    headers = {
+        'Authorization': f'Bearer {create_token}'
+    }
+    data_repository.update_data({'0992339411001': [{
+        'type': 'demandante', 'fechaIngreso': '23/05/2024 09:00', 'idJuicio': '09332202400200',
+        'details': {'nombreDelito': 'COBRO DE DINERO', 'subProcess': [{
+            'demandantes': ['PÉREZ NÚÑEZ JOSÉ'], 'demandados': ['EMPRESA S.A.'],
+            'actuacionesJudiciales': [{'tipo': 'PROVIDENCIA GENERAL'}]}]}}]}, '0992339411001')
+
+    response = client.get('/api/data/search?q=perez jos&fields=idJuicio', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['data'] == [{'id': '0992339411001', 'idJuicio': '09332202400200'}]
+
+    response = client.get('/api/data/search?q=cobro&fields=idJuicio', headers=headers)
+    assert response.get_json()['total'] == 2
+
+    response = client.get('/api/data/search?q=providencia&in=litigante', headers=headers)
+    assert response.get_json()['total'] == 0
+
+    response = client.get('/api/data/search?q=', headers=headers)
+    assert response.status_code == 400
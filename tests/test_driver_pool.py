@@ -0,0 +1,92 @@
+from app.infraestructura.drivers.driver_pool import DriverPool
+import threading
+import pytest
+
+
+class FakeDriver:
+    """
+    Stand-in of a WebDriver that records its commands and can be made to stop responding.
+    """
+
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+        self.pages = []
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise ConnectionError('chromedriver is not running')
+        return 1
+
+    def get(self, url):
+        self.pages.append(url)
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_driver_pool_reuses_and_recycles_browsers():
+    """
+    Test case to verify that the pool gives a browser back to the next search, replaces the ones that fail the
+    health check, reached `max_uses` or were used by a failed search, and can start browsers ahead of time.
+
+    Returns:
+        None
+    """
+    created = []
+
+    def factory():
+        created.append(FakeDriver())
+        return created[-1]
+
+    pool = DriverPool(size=2, factory=factory, max_uses=2, max_memory_mb=0)
+    pool.prewarm(1, background=False)
+    assert len(created) == 1
+
+    with pool.driver() as driver:
+        assert driver is created[0]
+    assert driver.pages == ['about:blank']
+    with pool.driver() as driver:
+        assert driver is created[0]
+    assert created[0].quit_called
+
+    with pool.driver() as driver:
+        assert driver is created[1]
+    created[1].alive = False
+    with pool.driver() as driver:
+        assert driver is created[2]
+    assert created[1].quit_called
+
+    with pytest.raises(ValueError):
+        with pool.driver():
+            raise ValueError('search failed')
+    assert created[2].quit_called
+
+    assert pool.stats() == {'size': 2, 'open': 0, 'idle': 0, 'in_use': 0, 'created': 3, 'reused': 3,
+                            'recycled': 2, 'health_failures': 1, 'waits': 0}
+
+
+def test_driver_pool_is_bounded():
+    """
+    Test case to verify that concurrent searches get their own browser, that a search waits for a browser when the
+    pool is full, and that it gets the one given back.
+
+    Returns:
+        None
+    """
+    pool = DriverPool(size=2, factory=FakeDriver, max_uses=0, max_memory_mb=0)
+    first = pool.checkout()
+    second = pool.checkout()
+    assert first is not second
+    with pytest.raises(TimeoutError):
+        pool.checkout(timeout=0.05)
+
+    waiting = []
+    thread = threading.Thread(target=lambda: waiting.append(pool.checkout(timeout=5)))
+    thread.start()
+    pool.checkin(first)
+    thread.join()
+
+    assert waiting == [first]
+    assert pool.stats()['open'] == 2
+    assert pool.stats()['waits'] == 2
@@ -0,0 +1,67 @@
+from app.infraestructura.drivers.http_session import HttpSession
+from app.infraestructura.drivers.rate_controller import RateController
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def do_GET(self):
+        KeepAliveHandler.connections.add(self.client_address)
+        body = b'[]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """
+    Fixture that starts a local HTTP/1.1 server with keep-alive and closes the shared session afterwards.
+
+    Returns:
+        str: The base URL of the server.
+    """
+    KeepAliveHandler.connections = set()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    HttpSession.close()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    HttpSession.close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_http_session_reuses_connections(server, monkeypatch):
+    """
+    Test case to verify that concurrent requests through `HttpSession` reuse the pooled keep-alive connections and
+    never open more connections than the pool size.
+
+    Parameters:
+    - server: A fixture with the URL of a local keep-alive server.
+    - monkeypatch: Used to disable the pacing of the rate controller.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        statuses = list(executor.map(
+            lambda i: HttpSession.get(f'{server}/{i}').status_code, range(200)))
+
+    assert statuses == [200] * 200
+    stats = HttpSession.stats()
+    assert stats['requests'] == 200
+    assert stats['errors'] == 0
+    assert 0 < stats['connections'] <= stats['pool_maxsize']
+    assert len(KeepAliveHandler.connections) == stats['connections']
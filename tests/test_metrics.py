@@ -0,0 +1,117 @@
+from app import create_app
+from app.infraestructura.drivers.http_session import HttpSession
+from app.infraestructura.drivers.rate_controller import RateController
+from app.infraestructura.metrics.registry import MetricsRegistry
+from app.infraestructura.metrics.upstream import upstream_metrics, endpoint_name
+from tests.stub_server import StubServer, CASE_PATH
+import pytest
+
+
+@pytest.fixture
+def client():
+    """
+    Fixture that creates a Flask test client for testing the application.
+
+    Returns:
+        FlaskClient: A Flask test client for testing the application.
+    """
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_registry_renders_prometheus_text():
+    """
+    Test case to verify that counters, gauges and histograms are rendered in the Prometheus text exposition format,
+    with cumulative buckets and escaped label values.
+
+    Returns:
+        None
+    """
+    registry = MetricsRegistry()
+    responses = registry.counter('responses_total', 'Responses by status', ('endpoint', 'status'))
+    in_flight = registry.gauge('in_flight', 'Calls in flight')
+    duration = registry.histogram('duration_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1))
+    responses.inc(endpoint='getInformacionJuicio', status=200)
+    responses.inc(2, endpoint='say "hi"', status=503)
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.5, 3):
+        duration.observe(value, endpoint='buscarCausas')
+
+    assert registry.counter('responses_total', 'Responses by status', ('endpoint', 'status')) is responses
+    assert registry.render().splitlines() == [
+        '# HELP duration_seconds Latency',
+        '# TYPE duration_seconds histogram',
+        'duration_seconds_bucket{endpoint="buscarCausas",le="0.1"} 1',
+        'duration_seconds_bucket{endpoint="buscarCausas",le="1"} 2',
+        'duration_seconds_bucket{endpoint="buscarCausas",le="+Inf"} 3',
+        'duration_seconds_sum{endpoint="buscarCausas"} 3.55',
+        'duration_seconds_count{endpoint="buscarCausas"} 3',
+        '# HELP in_flight Calls in flight',
+        '# TYPE in_flight gauge',
+        'in_flight 1',
+        '# HELP responses_total Responses by status',
+        '# TYPE responses_total counter',
+        'responses_total{endpoint="getInformacionJuicio",status="200"} 1',
+        'responses_total{endpoint="say \\"hi\\"",status="503"} 2',
+    ]
+
+
+def test_upstream_attempts_are_recorded_by_endpoint(monkeypatch):
+    """
+    Test case to verify that every attempt of an API call is recorded under the name of its endpoint, without the
+    case ID, with its status code, its bytes and the retries of the failed attempts.
+
+    Parameters:
+    - monkeypatch: Used to replace the rate controller with one without pacing and with short retry delays.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, base_delay=0.001, max_retries=2))
+    server = StubServer(error_rate=1).start()
+    url = f'{server.url}{CASE_PATH}09332202400123'
+    endpoint = endpoint_name(url)
+    before = {status: upstream_metrics.responses.get(endpoint=endpoint, status=status) for status in (200, 503)}
+    retries = upstream_metrics.retries.get(endpoint=endpoint)
+    count = upstream_metrics.duration.get(endpoint=endpoint)['count']
+    try:
+        assert HttpSession.get(url).status_code == 503
+        server.error_rate = 0
+        response = HttpSession.get(url)
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    assert endpoint == 'getInformacionJuicio'
+    assert upstream_metrics.responses.get(endpoint=endpoint, status=503) - before[503] == 3
+    assert upstream_metrics.responses.get(endpoint=endpoint, status=200) - before[200] == 1
+    assert upstream_metrics.retries.get(endpoint=endpoint) - retries == 2
+    assert upstream_metrics.duration.get(endpoint=endpoint)['count'] - count == 4
+    assert upstream_metrics.bytes.get(endpoint=endpoint) >= len(response.content)
+    assert upstream_metrics.in_flight.get(endpoint=endpoint) == 0
+
+
+def test_metrics_endpoint(client):
+    """
+    Test case to verify that `GET /api/metrics` requires a token and returns the metrics in the Prometheus text format.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+
+    Returns:
+        None
+    """
+    assert client.get('/api/metrics').status_code == 401
+
+    token = client.post('/api/login', json={'username': 'tusdatos', 'password': '123456'}).get_json()['token']
+    response = client.get('/api/metrics', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE upstream_request_duration_seconds histogram' in body
+    assert '# TYPE scraper_phase_duration_seconds histogram' in body
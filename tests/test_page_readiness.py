@@ -0,0 +1,89 @@
+from app.infraestructura.drivers.page_readiness import (PageReadiness, NetworkIdle, PAGINATOR_LABEL, results_loaded,
+                                                        text_changed)
+from selenium.common.exceptions import NoSuchElementException
+import json
+
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeDriver:
+    """
+    Stand-in of a WebDriver with the elements of the search page by CSS selector and a queue of performance log
+    entries, returned by the next calls to `get_log`.
+    """
+
+    def __init__(self, elements=None, logs=None):
+        self.elements = elements or {}
+        self.logs = logs or []
+
+    def find_element(self, by, selector):
+        if not self.elements.get(selector):
+            raise NoSuchElementException(selector)
+        return self.elements[selector][0]
+
+    def find_elements(self, by, selector):
+        return self.elements.get(selector, [])
+
+    def get_log(self, log_type):
+        return self.logs.pop(0) if self.logs else []
+
+
+def network_event(method, request_id, request_type='XHR'):
+    message = {'message': {'method': method, 'params': {'requestId': request_id, 'type': request_type}}}
+    return {'message': json.dumps(message)}
+
+
+def test_network_idle_waits_for_pending_requests():
+    """
+    Test case to verify that `NetworkIdle` ignores the requests logged before it was created and is only true once
+    every request sent after it has finished or failed, not counting WebSockets.
+
+    Returns:
+        None
+    """
+    driver = FakeDriver(logs=[
+        [network_event('Network.requestWillBeSent', 'old')],
+        [network_event('Network.requestWillBeSent', '1'), network_event('Network.requestWillBeSent', '2'),
+         network_event('Network.requestWillBeSent', 'ws', 'WebSocket')],
+        [network_event('Network.loadingFinished', '1')],
+        [network_event('Network.loadingFailed', '2')],
+    ])
+    idle = NetworkIdle(driver, idle_time=0)
+
+    assert not idle(driver)
+    assert not idle(driver)
+    assert idle(driver)
+    assert idle.available
+
+
+def test_page_readiness_reports_time_saved():
+    """
+    Test case to verify that `PageReadiness` returns as soon as the page is ready, stops at the ceiling when it is
+    not, and reports the time saved compared to the fixed sleeps it replaces.
+
+    Parameters:
+    - results_loaded: Ready once the results count and, with results, the paginator and cases are rendered.
+    - text_changed: Ready once the paginator label changes.
+
+    Returns:
+        None
+    """
+    driver = FakeDriver({'.cantidadMovimiento': [FakeElement('Resultados: 12')],
+                         '.mat-mdc-paginator-range-label': [FakeElement('Página 1 de 2')],
+                         '.causa-individual': [FakeElement('')]})
+    readiness = PageReadiness(driver, timeouts={'next_page': 0.3}, idle_time=0)
+
+    assert readiness.wait('results', results_loaded, readiness.network_idle(), replaces=3) == 12
+    assert readiness.wait('next_page', text_changed(PAGINATOR_LABEL, 'Página 1 de 2'), replaces=1) is False
+
+    stats = readiness.stats(pages=2)
+    assert stats['waits'] == 2
+    assert stats['timed_out'] == 1
+    assert 0.3 <= stats['waited_seconds'] < 1
+    assert stats['replaced_seconds'] == 4
+    assert stats['saved_per_page'] == round((4 - readiness.waited) / 2, 3)
+    assert results_loaded(FakeDriver({'.cantidadMovimiento': [FakeElement('Resultados: 0')]})) is True
+    assert results_loaded(FakeDriver({'.cantidadMovimiento': [FakeElement('Resultados: 3')]})) is False
@@ -0,0 +1,107 @@
+from app.infraestructura.drivers.rate_controller import RateController, RETRY_BUDGET_MIN
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+def test_rate_controller_retries_and_backs_off():
+    """
+    Test case to verify that a 503 response is retried with backoff until it succeeds, and that the failure
+    decreases the concurrency limit.
+
+    Returns:
+        None
+    """
+    controller = RateController(rate=0, initial_limit=10, base_delay=0.01)
+    statuses = iter([503, 429, 200])
+
+    response = controller.call(lambda: FakeResponse(next(statuses)))
+
+    assert response.status_code == 200
+    stats = controller.stats()
+    assert stats['retries'] == 2
+    assert stats['failures'] == 2
+    assert stats['decreases'] >= 1
+    assert stats['limit'] < 10
+
+
+def test_rate_controller_limits_concurrency_and_grows_when_healthy():
+    """
+    Test case to verify that the calls in flight never go over the adaptive limit and that the limit grows while the
+    upstream stays healthy.
+
+    Returns:
+        None
+    """
+    controller = RateController(rate=0, initial_limit=2, max_limit=6)
+    lock = threading.Lock()
+    current = {'in_flight': 0, 'max': 0}
+
+    def send():
+        with lock:
+            current['in_flight'] += 1
+            current['max'] = max(current['max'], current['in_flight'])
+        time.sleep(0.005)
+        with lock:
+            current['in_flight'] -= 1
+        return FakeResponse(200)
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        list(executor.map(lambda _: controller.call(send), range(200)))
+
+    assert current['max'] <= 6
+    assert controller.stats()['limit'] == 6
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_rate_controller_retry_budget():
+    """
+    Test case to verify that when the upstream keeps failing, the retries are capped by the retry budget instead of
+    multiplying the calls.
+
+    Returns:
+        None
+    """
+    controller = RateController(rate=0, base_delay=0, max_retries=3, retry_budget_ratio=0.1)
+
+    responses = [controller.call(lambda: FakeResponse(500)) for _ in range(50)]
+
+    assert all(response.status_code == 500 for response in responses)
+    stats = controller.stats()
+    assert stats['retries'] <= RETRY_BUDGET_MIN + 0.1 * 50
+    assert stats['retries_denied'] > 0
+
+
+def test_rate_controller_does_not_back_off_for_the_connection_pool():
+    """
+    Test case to verify that the wait for a connection of a pool smaller than the concurrency limit is not taken as
+    upstream latency: against an upstream with a constant latency the limit never decreases.
+
+    Returns:
+        None
+    """
+    controller = RateController(rate=0, initial_limit=10, max_limit=20)
+    pool = threading.BoundedSemaphore(2)
+
+    def request():
+        attempts = []
+
+        def send():
+            with pool:
+                attempts.append(time.monotonic())
+                time.sleep(0.01)
+                return FakeResponse(200)
+        return controller.call(send, attempts=attempts)
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        list(executor.map(lambda _: request(), range(200)))
+
+    stats = controller.stats()
+    assert (stats['failures'], stats['decreases']) == (0, 0)
+    assert stats['limit'] > 10
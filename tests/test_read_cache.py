@@ -0,0 +1,72 @@
+from app.infraestructura.cache.read_cache import ReadCache, read_cache, estimate_size
+from app.infraestructura.repositories.data_repository import DataRepository
+from app.infraestructura.repositories.segment_log_repository import SegmentLogDataRepository, SegmentLogState
+
+
+def test_read_cache_versions_and_lru_budget():
+    """
+    Test case to verify that the read cache never returns an entry built from another dataset version and that
+    it evicts the least recently used entries once the memory budget is exceeded.
+
+    Returns:
+        None
+    """
+    value = ['0968599020001', '0992339411001']
+    cache = ReadCache(max_bytes=estimate_size(value) * 2)
+    cache.set(('repo', 'a'), 1, value)
+    assert cache.get(('repo', 'a'), 1) == value
+    assert cache.get(('repo', 'a'), 2) is None
+
+    cache.set(('repo', 'b'), 1, list(value))
+    cache.get(('repo', 'a'), 1)
+    cache.set(('repo', 'c'), 1, list(value))
+
+    assert cache.get(('repo', 'b'), 1) is None
+    assert cache.get(('repo', 'a'), 1) == value
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+def test_repository_write_invalidates_cached_reads(tmp_path):
+    """
+    Test case to verify that a reset through the repository drops the cached reads of that repository.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    repository = DataRepository(path=str(tmp_path / 'data.json'))
+    repository.update_data({'0968599020001': [{'type': 'demandado'}]}, '0968599020001')
+    assert repository.get_data_id('0968599020001') == [{'type': 'demandado'}]
+    assert read_cache.get((repository.location, 'dataset'), repository.get_version()) is not None
+
+    repository.reset_data()
+    assert read_cache.get((repository.location, 'dataset'), repository.get_version()) is None
+    assert repository.get_data() == []
+
+
+def test_segment_log_version_follows_other_processes(tmp_path):
+    """
+    Test case to verify that the version of a segment log changes when another process, with its own in-memory
+    state, appends to it, so the reads cached with the previous version are not returned.
+
+    Parameters:
+    - tmp_path: The pytest temporary directory fixture.
+
+    Returns:
+        None
+    """
+    path = str(tmp_path / 'segments')
+    repository = SegmentLogDataRepository(path=path)
+    other = SegmentLogDataRepository(path=path)
+    other.state = SegmentLogState()
+    repository.update_data({'0968599020001': [{'type': 'demandado'}]}, '0968599020001')
+    version = repository.get_version()
+    read_cache.set((repository.location, 'page'), version, ['cached'])
+
+    other.update_data({'0968599020001': [{'type': 'demandante'}]}, '0968599020001')
+
+    assert repository.get_version() != version
+    assert read_cache.get((repository.location, 'page'), repository.get_version()) is None
+    assert repository.count_data_id('0968599020001')['total'] == 2
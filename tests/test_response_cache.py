@@ -0,0 +1,110 @@
+from app.application.services.fetch_service import FetchServices
+from app.infraestructura.cache.response_cache import ResponseCache
+from app.infraestructura.drivers.http_session import HttpSession
+from tests.stub_server import StubServer
+import time
+
+
+def test_response_cache_ttl_and_lru_eviction(tmp_path):
+    """
+    Test case to verify that `ResponseCache` expires entries after the TTL and evicts the least recently used ones
+    when the stored bytes go over the budget, counting hits and misses.
+
+    Parameters:
+    - tmp_path: A temporary directory for the cache database.
+
+    Returns:
+        None
+    """
+    cache = ResponseCache(path=str(tmp_path / 'responses.sqlite'), ttl=60, max_bytes=300)
+    cache.set('getInformacionJuicio', 'a', [{'value': 'a' * 80}])
+    cache.set('getInformacionJuicio', 'b', [{'value': 'b' * 80}])
+    time.sleep(0.01)
+    assert cache.get('getInformacionJuicio', 'a') == [{'value': 'a' * 80}]
+    cache.set('getInformacionJuicio', 'c', [{'value': 'c' * 80}])
+    cache.set('getInformacionJuicio', 'd', [{'value': 'd' * 80}])
+
+    assert cache.get('getInformacionJuicio', 'b') is None
+    assert cache.get('getInformacionJuicio', 'a') is not None
+    assert cache.get('getIncidenteJudicatura', 'a') is None
+    stats = cache.stats()
+    assert stats['entries'] == 3
+    assert stats['bytes'] <= 300
+    assert (stats['hits'], stats['misses']) == (2, 2)
+
+    expired = ResponseCache(path=str(tmp_path / 'expired.sqlite'), ttl=0)
+    expired.set('getInformacionJuicio', 'a', [])
+    assert expired.get('getInformacionJuicio', 'a') is None
+    assert expired.stats()['entries'] == 0
+
+
+def test_fetch_services_reads_repeated_cases_from_cache(tmp_path):
+    """
+    Test case to verify that a second fetch of the same cases is answered from the response cache without calling
+    the API, with the same result.
+
+    Parameters:
+    - tmp_path: A temporary directory for the cache database.
+
+    Returns:
+        None
+    """
+    server = StubServer().start()
+    try:
+        cache = ResponseCache(path=str(tmp_path / 'responses.sqlite'))
+        fetch_services = FetchServices(url=server.url, cache=cache)
+        first = [fetch_services.fetch_case_details(case_id) for case_id in ('1', '2', '3')]
+        assert server.requests == 6
+
+        second = [FetchServices(url=server.url, cache=cache).fetch_case_details(case_id)
+                  for case_id in ('1', '2', '3')]
+        assert second == first
+        assert server.requests == 6
+        assert cache.stats()['hits'] == 6
+    finally:
+        HttpSession.close()
+        server.stop()
+
+
+class FakeResponse:
+    """
+    Stands for a `requests` response with a 200 status code and the given JSON body.
+    """
+
+    def __init__(self, body):
+        self.status_code = 200
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def test_fetch_services_do_not_cache_invalid_bodies(tmp_path, monkeypatch):
+    """
+    Test case to verify that an empty or error body answered with a 200 status code is reported as an error and
+    not stored in the response cache, so the next fetch calls the API again, while a valid body is cached.
+
+    Parameters:
+    - tmp_path: A temporary directory for the cache database.
+    - monkeypatch: Used to answer the requests of the HTTP session with the given bodies.
+
+    Returns:
+        None
+    """
+    bodies = [[], {'error': 'Internal'}, [{'nombreTipoAccion': 'COBRO', 'nombreMateria': 'CIVIL'}]]
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        return FakeResponse(bodies[len(calls) - 1])
+
+    monkeypatch.setattr(HttpSession, 'get', get)
+    cache = ResponseCache(path=str(tmp_path / 'responses.sqlite'))
+    fetch_services = FetchServices(url='http://api', cache=cache)
+
+    assert 'error' in fetch_services.fetch_case_info('1')
+    assert 'error' in fetch_services.fetch_case_info('1')
+    assert fetch_services.fetch_case_info('1') == {'nombreTipoAccion': 'COBRO', 'nombreMateria': 'CIVIL'}
+    assert fetch_services.fetch_case_info('1') == {'nombreTipoAccion': 'COBRO', 'nombreMateria': 'CIVIL'}
+    assert len(calls) == 3
+    assert cache.stats()['entries'] == 1
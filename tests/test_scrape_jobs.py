@@ -0,0 +1,207 @@
+from app import create_app
+from app.application.services import scraper_service
+from app.application.services.job_service import ScrapeJobs
+from app.application.services.scraper_service import ScraperService
+from app.application.services.fetch_service import FetchServices
+from app.distribution.web.server.routes import scraper as scraper_routes
+from app.infraestructura.cache.response_cache import ResponseCache
+from app.infraestructura.drivers.http_session import HttpSession
+from app.infraestructura.drivers.rate_controller import RateController
+from app.infraestructura.repositories.data_repository import DataRepository
+from app.infraestructura.repositories.checkpoint_repository import CheckpointRepository
+from tests.stub_server import StubServer
+import pytest
+import time
+
+
+@pytest.fixture
+def client():
+    """
+    Fixture that creates a Flask test client for testing the application.
+
+    Returns:
+        FlaskClient: A Flask test client for testing the application.
+    """
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    """
+    Fixture that logs in and returns the headers with the Bearer token.
+
+    Returns:
+        dict: The `Authorization` header.
+    """
+    response = client.post('/api/login', json={'username': 'tusdatos', 'password': '123456'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def stub_jobs(monkeypatch, tmp_path):
+    """
+    Fixture that returns a factory of `ScrapeJobs` whose scraper lists and fetches the cases of two searches from a
+    stub server in the 'http' search mode.
+
+    Returns:
+        callable: Creates the `ScrapeJobs` for a `StubServer` started with the given options.
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    servers = []
+
+    def create(**options):
+        server = StubServer(**options).start()
+        servers.append(server)
+
+        def service_factory():
+            service = ScraperService()
+            service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+            service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+            service.checkpoints = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+            service.arr_process_search = [{'type': 'demandado', 'id': '1791251237001'},
+                                          {'type': 'ofendido', 'id': '0968599020001'}]
+            return service
+        return ScrapeJobs(service_factory=service_factory)
+
+    yield create
+    HttpSession.close()
+    for server in servers:
+        server.stop()
+
+
+def wait_for(jobs, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not jobs.get(job_id).done:
+        assert time.monotonic() < deadline, 'The scrape job did not finish'
+        time.sleep(0.05)
+    return jobs.get(job_id).to_dict()
+
+
+def test_scrape_job_reports_progress_per_search(stub_jobs):
+    """
+    Test case to verify that a scrape job runs the scraper in the background and reports, for each search, the
+    result pages read of the total and the cases listed and fetched.
+
+    Parameters:
+    - stub_jobs: Creates the `ScrapeJobs` of a stub server.
+
+    Returns:
+        None
+    """
+    jobs = stub_jobs(search_total=25)
+    job = jobs.submit()
+    assert job.status in ('queued', 'running')
+
+    result = wait_for(jobs, job.id)
+
+    assert result['status'] == 'completed'
+    assert result['mode'] == 'full'
+    assert [search['status'] for search in result['result']['searches']] == ['success', 'success']
+    for search in result['searches']:
+        assert search['status'] == 'success'
+        assert (search['pages_done'], search['pages_total']) == (3, 3)
+        assert search['cases_listed'] == search['cases_fetched'] == 25
+        assert search['errors'] == 0
+    assert result['totals']['cases_fetched'] == 50
+    assert result['totals']['cases_per_second'] > 0
+
+
+def test_scrape_job_endpoints_and_cancellation(client, headers, stub_jobs, monkeypatch):
+    """
+    Test case to verify the scrape job endpoints: `POST /api/scraper/jobs` returns the job at once, `GET` reports
+    it, and `DELETE` cancels it, so its searches stop before reading every result page.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - headers: The headers with a valid token.
+    - stub_jobs: Creates the `ScrapeJobs` of a stub server.
+    - monkeypatch: Used to replace the jobs of the scraper routes.
+
+    Returns:
+        None
+    """
+    jobs = stub_jobs(search_total=200, latency=0.02)
+    monkeypatch.setattr(scraper_routes, 'scrape_jobs', jobs)
+
+    assert client.post('/api/scraper/jobs?mode=partial', headers=headers).status_code == 400
+    assert client.post('/api/scraper/jobs?resume=maybe', headers=headers).status_code == 400
+    assert client.post('/api/scraper/jobs').status_code == 401
+    response = client.post('/api/scraper/jobs?mode=incremental', headers=headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    assert response.get_json()['mode'] == 'incremental'
+
+    while not client.get(f'/api/scraper/jobs/{job_id}', headers=headers).get_json()['totals']['pages_done']:
+        time.sleep(0.02)
+    assert client.delete(f'/api/scraper/jobs/{job_id}', headers=headers).status_code == 202
+
+    result = wait_for(jobs, job_id)
+    assert result['status'] == 'cancelled'
+    assert {search['status'] for search in result['searches']} == {'cancelled'}
+    assert result['totals']['pages_done'] < 40
+    assert client.get(f'/api/scraper/jobs/{job_id}', headers=headers).get_json()['status'] == 'cancelled'
+    assert client.get('/api/scraper/jobs/unknown', headers=headers).status_code == 404
+
+
+def test_synchronous_scraper_waits_for_the_running_job(client, headers, stub_jobs, monkeypatch):
+    """
+    Test case to verify that `GET /api/scraper` runs through the job queue: it waits for the running job to end
+    before its own run starts, instead of resetting the data under it, and returns the result of its run.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - headers: The headers with a valid token.
+    - stub_jobs: Creates the `ScrapeJobs` of a stub server.
+    - monkeypatch: Used to replace the jobs of the scraper routes.
+
+    Returns:
+        None
+    """
+    jobs = stub_jobs(search_total=25, latency=0.01)
+    monkeypatch.setattr(scraper_routes, 'scrape_jobs', jobs)
+    running = jobs.submit()
+
+    response = client.get('/api/scraper', headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['msg'] == 'The scraping process has been completed'
+    [synchronous] = [job for job in jobs.jobs.values() if job is not running]
+    assert running.done and synchronous.status == 'completed'
+    assert running.finished <= synchronous.started
+
+
+def test_scraper_resume_false_starts_a_new_run(client, headers, stub_jobs, monkeypatch, tmp_path):
+    """
+    Test case to verify that `resume=false` makes `GET /api/scraper` start a new run, resetting the data, even when
+    the previous run of the mode did not finish, while the default resumes it.
+
+    Parameters:
+    - client: The Flask test client object used to send HTTP requests.
+    - headers: The headers with a valid token.
+    - stub_jobs: Creates the `ScrapeJobs` of a stub server.
+    - monkeypatch: Used to replace the jobs of the scraper routes.
+    - tmp_path: The temporary directory of the checkpoints of the stub jobs.
+
+    Returns:
+        None
+    """
+    jobs = stub_jobs(search_total=5)
+    monkeypatch.setattr(scraper_routes, 'scrape_jobs', jobs)
+    checkpoints = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+    listing = {'search_mode': 'http', 'page_size': 10}
+
+    checkpoints.begin_run('full', listing)
+    fresh = client.get('/api/scraper?resume=false', headers=headers)
+    checkpoints.begin_run('full', listing, fresh=True)
+    resumed = client.get('/api/scraper', headers=headers)
+
+    assert fresh.status_code == resumed.status_code == 200
+    assert fresh.get_json()['resumed'] is False
+    assert resumed.get_json()['resumed'] is True
+    assert client.get('/api/scraper?resume=1', headers=headers).status_code == 400
@@ -1,5 +1,23 @@
 import pytest
 from app import create_app
+from app.application.services import scraper_service
+from app.application.services.scraper_service import ScraperService
+from app.application.services.pipeline_service import CasePipeline
+from app.application.services.checkpoint_service import SearchCheckpoint
+from app.application.services.fetch_service import FetchServices
+from app.infraestructura.cache.response_cache import ResponseCache
+from app.infraestructura.drivers.http_session import HttpSession
+from app.infraestructura.drivers.rate_controller import RateController
+from app.infraestructura.repositories.data_repository import DataRepository
+from app.infraestructura.repositories import checkpoint_repository
+from app.infraestructura.repositories.checkpoint_repository import CheckpointRepository
+from app.utils.utils import Utils
+from tests.stub_server import StubServer
+from app.infraestructura.cache.single_flight import SingleFlight, single_flight
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import threading
+import time
 
 
 @pytest.fixture
@@ -72,3 +90,518 @@ def test_scraper_without_token(client):
     assert response.get_json() == {
         'message': 'Authentication token is missing. Please provide a valid token to access this resource.'
     }
+
+
+def test_fetch_errors_are_not_merged_as_subprocesses(monkeypatch):
+    """
+    Test case to verify that a case whose details could not be fetched keeps the error with an empty `subProcess`
+    list, and that failed judicial acts calls are skipped instead of being merged into the results.
+
+    Parameters:
+    - monkeypatch: Used to replace the API calls.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    single_flight.reset()
+    service = ScraperService()
+    details = {
+        '1': {'nombreTipoAccion': 'ORDINARIO', 'nombreMateria': 'CIVIL',
+              'subProcess': [{'idJudicatura': '09332', 'ciudad': 'GUAYAQUIL'}]},
+        '2': {'error': 'Failed to fetch data for case 2', 'status_code': 503},
+        '3': {'nombreTipoAccion': 'ORDINARIO', 'nombreMateria': 'CIVIL',
+              'subProcess': {'error': 'Failed to fetch incident data', 'status_code': 503}},
+    }
+    monkeypatch.setattr(service.fetch_services, 'fetch_case_details', lambda case_id: details[case_id])
+    monkeypatch.setattr(service.fetch_services, 'fetch_actuaciones_judiciales',
+                        lambda payload: {'error': 'Failed to fetch case data', 'status_code': 429})
+    list_process = {'id': [{'idJuicio': case_id, 'details': {'nombreDelito': 'COBRO'}}
+                           for case_id in ('1', '2', '3')]}
+
+    result = service.fetch_all_act_jud(service.fetch_all_cases(list_process, 'id'), 'id')
+
+    cases = result['id']
+    assert cases[0]['details']['subProcess'] == [{'idJudicatura': '09332', 'ciudad': 'GUAYAQUIL'}]
+    assert cases[1]['details']['subProcess'] == []
+    assert cases[1]['details']['error'] == 'Failed to fetch data for case 2'
+    assert cases[2]['details']['subProcess'] == []
+    assert cases[2]['details']['error'] == 'Failed to fetch incident data'
+
+
+def test_single_flight_deduplicates_concurrent_and_repeated_calls():
+    """
+    Test case to verify that concurrent calls with the same key share one call, that the result is memoized for
+    the rest of the run with a copy for each caller, and that errors are not memoized.
+
+    Returns:
+        None
+    """
+    flight = SingleFlight()
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+        time.sleep(0.05)
+        return {'subProcess': []}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: flight.do(('case', '1'), fetch), range(8)))
+    results[0]['subProcess'].append('changed')
+    assert flight.do(('case', '1'), fetch) == {'subProcess': []}
+    assert len(calls) == 1
+    assert flight.stats() == {'calls': 9, 'saved': 8, 'memoized': 1}
+
+    flight.do(('case', '2'), lambda: {'error': 'Failed to fetch data for case 2'})
+    assert flight.do(('case', '2'), fetch) == {'subProcess': []}
+    assert len(calls) == 2
+    # Case details whose incidents call failed are not memoized either
+    flight.do(('case', '3'), lambda: {'nombreTipoAccion': 'COBRO', 'subProcess': {'error': 'Failed', 'status_code': 503}})
+    assert flight.do(('case', '3'), fetch) == {'subProcess': []}
+    assert len(calls) == 3
+
+    flight.forget()
+    assert flight.stats() == {'calls': 13, 'saved': 8, 'memoized': 0}
+
+
+def test_incremental_mode_only_fetches_changed_cases():
+    """
+    Test case to verify which listed cases the incremental mode fetches again: new cases, cases with a different
+    `fechaIngreso`, cases whose previous fetch failed and active cases with recent judicial acts.
+
+    Returns:
+        None
+    """
+    service = ScraperService()
+    today = date.today().isoformat()
+    case = {'type': 'demandado', 'fechaIngreso': '20/05/2024 10:00', 'idJuicio': '09332202400123',
+            'details': {'nombreDelito': 'COBRO'}}
+
+    def stored(fecha_actuacion, fecha_ingreso='20/05/2024 10:00', **details):
+        return {**case, 'fechaIngreso': fecha_ingreso, 'details': {'subProcess': [
+            {'actuacionesJudiciales': [{'fecha': '2020-01-10'}, {'fecha': fecha_actuacion}]}], **details}}
+
+    assert service.is_case_changed(case, None)
+    assert service.is_case_changed(case, stored('2020-02-01', fecha_ingreso='21/05/2024 10:00'))
+    assert service.is_case_changed(case, stored('2020-02-01', error='Failed to fetch data'))
+    assert service.is_case_changed(case, stored(today))
+    assert not service.is_case_changed(case, stored('2020-02-01'))
+
+
+def test_case_pipeline_writes_cases_as_they_complete():
+    """
+    Test case to verify that `CasePipeline` fetches the judicial acts of a case as soon as its incidents arrive,
+    writes the finished cases without waiting for the slowest one, keeps the errors of a case with an empty
+    `subProcess` list and reports the stats of each stage.
+
+    Returns:
+        None
+    """
+    writes = []
+
+    def fetch_info(case_id):
+        time.sleep(0.05)
+        return {'nombreTipoAccion': 'ORDINARIO', 'nombreMateria': 'CIVIL'}
+
+    def fetch_incidents(case_id):
+        time.sleep(0.05)
+        if case_id == '9':
+            return {'error': 'Failed to fetch incident data', 'status_code': 503}
+        return [{'idJudicatura': f'0933{i}', 'ciudad': 'GUAYAQUIL'} for i in range(2)]
+
+    def fetch_actuaciones(payload):
+        time.sleep(0.3 if payload['idJuicio'] == '0' else 0.05)
+        return {payload['idJudicatura']: [{'fecha': '2024-05-20', 'idJuicio': payload['idJuicio']}]}
+
+    def sink(cases):
+        writes.append([case['idJuicio'] for case in cases])
+
+    pipeline = CasePipeline(fetch_info, fetch_incidents, fetch_actuaciones, sink,
+                            workers={'details': 10, 'incidents': 10, 'actuaciones': 20}).start()
+    cases = [{'idJuicio': str(i), 'details': {'nombreDelito': 'COBRO'}} for i in range(10)]
+    for case in cases:
+        pipeline.submit(case)
+    stats = pipeline.close()
+
+    # The slowest case is written last, after the cases submitted later
+    assert writes[-1] == ['0']
+    assert sorted(sum(writes, [])) == [str(i) for i in range(10)]
+    assert cases[1]['details']['nombreMateria'] == 'CIVIL'
+    assert cases[1]['details']['subProcess'][1]['actuacionesJudiciales'] == [{'fecha': '2024-05-20', 'idJuicio': '1'}]
+    assert cases[9]['details']['subProcess'] == []
+    assert cases[9]['details']['error'] == 'Failed to fetch incident data'
+    assert stats['submitted'] == stats['completed'] == 10
+    assert stats['errors'] == 1
+    assert stats['stages']['actuaciones']['processed'] == 18
+    assert stats['stages']['writer']['processed'] == 10
+
+
+def test_case_pipeline_writes_the_cases_of_a_failed_handler():
+    """
+    Test case to verify that an exception raised by a stage handler does not stop its worker: the error is counted
+    in the stats of the stage, the case is written with the error, and the other cases go through.
+
+    Returns:
+        None
+    """
+    writes = []
+
+    def fetch_info(case_id):
+        # Not a dictionary, updating the details raises
+        return None if case_id == '2' else {'nombreMateria': 'CIVIL'}
+
+    def fetch_incidents(case_id):
+        if case_id == '3':
+            return [{'ciudad': 'GUAYAQUIL'}]
+        return [{'idJudicatura': '09332', 'ciudad': 'GUAYAQUIL'}]
+
+    def fetch_actuaciones(payload):
+        return {'09332': [{'fecha': '2024-05-20'}]}
+
+    pipeline = CasePipeline(fetch_info, fetch_incidents, fetch_actuaciones, writes.extend,
+                            workers={'details': 1, 'incidents': 1, 'actuaciones': 1}).start()
+    cases = [{'idJuicio': str(i), 'details': {'nombreDelito': 'COBRO'}} for i in range(5)]
+    for case in cases:
+        pipeline.submit(case)
+    stats = pipeline.close()
+
+    assert sorted(case['idJuicio'] for case in writes) == [str(i) for i in range(5)]
+    assert 'error' in cases[2]['details']
+    assert cases[3]['details']['subProcess'] == [{'ciudad': 'GUAYAQUIL'}]
+    assert cases[4]['details']['subProcess'][0]['actuacionesJudiciales'] == [{'fecha': '2024-05-20'}]
+    assert stats['completed'] == 5 and stats['errors'] == 1
+    assert stats['stages']['details']['errors'] == 1
+    assert stats['stages']['actuaciones']['errors'] == 1
+
+
+def test_http_search_mode_scrapes_without_browser(monkeypatch, tmp_path):
+    """
+    Test case to verify that the 'http' search mode lists the cases page by page with the listing endpoint of the
+    API, in the same format as the result page, and feeds them to the pipeline without starting a browser.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode and to disable the pacing of the rate controller.
+    - tmp_path: A temporary directory for the response cache and the data file.
+
+    Returns:
+        None
+    """
+    def no_browser(*args):
+        raise AssertionError('The http search mode must not start a browser')
+
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(scraper_service.driver_pool, 'checkout', no_browser)
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    single_flight.reset()
+    server = StubServer(search_total=25).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(
+        url=server.url, cache=ResponseCache(path=str(tmp_path / 'responses.sqlite')))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    try:
+        result = service.scrape_process('demandado', '1791251237001')
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    assert result['status'] == 'success'
+    assert result['pipeline']['completed'] == 25
+    records = service.data_repository.get_data_id('1791251237001')
+    assert sorted(record['idJuicio'] for record in records) == [f'093321237{i:05d}' for i in range(25)]
+    record = records[0]
+    assert record['type'] == 'demandado'
+    assert record['fechaIngreso'] == '20/05/2024 10:00'
+    assert record['details']['nombreDelito'] == 'COBRO DE DINERO'
+    assert record['details']['nombreMateria'] == 'CIVIL'
+    assert record['details']['subProcess'][0]['actuacionesJudiciales'][0]['tipo'] == 'PROVIDENCIA GENERAL'
+
+
+
+def test_http_search_mode_lists_every_page_of_a_capped_endpoint(monkeypatch, tmp_path):
+    """
+    Test case to verify that the 'http' search mode keeps listing pages when the endpoint returns fewer cases per
+    page than `search_page_size`, and ends the listing with the first page shorter than the previous ones.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode, to cap the page size of the endpoint and to disable the pacing.
+    - tmp_path: A temporary directory for the data file.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    single_flight.reset()
+    server = StubServer(search_total=25).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    search_cases = service.fetch_services.search_cases
+
+    def capped_search_cases(process_type, process_id, page, size):
+        return search_cases(process_type, process_id, page, min(size, 4))
+
+    monkeypatch.setattr(service.fetch_services, 'search_cases', capped_search_cases)
+    report = {}
+    try:
+        pages = list(service.iter_pages_http('demandado', '1791251237001', report))
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    assert [len(cases) for cases in pages] == [4, 4, 4, 4, 4, 4, 1]
+    assert report['pages_total'] == 7
+    assert server.stats()['calls']['buscarCausas'] == 7
+
+class Crash(BaseException):
+    """
+    Stands for the process dying in the middle of a run: it is not caught by the scraper like an error.
+    """
+
+
+def test_interrupted_run_resumes_from_checkpoint(monkeypatch, tmp_path):
+    """
+    Test case to verify that a run interrupted in the middle of a search is resumed by the next run: the data is not
+    reset, the finished searches are skipped and the interrupted one continues from the page after the last completed
+    one, so no case is fetched or stored twice. The run after a finished one starts from scratch.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode, the page-by-page flow and to disable the pacing.
+    - tmp_path: A temporary directory for the data file and the checkpoints.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(scraper_service, 'scrape_pipeline_enabled', False)
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    server = StubServer(search_total=25).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    service.checkpoints = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+    service.arr_process_search = [{'type': 'ofendido', 'id': '0968599020001'}]
+    search_cases = service.fetch_services.search_cases
+
+    def crash_on_third_page(process_type, process_id, page, size):
+        if page == 3:
+            raise Crash()
+        return search_cases(process_type, process_id, page, size)
+
+    try:
+        monkeypatch.setattr(service.fetch_services, 'search_cases', crash_on_third_page)
+        with pytest.raises(Crash):
+            service.init_scraper()
+        assert len(service.data_repository.get_data_id('0968599020001')) == 20
+
+        monkeypatch.setattr(service.fetch_services, 'search_cases', search_cases)
+        service.arr_process_search.append({'type': 'demandado', 'id': '1791251237001'})
+        before = server.stats()['calls']
+        response, status = service.init_scraper()
+        after = server.stats()['calls']
+        first = service.data_repository.get_data_id('0968599020001')
+        second = service.data_repository.get_data_id('1791251237001')
+
+        response_again, _ = service.init_scraper()
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    assert status == 200
+    assert response['resumed'] is True
+    searches = {search['process_id']: search for search in response['searches']}
+    assert searches['0968599020001']['checkpoint'] == {'resumed_from_page': 3, 'skipped_cases': 0}
+    assert 'checkpoint' not in searches['1791251237001']
+    assert sorted(record['idJuicio'] for record in first) == [f'093329020{i:05d}' for i in range(25)]
+    assert len(second) == 25
+    # Pages 3 and 4 of the first search, the short page 3 is the first one read so the empty page 4 ends it, and the
+    # 3 pages of the new one
+    assert after['buscarCausas'] - before['buscarCausas'] == 5
+    assert after['getInformacionJuicio'] - before['getInformacionJuicio'] == 5 + 25
+    assert response_again['resumed'] is False
+    assert len(service.data_repository.get_data_id('0968599020001')) == 25
+
+
+def test_resumed_search_fetches_failed_cases_again(monkeypatch, tmp_path):
+    """
+    Test case to verify that a resumed search fetches again the cases whose fetch failed before the interruption,
+    even on pages before its checkpoint, and replaces their failed records instead of adding a second one.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode, the page-by-page flow and to disable the pacing.
+    - tmp_path: A temporary directory for the data file and the checkpoints.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(scraper_service, 'scrape_pipeline_enabled', False)
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    server = StubServer(search_total=25).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    service.checkpoints = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+    service.arr_process_search = [{'type': 'ofendido', 'id': '0968599020001'}]
+    search_cases = service.fetch_services.search_cases
+    fetch_case_details = service.fetch_services.fetch_case_details
+
+    def crash_on_third_page(process_type, process_id, page, size):
+        if page == 3:
+            raise Crash()
+        return search_cases(process_type, process_id, page, size)
+
+    def fail_first_case(case_id):
+        if case_id == '09332902000000':
+            return {'error': 'Failed to fetch case data', 'status_code': 503}
+        return fetch_case_details(case_id)
+
+    try:
+        monkeypatch.setattr(service.fetch_services, 'search_cases', crash_on_third_page)
+        monkeypatch.setattr(service.fetch_services, 'fetch_case_details', fail_first_case)
+        with pytest.raises(Crash):
+            service.init_scraper()
+        checkpoint = SearchCheckpoint(service.checkpoints, 'ofendido', '0968599020001')
+        assert checkpoint.last_page == 0 and len(checkpoint.cases) == 19
+
+        monkeypatch.setattr(service.fetch_services, 'search_cases', search_cases)
+        monkeypatch.setattr(service.fetch_services, 'fetch_case_details', fetch_case_details)
+        response, _ = service.init_scraper()
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    [search] = response['searches']
+    assert search['checkpoint'] == {'resumed_from_page': 1, 'skipped_cases': 19}
+    records = service.data_repository.get_data_id('0968599020001')
+    assert sorted(record['idJuicio'] for record in records) == [f'093329020{i:05d}' for i in range(25)]
+    assert all(Utils.is_case_fetched(record) for record in records)
+
+
+def test_run_with_a_failed_search_is_resumed(monkeypatch, tmp_path):
+    """
+    Test case to verify that a run where a search failed keeps its checkpoints: the next run resumes it without
+    resetting the data, skips the finished search and only runs the failed one.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode and to disable the pacing.
+    - tmp_path: A temporary directory for the data file and the checkpoints.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    server = StubServer(search_total=15).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    service.checkpoints = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+    service.arr_process_search = [{'type': 'ofendido', 'id': '0968599020001'},
+                                  {'type': 'demandado', 'id': '1791251237001'}]
+    search_cases = service.fetch_services.search_cases
+
+    def listing_down(process_type, process_id, page, size):
+        if process_id == '1791251237001':
+            raise RuntimeError('Listing unavailable')
+        return search_cases(process_type, process_id, page, size)
+
+    try:
+        monkeypatch.setattr(service.fetch_services, 'search_cases', listing_down)
+        response, _ = service.init_scraper()
+        assert sorted(search['status'] for search in response['searches']) == ['error', 'success']
+        monkeypatch.setattr(service.fetch_services, 'search_cases', search_cases)
+        response, _ = service.init_scraper()
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    assert response['resumed'] is True
+    # The memoized payloads are dropped when the run ends, the counters are kept
+    assert response['single_flight']['calls'] > 0 and single_flight.stats()['memoized'] == 0
+    searches = {search['process_id']: search for search in response['searches']}
+    assert searches['0968599020001']['checkpoint'] == {'done': True}
+    assert searches['1791251237001']['status'] == 'success'
+    assert len(service.data_repository.get_data_id('0968599020001')) == 15
+    assert len(service.data_repository.get_data_id('1791251237001')) == 15
+
+
+def test_search_checkpoint_only_advances_over_complete_pages(tmp_path):
+    """
+    Test case to verify that the last completed page of a checkpoint only moves forward once every page up to it has
+    all its cases stored, when the cases are stored out of order, that a case whose fetch failed is not recorded, and
+    that the checkpoint is read back on restart.
+
+    Parameters:
+    - tmp_path: A temporary directory for the checkpoints.
+
+    Returns:
+        None
+    """
+    repository = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+    assert repository.begin_run('full', {'search_mode': 'http'}) is False
+    checkpoint = SearchCheckpoint(repository, 'demandado', '1791251237001')
+    assert checkpoint.resumed is False
+    checkpoint.page_listed(1, ['a', 'b'])
+    checkpoint.page_listed(2, ['c'])
+    checkpoint.page_listed(3, [])
+
+    fetched = {'subProcess': []}
+    checkpoint.stored([{'idJuicio': 'c', 'details': fetched}, {'idJuicio': 'a', 'details': fetched}])
+    assert checkpoint.last_page == 0
+    checkpoint.stored([{'idJuicio': 'b', 'details': fetched}])
+    assert checkpoint.last_page == 3
+    # A case whose fetch failed is not recorded and its page never completes
+    checkpoint.page_listed(4, ['d'])
+    checkpoint.page_listed(5, [])
+    checkpoint.stored([{'idJuicio': 'd', 'details': {'error': 'Service Unavailable', 'status_code': 503}}])
+    assert checkpoint.last_page == 3
+
+    assert repository.begin_run('full', {'search_mode': 'http'}) is True
+    restarted = SearchCheckpoint(repository, 'demandado', '1791251237001')
+    assert (restarted.resumed, restarted.last_page, restarted.done) == (True, 3, False)
+    assert restarted.cases == {'a', 'b', 'c'}
+    assert repository.begin_run('incremental', {'search_mode': 'http'}) is False
+    assert SearchCheckpoint(repository, 'demandado', '1791251237001').resumed is False
+
+
+def test_unfinished_run_is_resumed_a_limited_number_of_times(tmp_path, monkeypatch):
+    """
+    Test case to verify that an unfinished run is only resumed until it was started `max_attempts` times or until
+    it is older than `max_age`, and never with `fresh`, so a search that keeps failing does not keep every later run
+    from starting from scratch.
+
+    Parameters:
+    - tmp_path: A temporary directory for the checkpoints.
+    - monkeypatch: Used to move the clock of the checkpoints forward.
+
+    Returns:
+        None
+    """
+    repository = CheckpointRepository(path=str(tmp_path / 'checkpoints.sqlite'))
+    listing = {'search_mode': 'http'}
+    assert repository.begin_run('full', listing, max_attempts=3) is False
+    assert repository.begin_run('full', listing, max_attempts=3) is True
+    assert repository.begin_run('full', listing, max_attempts=3) is True
+    assert repository.begin_run('full', listing, max_attempts=3) is False
+
+    assert repository.begin_run('full', listing, fresh=True) is False
+    assert repository.begin_run('full', listing, fresh=True) is False
+    assert repository.begin_run('full', listing) is True
+
+    repository.begin_run('full', listing, fresh=True)
+    started = time.time()
+    monkeypatch.setattr(checkpoint_repository.time, 'time', lambda: started + 7200)
+    assert repository.begin_run('full', listing, max_age=3600) is False
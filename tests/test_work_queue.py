@@ -0,0 +1,157 @@
+from app.application.services import scraper_service
+from app.application.services.worker_service import ScrapeWorker, search_tasks
+from app.application.services.scraper_service import ScraperService
+from app.application.services.fetch_service import FetchServices
+from app.infraestructura.cache.response_cache import ResponseCache
+from app.infraestructura.drivers.http_session import HttpSession
+from app.infraestructura.drivers.rate_controller import RateController
+from app.infraestructura.queue.work_queue import WorkQueue
+from app.infraestructura.repositories.data_repository import DataRepository
+from tests.stub_server import StubServer
+import pytest
+import time
+
+
+@pytest.mark.parametrize('journal_mode', ['WAL', 'DELETE'])
+def test_work_queue_leases_retries_and_expires_tasks(tmp_path, journal_mode):
+    """
+    Test case to verify the leases of the work queue: a leased task is hidden from the other workers until its lease
+    expires, tasks of the same group are not leased at the same time, a failed task is retried after its delay and
+    marked as failed after `max_attempts`, and a lost lease can not complete the task. The queue works the same with
+    the rollback journal used for a file shared by several machines.
+
+    Parameters:
+    - tmp_path: A temporary directory for the queue database.
+    - journal_mode: The journal mode of the queue database.
+
+    Returns:
+        None
+    """
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), visibility_timeout=0.2, max_attempts=2, retry_delay=0.1,
+                      journal_mode=journal_mode)
+    assert queue._connection().execute('PRAGMA journal_mode').fetchone()[0] == journal_mode.lower()
+    searches = [{'type': 'ofendido', 'id': '0968599020001'}, {'type': 'demandado', 'id': '0968599020001'},
+                {'type': 'ofendido', 'id': '0992339411001'}]
+    assert queue.enqueue(search_tasks(searches)) == 3
+    assert queue.enqueue(search_tasks(searches)) == 0
+
+    first = queue.lease('a')
+    second = queue.lease('b')
+    assert first['payload'] == {'type': 'ofendido', 'id': '0968599020001', 'mode': 'full'}
+    # The other search of the same ID waits for the first one
+    assert second['payload']['id'] == '0992339411001'
+    assert queue.lease('c') is None
+
+    assert queue.complete(second['id'], 'b', {'cases': 3})
+    assert queue.fail(first['id'], 'a', 'timeout')
+    assert queue.get(first['id'])['status'] == 'queued'
+    retried = queue.lease('c')
+    assert retried['payload']['type'] == 'demandado'
+    assert queue.lease('c') is None
+
+    # The lease of the demandado search expired: another worker takes it and the first one lost it
+    time.sleep(0.25)
+    retaken = queue.lease('d')
+    assert retaken['id'] == retried['id'] and retaken['attempts'] == 2
+    assert not queue.complete(retried['id'], 'c')
+    assert queue.lease('e') is None
+    assert queue.fail(retaken['id'], 'd', 'timeout again')
+    assert queue.get(retaken['id'])['status'] == 'failed'
+    assert queue.lease('e')['id'] == first['id']
+    assert queue.complete(first['id'], 'e')
+    assert queue.stats()['tasks'] == {'queued': 0, 'leased': 0, 'done': 2, 'failed': 1}
+
+    # A finished task is queued again by the next run
+    assert queue.enqueue(search_tasks(searches)) == 3
+
+
+def test_scrape_worker_runs_the_queued_searches(monkeypatch, tmp_path):
+    """
+    Test case to verify that a scrape worker runs the queued searches in the 'http' search mode, stores their cases
+    once even if a search runs twice, and records its counters in the queue.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode and to disable the pacing of the rate controller.
+    - tmp_path: A temporary directory for the queue database and the data file.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    server = StubServer(search_total=15).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+    searches = [{'type': 'demandado', 'id': '1791251237001'}, {'type': 'ofendido', 'id': '1791251237001'},
+                {'type': 'ofendido', 'id': '0968599020001'}]
+    queue.enqueue(search_tasks(searches))
+    worker = ScrapeWorker(queue, lambda: service, worker_id='worker-1')
+    try:
+        assert worker.run(exit_when_empty=True) == 3
+        # A full search queued again replaces its records instead of adding them twice
+        queue.enqueue(search_tasks(searches[:1]))
+        assert worker.run(exit_when_empty=True) == 1
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    records = service.data_repository.get_data_id('1791251237001')
+    assert sorted(record['type'] for record in records) == ['demandado'] * 15 + ['demandante'] * 15
+    assert len(service.data_repository.get_data_id('0968599020001')) == 15
+    stats = queue.stats()
+    assert stats['tasks'] == {'queued': 0, 'leased': 0, 'done': 3, 'failed': 0}
+    [record] = stats['workers']
+    assert record['worker_id'] == 'worker-1' and record['status'] == 'stopped'
+    assert record['tasks_done'] == 4 and record['cases'] == 60
+    assert record['cases_per_second'] > 0
+
+
+def test_scrape_worker_cancels_a_search_whose_lease_was_lost(monkeypatch, tmp_path):
+    """
+    Test case to verify that a worker whose lease was taken by another worker cancels its search before the next
+    result page, leaves the task to the other worker and does not count it in its counters.
+
+    Parameters:
+    - monkeypatch: Used to select the search mode, to disable the pacing and to take the lease during the search.
+    - tmp_path: A temporary directory for the queue database and the data file.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(scraper_service, 'search_mode', 'http')
+    monkeypatch.setattr(scraper_service, 'search_page_size', 10)
+    monkeypatch.setattr(scraper_service, 'fetch_engine', 'threads')
+    monkeypatch.setattr(HttpSession, 'controller', RateController(rate=0, initial_limit=20))
+    server = StubServer(search_total=50).start()
+    service = ScraperService()
+    service.fetch_services = FetchServices(url=server.url, cache=ResponseCache(enabled=False))
+    service.data_repository = DataRepository(path=str(tmp_path / 'data.json'))
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), visibility_timeout=0.3)
+    queue.enqueue(search_tasks([{'type': 'demandado', 'id': '1791251237001'}]))
+    search_cases = service.fetch_services.search_cases
+
+    def lease_taken_on_second_page(process_type, process_id, page, size):
+        if page == 2:
+            with queue._transaction() as connection:
+                connection.execute("UPDATE tasks SET lease_owner = 'worker-2'")
+            time.sleep(0.3)
+        return search_cases(process_type, process_id, page, size)
+
+    monkeypatch.setattr(service.fetch_services, 'search_cases', lease_taken_on_second_page)
+    worker = ScrapeWorker(queue, lambda: service, worker_id='worker-1')
+    try:
+        assert worker.run(max_tasks=1) == 1
+        listings = server.stats()['calls']['buscarCausas']
+    finally:
+        HttpSession.close()
+        server.stop()
+
+    assert listings == 2
+    stats = queue.stats()
+    assert stats['tasks']['leased'] == 1
+    [record] = stats['workers']
+    assert (record['tasks_done'], record['tasks_failed'], record['cases']) == (0, 0, 0)